@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+EM OFFICIAL TEAM - Bot benchmarks
+Usage: python benchmark.py [name ...]
+Runs without a real bot token or network access.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import importlib.util
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:benchmark")
+
+# BOT_FILE points the harnesses at another build of the bot (used by replay.py)
+BOT_FILE = os.getenv("BOT_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "telegram_bot .py")
+
+def load_bot():
+    """Import the bot module (its file name contains a space)"""
+    spec = importlib.util.spec_from_file_location("telegram_bot", BOT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["telegram_bot"] = module
+    spec.loader.exec_module(module)
+    return module
+
+bot = load_bot()
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# ===============================
+# HELPERS
+# ===============================
+
+def measure(func, iterations: int = 20000) -> dict:
+    """Per-call time and allocations for a zero-argument callable"""
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [func() for _ in range(100)]
+    after = tracemalloc.take_snapshot()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename')) / len(kept)
+    del kept, before, after
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'us_per_call': elapsed / iterations * 1e6,
+        'blocks_per_call': blocks,
+        'peak_bytes': peak - baseline,
+    }
+
+def print_comparison(title: str, before: dict, after: dict):
+    print(f"\n{title}")
+    print(f"  {'':<10}{'us/call':>12}{'blocks kept':>14}{'peak bytes':>12}")
+    for label, result in (("before", before), ("after", after)):
+        print(f"  {label:<10}{result['us_per_call']:>12.2f}{result['blocks_per_call']:>14.1f}{result['peak_bytes']:>12}")
+    print(f"  speedup: {before['us_per_call'] / after['us_per_call']:.1f}x")
+
+# ===============================
+# TEMPLATE RENDERING
+# ===============================
+
+def legacy_help_screen(current_time: datetime):
+    """/help as it was rendered before templates (f-string + fresh keyboard)"""
+    help_text = f"""
+🆘 **HELP & SUPPORT** 🆘
+
+```
+📋 COMMAND LIST
+╭─────────────────────────────────────╮
+│ 🏠 /start - Welcome & main menu
+│ 🔐 /verify - Complete verification
+│ 💎 /like <region> <uid> - Send likes
+│ 📊 /stats - Your statistics
+│ 🆘 /help - This help menu
+│ 👥 /contact - Contact owner
+╰─────────────────────────────────────╯
+```
+
+**🎮 LIKE COMMAND USAGE:**
+• **Format:** `/like <region> <uid>`
+• **Example:** `/like bd 5914395123`
+• **Regions:** BD, IND, BR, US
+
+**🔐 VERIFICATION STEPS:**
+1. Use `/verify` command
+2. Visit all 4 platforms
+3. Click "Complete Done"
+4. Start using bot!
+
+**⚡ IMPORTANT NOTES:**
+• You must verify before using
+• Daily limits apply (except owner)
+• Bot works only in authorized groups
+• Contact owner for support
+
+**👥 NEED HELP?**
+Contact: {bot.CONTACT_OWNER}
+Discord: [Join Server]({bot.DISCORD_LINK})
+
+**🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
+📅 {current_time.strftime("%Y-%m-%d")} 🕐 {current_time.strftime("%H:%M:%S")}
+    """
+    keyboard = [
+        [InlineKeyboardButton("🔐 Start Verification", callback_data="start_verify")],
+        [InlineKeyboardButton("🎮 Join Discord", url=bot.DISCORD_LINK)],
+        [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{bot.CONTACT_OWNER[1:]}")]
+    ]
+    return help_text, InlineKeyboardMarkup(keyboard)
+
+def template_help_screen(current_time: datetime):
+    """/help as rendered now"""
+    return bot.HELP_TEMPLATE.render(**bot.time_fields(current_time)), bot.HELP_KEYBOARD
+
+def legacy_verify_screen(current_time: datetime):
+    """/verify steps as rendered before templates"""
+    date_str = current_time.strftime("%Y-%m-%d")
+    time_str = current_time.strftime("%H:%M:%S")
+    verify_text = f"""
+🔐 **SIMPLE VERIFICATION SYSTEM** 🔐
+
+╭─────────────────────────────────────╮
+│ 📋 **FOLLOW THESE STEPS:**
+│
+│ 1️⃣ Visit YouTube Channel
+│ 2️⃣ Join Telegram Channel
+│ 3️⃣ Join Telegram Group
+│ 4️⃣ Join Discord Server
+│
+│ ✅ Click "Complete Done" when finished
+╰─────────────────────────────────────╯
+
+**💡 INSTRUCTIONS:**
+• Click each numbered button below
+• Visit all the platforms
+• Return here and click "Complete Done"
+• Get instant verification!
+
+**🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
+📅 {date_str} 🕐 {time_str}
+    """
+    links = bot.VERIFICATION_LINKS
+    keyboard = [
+        [
+            InlineKeyboardButton("1️⃣ YouTube Channel", url=links['youtube']),
+            InlineKeyboardButton("2️⃣ Telegram Channel", url=links['telegram_channel'])
+        ],
+        [
+            InlineKeyboardButton("3️⃣ Telegram Group", url=links['telegram_group']),
+            InlineKeyboardButton("4️⃣ Discord Server", url=links['discord'])
+        ],
+        [InlineKeyboardButton("✅ Complete Done", callback_data="complete_verification")]
+    ]
+    return verify_text, InlineKeyboardMarkup(keyboard)
+
+def template_verify_screen(current_time: datetime):
+    """/verify steps as rendered now"""
+    return bot.VERIFY_STEPS_TEMPLATE.render(**bot.time_fields(current_time)), bot.VERIFY_KEYBOARD
+
+def bench_templates():
+    """Per-render cost of static screens before and after precompiled templates"""
+    current_time = bot.get_nepal_time()
+    for title, legacy, current in (
+        ("/help screen", legacy_help_screen, template_help_screen),
+        ("/verify screen", legacy_verify_screen, template_verify_screen),
+    ):
+        print_comparison(
+            title,
+            measure(lambda: legacy(current_time)),
+            measure(lambda: current(current_time)),
+        )
+
+# ===============================
+# LOGGING OVERHEAD
+# ===============================
+
+OWNER_CHECKS_PER_COMMAND = 4  # decorator, like_command, get_user_daily_limit, increment_user_usage
+
+def bench_logging():
+    """Per-command logging cost on the calling thread, before and after the queue pipeline"""
+    devnull = open(os.devnull, "w")
+
+    # Before: synchronous handler and an eager INFO f-string on every owner check
+    legacy_logger = logging.getLogger("benchmark.legacy")
+    legacy_logger.propagate = False
+    legacy_handler = logging.StreamHandler(devnull)
+    legacy_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    legacy_logger.addHandler(legacy_handler)
+    legacy_logger.setLevel(logging.INFO)
+
+    def legacy_is_owner(user_id: int) -> bool:
+        result = user_id == bot.OWNER_ID or user_id == bot.ALTERNATE_OWNER_ID
+        legacy_logger.info(f"Owner check: user_id={user_id}, OWNER_ID={bot.OWNER_ID}, ALTERNATE_ID={bot.ALTERNATE_OWNER_ID}, result={result}")
+        return result
+
+    def legacy_command():
+        for _ in range(OWNER_CHECKS_PER_COMMAND):
+            legacy_is_owner(123456789)
+        legacy_logger.info("Data saved successfully")
+
+    # After: the bot's own pipeline, with its writer pointed at /dev/null
+    for handler in bot.log_listener.handlers:
+        handler.setStream(devnull)
+
+    def current_command():
+        for _ in range(OWNER_CHECKS_PER_COMMAND):
+            bot.is_owner(123456789)
+        bot.hot_logger.info("Data saved successfully")
+
+    print_comparison("logging per /like command", measure(legacy_command), measure(current_command))
+
+# ===============================
+# CLOCK AND DAILY QUOTA
+# ===============================
+
+def bench_clock():
+    """Quota lookup and template time fields, before and after the cached clock"""
+    import pytz
+    user_id = 123456789
+    bot.user_usage[user_id] = {bot.nepal_clock.today_key(): 1}
+    bot.usage_today[user_id] = 1
+
+    def legacy_usage_today():
+        today = datetime.now(pytz.timezone("Asia/Kathmandu")).strftime("%Y-%m-%d")
+        return bot.user_usage[user_id].get(today, 0)
+
+    print_comparison("get_user_usage_today", measure(legacy_usage_today),
+                     measure(lambda: bot.get_user_usage_today(user_id)))
+    print_comparison("template time fields", measure(lambda: bot.time_fields(bot.get_nepal_time())),
+                     measure(bot.nepal_clock.time_fields))
+
+# ===============================
+# QUOTA LEASES
+# ===============================
+
+def bench_quota(users: int = 200, limit: int = 10):
+    """Quota store round trips per granted /like with and without leased quota slices
+    
+    Only reserve/release/lease/settle calls are counted. Workers also read
+    the change log every STATE_SYNC_INTERVAL whatever the traffic; that
+    cost is printed separately, not spread over likes.
+    """
+    import tempfile
+    print(f"\n{users} users, limit {limit}, {limit + 1} attempts each")
+    print(f"  {'slice':<10}{'granted':>10}{'quota trips/like':>18}{'us/like':>10}")
+    for slice_size in (0, 5, 10):
+        bot.state_store = bot.SqliteStateStore(os.path.join(tempfile.mkdtemp(prefix="em_bench_"), "state.db"))
+        bot.usage_today = {}
+        bot.user_usage.clear()
+        bot.quota_leases = bot.QuotaLeases(slice_size, bot.QUOTA_LEASE_TTL, bot.QUOTA_LEASE_GRACE)
+        trips = {'count': 0}
+        for name in ("reserve_usage", "release_usage", "lease_quota", "settle_quota"):
+            method = getattr(bot.state_store, name)
+            def counted(*args, method=method):
+                trips['count'] += 1
+                return method(*args)
+            setattr(bot.state_store, name, counted)
+        
+        async def attempts():
+            granted = 0
+            for user_id in range(1, users + 1):
+                bot.user_limits[user_id] = limit
+                for _ in range(limit + 1):
+                    granted += await bot.reserve_user_usage(user_id)
+            bot.quota_leases.settle_all()
+            await bot.quota_leases.flush()
+            return granted
+        start = time.perf_counter()
+        granted = asyncio.run(attempts())
+        elapsed = time.perf_counter() - start
+        stored = bot.state_store.db.execute("SELECT SUM(count) FROM usage").fetchone()[0]
+        assert granted == stored == users * limit, (granted, stored)
+        print(f"  {slice_size:<10}{granted:>10}{trips['count'] / granted:>18.2f}{elapsed / granted * 1e6:>10.1f}")
+        bot.state_store.close()
+    bot.state_store = None
+    print(f"  plus {1 / bot.STATE_SYNC_INTERVAL:.0f} change log reads/s per worker (state sync, any traffic)")
+
+# ===============================
+# LIKE HISTORY
+# ===============================
+
+def bench_history(events: int = 2000):
+    """Cost /like pays to record an event: a write per like vs the buffered log"""
+    import tempfile
+    directory = tempfile.mkdtemp(prefix="em_bench_")
+    direct = bot.LikeHistory(os.path.join(directory, "direct.db"), 0, 1, 30)
+    row = lambda: (time.time(), "2026-01-01", 123456789, -100123, "5914395123", "BD", "sent", 100)
+    print_comparison("record one like",
+                     measure(lambda: direct._write([row()]), 500),
+                     measure(lambda: bot.like_history.record(123456789, -100123, "5914395123", "BD", "sent", 100)))
+    bot.like_history.buffer.clear()
+    
+    async def flush_throughput():
+        history = bot.LikeHistory(os.path.join(directory, "batched.db"), 0, bot.LIKE_HISTORY_BATCH_SIZE, 30)
+        start = time.perf_counter()
+        for index in range(events):
+            history.record(123456789 + index % 50, -100123, str(5914395123 + index % 300), "BD", "sent", 100)
+            if len(history.buffer) >= history.batch_size:
+                await history.flush()
+        await history.flush()
+        elapsed = time.perf_counter() - start
+        print(f"\nbatched writes: {events} events in {elapsed * 1000:.0f} ms ({elapsed / events * 1e6:.1f} us/event)")
+        start = time.perf_counter()
+        for _ in range(100):
+            await history.page('uid', "5914395123", None, None, 11)
+        print(f"/history page by UID: {(time.perf_counter() - start) * 10:.2f} ms")
+        await history.stop()
+    
+    return flush_throughput()
+
+# ===============================
+# MAIN
+# ===============================
+
+BENCHMARKS = {
+    'templates': bench_templates,
+    'logging': bench_logging,
+    'clock': bench_clock,
+    'quota': bench_quota,
+    'history': bench_history,
+}
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (available: {', '.join(BENCHMARKS)})")
+            continue
+        print(f"=== {name} ===")
+        result = BENCHMARKS[name]()
+        if asyncio.iscoroutine(result):
+            asyncio.run(result)
+
+if __name__ == "__main__":
+    main()
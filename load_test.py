@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+EM OFFICIAL TEAM - End-to-end load test
+Drives the real handlers from build_application() with synthetic updates.
+Telegram is replaced by an in-process fake bot and the like API by a local
+aiohttp stand-in server.
+
+Usage: python load_test.py [scenario ...] [--updates N] [--concurrency N]
+       [--upstream-latency MS] [--upstream-jitter MS] [--error-rate P]
+       [--telegram-latency MS] [--faults SPEC ...] [--fault-sweep]
+       [--upstream-timeout S] [--record PATH] [--workers N ...]
+
+--faults takes the same specs as the /faults owner command ("flapping",
+"server_error=0.2 latency_ms=800", ...) and repeats every scenario under
+each one; --fault-sweep runs all presets plus a clean baseline.
+--record writes the run as an anonymised recording for replay.py.
+--workers runs each scenario once per worker count, with that many worker
+processes sharing a SQLite state store and update queue (scale-out mode);
+--concurrency is then per worker.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_FORMAT", "text")
+
+from benchmark import bot
+
+import logging
+from aiohttp import web
+from telegram import Update
+from telegram.ext import ExtBot
+
+# ===============================
+# FAKE TELEGRAM BOT
+# ===============================
+
+class FakeBot(ExtBot):
+    """ExtBot that answers API calls in-process and records them"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(token="0:loadtest")
+        with self._unfrozen():
+            self.latency = latency
+            self.calls = {}  # endpoint: count
+            self.texts = []  # text of every message sent or edited
+            self.next_message_id = 1
+
+    def reset(self):
+        self.calls.clear()
+        self.texts.clear()
+
+    async def _do_post(self, endpoint: str, data: dict, **kwargs):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if endpoint == "getMe":
+            return {'id': 1, 'is_bot': True, 'first_name': "LoadTest", 'username': "loadtest_bot"}
+        if endpoint in ("sendMessage", "sendDocument", "editMessageText"):
+            if 'text' in data:
+                self.texts.append(str(data['text']))
+            with self._unfrozen():
+                self.next_message_id += 1
+            chat_id = int(data.get('chat_id', 1))
+            return {
+                'message_id': data.get('message_id', self.next_message_id),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': "private" if chat_id > 0 else "supergroup"},
+                'text': str(data.get('text', "")),
+            }
+        if endpoint == "getChatMemberCount":
+            return 100
+        if endpoint == "getChatAdministrators":
+            return []
+        return True
+
+# ===============================
+# LIKE API STAND-IN
+# ===============================
+
+class LikeApiStandIn:
+    """Local HTTP server that mimics the like API"""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handle_like(self, request):
+        self.requests += 1
+        delay = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        await asyncio.sleep(delay)
+        if random.random() < self.error_rate:
+            return web.Response(status=500, text="Internal Server Error")
+        before = random.randint(1000, 50000)
+        return web.json_response({
+            'status': 1,
+            'player': {'nickname': f"Player{request.query.get('uid', '0')[-4:]}"},
+            'likes': {'before': before, 'after': before + 100, 'added_by_api': 100},
+        })
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/like", self.handle_like)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/like"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+# ===============================
+# SYNTHETIC UPDATES
+# ===============================
+
+class UpdateFactory:
+    """Builds real telegram.Update objects from Bot API shaped dicts"""
+
+    def __init__(self, fake_bot: FakeBot):
+        self.bot = fake_bot
+        self.update_id = 0
+
+    def _next_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}"}
+
+    @staticmethod
+    def _chat(chat_id: int) -> dict:
+        if chat_id > 0:
+            return {'id': chat_id, 'type': "private", 'first_name': f"User{chat_id}"}
+        return {'id': chat_id, 'type': "supergroup", 'title': f"Group{chat_id}"}
+
+    def command(self, user_id: int, text: str, chat_id: int = None) -> Update:
+        command = text.split()[0]
+        return Update.de_json({
+            'update_id': self._next_id(),
+            'message': {
+                'message_id': self._next_id(),
+                'date': int(time.time()),
+                'chat': self._chat(chat_id or user_id),
+                'from': self._user(user_id),
+                'text': text,
+                'entities': [{'type': "bot_command", 'offset': 0, 'length': len(command)}],
+            },
+        }, self.bot)
+
+    def callback(self, user_id: int, data: str, chat_id: int = None, message_id: int = None) -> Update:
+        return Update.de_json({
+            'update_id': self._next_id(),
+            'callback_query': {
+                'id': str(self._next_id()),
+                'from': self._user(user_id),
+                'chat_instance': "loadtest",
+                'data': data,
+                'message': {
+                    'message_id': message_id or self._next_id(),
+                    'date': int(time.time()),
+                    'chat': self._chat(chat_id or user_id),
+                    'text': "previous screen",
+                },
+            },
+        }, self.bot)
+
+# ===============================
+# SCENARIOS
+# ===============================
+
+FIRST_USER_ID = 5_000_000_000
+
+def scenario_like_storm(factory: UpdateFactory, count: int) -> list:
+    """Verified users all sending /like at once"""
+    updates = []
+    for index in range(count):
+        user_id = FIRST_USER_ID + index
+        bot.user_verification[user_id] = {'verified': True, 'verified_date': "2025-01-01 00:00:00"}
+        bot.user_limits[user_id] = 1000
+        updates.append(factory.command(user_id, f"/like bd {1_000_000_000 + index}"))
+    bot.bot_stats.rebuild()
+    return updates
+
+def scenario_verification_burst(factory: UpdateFactory, count: int) -> list:
+    """New users opening /verify and tapping Complete Done"""
+    updates = []
+    for index in range(count // 2):
+        user_id = FIRST_USER_ID + 100_000 + index
+        updates.append(factory.command(user_id, "/verify"))
+        updates.append(factory.callback(user_id, "complete_verification"))
+    return updates
+
+def scenario_callback_refresh(factory: UpdateFactory, count: int) -> list:
+    """Refresh buttons hammered by a handful of users"""
+    buttons = ["refresh_stats", "refresh_commands", "refresh_uptime", "refresh_owner_help"]
+    users = [bot.OWNER_ID] + [FIRST_USER_ID + 200_000 + index for index in range(10)]
+    screens = {user_id: index + 1 for index, user_id in enumerate(users)}  # one message per user
+    updates = []
+    for _ in range(count):
+        user_id = random.choice(users)
+        updates.append(factory.callback(user_id, random.choice(buttons), message_id=screens[user_id]))
+    return updates
+
+def scenario_mixed(factory: UpdateFactory, count: int) -> list:
+    """Realistic blend of commands, callbacks and likes"""
+    updates = (
+        scenario_like_storm(factory, count // 4)
+        + scenario_verification_burst(factory, count // 4)
+        + scenario_callback_refresh(factory, count // 4)
+    )
+    commands = ["/start", "/help", "/stats", "/status", "/slag", "/contact"]
+    for index in range(count - len(updates)):
+        updates.append(factory.command(FIRST_USER_ID + 300_000 + index % 50, random.choice(commands)))
+    random.shuffle(updates)
+    return updates
+
+SCENARIOS = {
+    'like_storm': scenario_like_storm,
+    'verification_burst': scenario_verification_burst,
+    'callback_refresh': scenario_callback_refresh,
+    'mixed': scenario_mixed,
+}
+
+# ===============================
+# RUNNER
+# ===============================
+
+# Final /like replies, matched on their headline; "ok" outcomes are the
+# ones a user would not call an error
+LIKE_OUTCOMES = (
+    ("LIKES SENT SUCCESSFULLY", "success", True),
+    ("LIKES ALREADY RECEIVED", "already_received", True),
+    ("PLAYER NOT FOUND", "not_found", True),
+    ("API ERROR OCCURRED", "api_error", False),
+    ("API CONNECTION FAILED", "connection_failed", False),
+    ("An error occurred", "failed", False),
+)
+
+def classify_like_replies(texts: list) -> dict:
+    outcomes = {}
+    for text in texts:
+        for marker, outcome, _ in LIKE_OUTCOMES:
+            if marker in text:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                break
+    return outcomes
+
+def user_error_rate(outcomes: dict) -> float:
+    total = sum(outcomes.values())
+    errors = sum(outcomes.get(outcome, 0) for _, outcome, ok in LIKE_OUTCOMES if not ok)
+    return errors / total if total else 0.0
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_scenario(application, fake_bot: FakeBot, standin: LikeApiStandIn,
+                       updates: list, concurrency: int) -> dict:
+    """Feed updates through the application and collect timings"""
+    fake_bot.reset()
+    upstream_before = standin.requests
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(update: Update):
+        async with semaphore:
+            start = time.perf_counter()
+            await application.process_update(update)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(process(update) for update in updates))
+    elapsed = time.perf_counter() - start
+
+    outcomes = classify_like_replies(fake_bot.texts)
+    return {
+        'updates': len(updates),
+        'updates_per_sec': len(updates) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'upstream_calls': standin.requests - upstream_before,
+        'telegram_calls': dict(fake_bot.calls),
+        'like_outcomes': outcomes,
+        'user_error_rate': user_error_rate(outcomes),
+    }
+
+def print_report(name: str, result: dict):
+    telegram_total = sum(result['telegram_calls'].values())
+    print(f"\n{name}")
+    print(f"  updates:        {result['updates']}")
+    print(f"  updates/sec:    {result['updates_per_sec']:.1f}")
+    print(f"  p50 latency:    {result['p50_ms']:.1f} ms")
+    print(f"  p99 latency:    {result['p99_ms']:.1f} ms")
+    print(f"  upstream calls: {result['upstream_calls']}")
+    print(f"  telegram calls: {telegram_total} "
+          f"({', '.join(f'{endpoint}={count}' for endpoint, count in sorted(result['telegram_calls'].items()))})")
+    if result['like_outcomes']:
+        print(f"  like replies:   "
+              f"{', '.join(f'{outcome}={count}' for outcome, count in sorted(result['like_outcomes'].items()))}")
+        print(f"  user errors:    {result['user_error_rate'] * 100:.1f}%")
+
+def print_summary(rows: list):
+    print(f"\n{'faults':<24}{'scenario':<20}{'updates/s':>10}{'p99 ms':>10}{'errors':>9}")
+    for faults, name, result in rows:
+        print(f"{faults:<24}{name:<20}{result['updates_per_sec']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{result['user_error_rate'] * 100:>8.1f}%")
+
+# ===============================
+# MULTI-PROCESS RUNNER
+# ===============================
+
+async def run_worker_process(args):
+    """Child side of --workers: drain the shared queue with this process's handlers"""
+    logging.getLogger().setLevel(logging.WARNING)
+    store = bot.open_state_store(args.worker_of)
+    bot.load_data()
+    bot.UPSTREAM_TIMEOUT = args.upstream_timeout
+    fake_bot = FakeBot(args.telegram_latency / 1000)
+    application = bot.build_application(bot=fake_bot)
+    await application.initialize()
+    bot.message_cleaner.start(fake_bot)
+    if hasattr(bot, "state_sync"):
+        bot.state_sync.start()
+    fake_bot.reset()
+
+    store.set_meta(f"ready:{bot.WORKER_ID}", "1")
+    while store.get_meta("go") is None:
+        await asyncio.sleep(0.01)
+    start = time.time()
+    try:
+        await bot.process_shared_updates(application, args.concurrency, stop_when_empty=True)
+    finally:
+        end = time.time()
+        if hasattr(bot, "state_sync"):
+            await bot.state_sync.stop()
+        bot.quota_leases.settle_all()
+        if hasattr(bot.quota_leases, "flush"):
+            await bot.quota_leases.flush()
+        await bot.upstream.close()
+        await bot.message_cleaner.stop()
+        await application.shutdown()
+    with open(args.worker_result, "w") as f:
+        json.dump({
+            'start': start,
+            'end': end,
+            'telegram_calls': fake_bot.calls,
+            'like_outcomes': classify_like_replies(fake_bot.texts),
+        }, f)
+
+async def run_with_workers(args, standin: LikeApiStandIn, name: str, updates: list, workers: int) -> dict:
+    """Queue updates in a fresh store and let `workers` processes handle them"""
+    store_url = f"sqlite:{os.path.abspath(f'state_{name}_{workers}.db')}"
+    store = bot.SqliteStateStore(store_url[len("sqlite:"):])
+    store.import_state({
+        'user_limits': bot.user_limits,
+        'user_usage': bot.user_usage,
+        'user_verification': bot.user_verification,
+        'allowed_groups': bot.allowed_groups,
+        'limit_tiers': bot.limit_tiers,
+        'user_tiers': bot.user_tiers,
+        'group_usage': bot.group_usage,
+    })
+    store.enqueue_updates([update.to_dict() for update in updates], None)
+
+    processes = []
+    for worker_id in range(workers):
+        env = dict(os.environ, LIKE_API_URL=standin.url, STATE_STORE=store_url, WORKER_ID=str(worker_id),
+                   METRICS_PORT="0", LOG_FORMAT="text")
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.abspath(__file__),
+            "--worker-of", store_url, "--worker-result", f"result_{worker_id}.json",
+            "--concurrency", str(args.concurrency), "--upstream-timeout", str(args.upstream_timeout),
+            "--telegram-latency", str(args.telegram_latency),
+        ], env=env, cwd=os.getcwd()))
+
+    # Start everyone together so start-up time is not measured
+    while not all(store.get_meta(f"ready:{worker_id}") for worker_id in range(workers)):
+        if any(process.poll() for process in processes):
+            raise SystemExit("worker failed to start")
+        await asyncio.sleep(0.05)
+    upstream_before = standin.requests
+    store.set_meta("go", "1")
+    while any(process.poll() is None for process in processes):
+        await asyncio.sleep(0.05)
+    if any(process.returncode for process in processes):
+        raise SystemExit("worker failed")
+    store.close()
+
+    results = []
+    for worker_id in range(workers):
+        with open(f"result_{worker_id}.json") as f:
+            results.append(json.load(f))
+    elapsed = max(r['end'] for r in results) - min(r['start'] for r in results)
+    telegram_calls, outcomes = {}, {}
+    for r in results:
+        for endpoint, count in r['telegram_calls'].items():
+            telegram_calls[endpoint] = telegram_calls.get(endpoint, 0) + count
+        for outcome, count in r['like_outcomes'].items():
+            outcomes[outcome] = outcomes.get(outcome, 0) + count
+    return {
+        'updates': len(updates),
+        'updates_per_sec': len(updates) / elapsed if elapsed else 0.0,
+        'upstream_calls': standin.requests - upstream_before,
+        'telegram_calls': telegram_calls,
+        'like_outcomes': outcomes,
+        'user_error_rate': user_error_rate(outcomes),
+    }
+
+async def run_multi(args, standin: LikeApiStandIn):
+    factory = UpdateFactory(FakeBot())
+    rows = []
+    for name in args.scenarios:
+        updates = SCENARIOS[name](factory, args.updates)
+        for workers in args.workers:
+            result = await run_with_workers(args, standin, name, updates, workers)
+            rows.append((workers, name, result))
+            print(f"\n{name} ({workers} worker{'s' if workers > 1 else ''})")
+            print(f"  updates/sec:    {result['updates_per_sec']:.1f}")
+            print(f"  upstream calls: {result['upstream_calls']}")
+            print(f"  telegram calls: {sum(result['telegram_calls'].values())}")
+            if result['like_outcomes']:
+                print(f"  user errors:    {result['user_error_rate'] * 100:.1f}%")
+
+    print(f"\n{'workers':<10}{'scenario':<20}{'updates/s':>10}{'scaling':>9}")
+    baseline = {}
+    for workers, name, result in rows:
+        base = baseline.setdefault(name, result['updates_per_sec'])
+        print(f"{workers:<10}{name:<20}{result['updates_per_sec']:>10.1f}{result['updates_per_sec'] / base:>8.2f}x")
+
+async def run(args):
+    # Keep data files out of the working tree
+    workdir = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="em_loadtest_"))
+    logging.getLogger().setLevel(logging.WARNING)
+
+    standin = LikeApiStandIn(args.upstream_latency / 1000, args.upstream_jitter / 1000, args.error_rate)
+    await standin.start()
+    bot.LIKE_API_URL = standin.url
+    bot.UPSTREAM_TIMEOUT = args.upstream_timeout
+    if args.workers:
+        try:
+            await run_multi(args, standin)
+        finally:
+            await standin.stop()
+        return
+
+    fake_bot = FakeBot(args.telegram_latency / 1000)
+    bot.load_data()
+    application = bot.build_application(bot=fake_bot)
+    await application.initialize()
+    bot.message_cleaner.start(fake_bot)
+    factory = UpdateFactory(fake_bot)
+    rows = []
+    # Built up front so a recording's header includes the users they set up
+    scenario_updates = {name: SCENARIOS[name](factory, args.updates) for name in args.scenarios}
+    if args.record:
+        bot.traffic_recorder.start(os.path.join(workdir, args.record))
+
+    try:
+        for spec in args.faults:
+            bot.fault_injector.configure(spec)
+            for name, updates in scenario_updates.items():
+                result = await run_scenario(application, fake_bot, standin, updates, args.concurrency)
+                print_report(f"{name} (faults: {bot.fault_injector.describe()})", result)
+                rows.append((spec, name, result))
+        if len(rows) > 1:
+            print_summary(rows)
+    finally:
+        bot.fault_injector.configure("off")
+        bot.traffic_recorder.stop()
+        await bot.upstream.close()
+        await bot.message_cleaner.stop()
+        await application.shutdown()
+        await standin.stop()
+
+def parse_args(argv: list):
+    parser = argparse.ArgumentParser(description="End-to-end load test for the bot handlers")
+    parser.add_argument("scenarios", nargs="*", help=f"any of: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--updates", type=int, default=400, help="updates per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="updates processed at once")
+    parser.add_argument("--upstream-latency", type=float, default=200, help="like API latency (ms)")
+    parser.add_argument("--upstream-jitter", type=float, default=50, help="like API latency stddev (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of like API 500s")
+    parser.add_argument("--telegram-latency", type=float, default=0, help="fake Telegram API latency (ms)")
+    parser.add_argument("--faults", action="append", default=[], metavar="SPEC",
+                        help="upstream fault injection spec (repeatable)")
+    parser.add_argument("--fault-sweep", action="store_true", help="run under every fault preset and no faults")
+    parser.add_argument("--upstream-timeout", type=float, default=5, help="like API timeout (s)")
+    parser.add_argument("--record", metavar="PATH", help="record the run for replay.py (.jsonl.gz)")
+    parser.add_argument("--workers", type=int, nargs="+", metavar="N",
+                        help="worker process counts to compare (scale-out mode)")
+    parser.add_argument("--worker-of", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-result", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario: {name}")
+    if args.fault_sweep:
+        args.faults = ["off"] + list(bot.FaultInjector.PRESETS)
+    args.faults = args.faults or ["off"]
+    for spec in args.faults:
+        try:
+            bot.FaultInjector.parse(spec)
+        except ValueError as e:
+            parser.error(f"--faults {spec!r}: {e}")
+    return args
+
+if __name__ == "__main__":
+    arguments = parse_args(sys.argv[1:])
+    if arguments.worker_of:
+        asyncio.run(run_worker_process(arguments))
+    else:
+        asyncio.run(run(arguments))
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+EM OFFICIAL TEAM - Traffic replay
+Feeds a recording (from /record, TRAFFIC_RECORD_FILE or load_test.py --record)
+through one or more builds of the bot and compares them. Like API calls are
+answered from the recording and Telegram by the load test's fake bot, so runs
+need no network access and are repeatable.
+
+Usage: python replay.py RECORDING [--build FILE ...] [--speed X]
+
+--speed 1 keeps the recorded timing (including like API latency), 10 plays
+ten times faster and 0 (default) plays updates back to back with no upstream
+delay. Each build runs in its own process, e.g. to compare with the previous
+commit:
+    git show HEAD~1:"telegram_bot .py" > /tmp/previous_bot.py
+    python replay.py traffic.jsonl.gz --build /tmp/previous_bot.py --build "telegram_bot .py"
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import deque
+
+from aiohttp import web
+
+DEFAULT_BUILD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telegram_bot .py")
+
+def read_recording(path: str):
+    """Split a recording into its header, update records and upstream records"""
+    header, updates, upstream = None, [], []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record['kind'] == "header":
+                header = record
+            elif record['kind'] == "update":
+                updates.append(record)
+            elif record['kind'] == "upstream":
+                upstream.append(record)
+    if header is None:
+        raise ValueError(f"{path}: no header record")
+    return header, updates, upstream
+
+# ===============================
+# RECORDED LIKE API
+# ===============================
+
+class RecordedUpstream:
+    """Local HTTP server answering like API requests from a recording"""
+
+    def __init__(self, records: list, speed: float):
+        self.speed = speed
+        self.responses = {}  # (uid, region): deque of records, in recorded order
+        for record in records:
+            self.responses.setdefault((record['uid'], record['region']), deque()).append(record)
+        self.served = 0
+        self.missing = 0
+        self.runner = None
+        self.url = None
+
+    async def handle_like(self, request):
+        queue = self.responses.get((request.query.get('uid'), request.query.get('region')))
+        if not queue:
+            self.missing += 1
+            return web.Response(status=503, text="Not in recording")
+        record = queue.popleft()
+        self.served += 1
+        if self.speed:
+            await asyncio.sleep(record['duration'] / self.speed)
+        if 'error' in record:
+            return web.Response(status=504, text=record['error'])
+        return web.Response(status=record['status'], text=record['body'], content_type="application/json")
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/like", self.handle_like)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/like"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+# ===============================
+# WORKER (one build)
+# ===============================
+
+async def replay_build(recording: str, speed: float) -> dict:
+    """Replay a recording through the build named by BOT_FILE"""
+    import load_test
+    from telegram import Update
+    bot = load_test.bot
+    if not hasattr(bot, "build_application"):
+        raise SystemExit(f"{bot.__file__}: build has no build_application(), too old to replay")
+
+    header, update_records, upstream_records = read_recording(recording)
+
+    # Start from the recorded data file, outside the working tree
+    os.chdir(tempfile.mkdtemp(prefix="em_replay_"))
+    with open(bot.DATA_FILE, "w") as f:
+        json.dump(header['state'], f)
+    if hasattr(bot, "nepal_clock"):
+        # Daily usage is keyed by day; replay on the recorded one, whatever today is
+        bot.nepal_clock.today = header['date']
+        bot.nepal_clock.next_midnight = time.time() + 86400
+    bot.load_data()
+
+    writes = {'count': 0, 'bytes': 0}
+    original_save_data = bot.save_data
+    def counting_save_data():
+        original_save_data()
+        writes['count'] += 1
+        writes['bytes'] += os.path.getsize(bot.DATA_FILE)
+    bot.save_data = counting_save_data
+
+    standin = RecordedUpstream(upstream_records, speed)
+    await standin.start()
+    bot.LIKE_API_URL = standin.url
+
+    fake_bot = load_test.FakeBot()
+    application = bot.build_application(bot=fake_bot)
+    await application.initialize()
+    bot.message_cleaner.start(fake_bot)
+    fake_bot.reset()
+
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for record in update_records:
+            scheduled = start + record['t'] / speed if speed else time.perf_counter()
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await application.process_update(Update.de_json(record['update'], fake_bot))
+            latencies.append(time.perf_counter() - scheduled)
+        elapsed = time.perf_counter() - start
+    finally:
+        await bot.message_cleaner.stop()
+        if hasattr(bot, "upstream"):
+            await bot.upstream.close()
+        await application.shutdown()
+        await standin.stop()
+
+    return {
+        'build': bot.__file__,
+        'updates': len(latencies),
+        'elapsed_s': elapsed,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'p50_ms': load_test.percentile(latencies, 0.50) * 1000,
+        'p95_ms': load_test.percentile(latencies, 0.95) * 1000,
+        'p99_ms': load_test.percentile(latencies, 0.99) * 1000,
+        'telegram_calls': dict(fake_bot.calls),
+        'storage_writes': writes['count'],
+        'storage_bytes': writes['bytes'],
+        'upstream_served': standin.served,
+        'upstream_missing': standin.missing,
+    }
+
+# ===============================
+# COMPARISON
+# ===============================
+
+def run_build(build: str, args) -> dict:
+    """Replay in a fresh interpreter so builds never share module state"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as output:
+        output_path = output.name
+    env = dict(os.environ, BOT_FILE=os.path.abspath(build), METRICS_PORT="0",
+               LOG_FORMAT="text", TRAFFIC_RECORD_FILE="", UPSTREAM_FAULTS="")
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), args.recording, "--speed", str(args.speed),
+         "--worker-output", output_path],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"replay failed for {build}")
+    with open(output_path) as f:
+        result = json.load(f)
+    os.unlink(output_path)
+    return result
+
+def comparison_rows(results: list) -> list:
+    rows = [
+        ("updates", [r['updates'] for r in results]),
+        ("elapsed s", [r['elapsed_s'] for r in results]),
+        ("latency mean ms", [r['mean_ms'] for r in results]),
+        ("latency p50 ms", [r['p50_ms'] for r in results]),
+        ("latency p95 ms", [r['p95_ms'] for r in results]),
+        ("latency p99 ms", [r['p99_ms'] for r in results]),
+        ("telegram calls", [sum(r['telegram_calls'].values()) for r in results]),
+    ]
+    endpoints = sorted({endpoint for r in results for endpoint in r['telegram_calls']})
+    for endpoint in endpoints:
+        rows.append((f"  {endpoint}", [r['telegram_calls'].get(endpoint, 0) for r in results]))
+    rows += [
+        ("storage writes", [r['storage_writes'] for r in results]),
+        ("storage bytes", [r['storage_bytes'] for r in results]),
+        ("upstream served", [r['upstream_served'] for r in results]),
+        ("upstream missing", [r['upstream_missing'] for r in results]),
+    ]
+    return rows
+
+def print_comparison(results: list):
+    for index, result in enumerate(results):
+        print(f"[{index}] {result['build']}")
+    width = 14
+    heading = "".join(f"{f'[{index}]':>{width}}" for index in range(len(results)))
+    change = f"{'change':>{width}}" if len(results) > 1 else ""
+    print(f"\n{'':<20}{heading}{change}")
+    for label, values in comparison_rows(results):
+        cells = "".join(
+            f"{value:>{width}.2f}" if isinstance(value, float) else f"{value:>{width}}" for value in values
+        )
+        if len(values) > 1:
+            first, last = values[0], values[-1]
+            cells += f"{(last - first) / first * 100:>+{width - 1}.1f}%" if first else f"{'-':>{width}}"
+        print(f"{label:<20}{cells}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traffic through builds of the bot")
+    parser.add_argument("recording", help="recording file (.jsonl.gz)")
+    parser.add_argument("--build", action="append", default=[], metavar="FILE",
+                        help="bot source file to replay against (repeatable, default: this tree)")
+    parser.add_argument("--speed", type=float, default=0, help="playback speed (0 = back to back)")
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_output:
+        result = asyncio.run(replay_build(os.path.abspath(args.recording), args.speed))
+        with open(args.worker_output, "w") as f:
+            json.dump(result, f)
+        return
+
+    args.recording = os.path.abspath(args.recording)
+    print_comparison([run_build(build, args) for build in args.build or [DEFAULT_BUILD]])
+
+if __name__ == "__main__":
+    main()
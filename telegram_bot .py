@@ -5,21 +5,54 @@ Features: Auto-like system, Contact owner, Beautiful formatting
 Owner ID: 7731876768 (Unlimited Access)
 """
 
+import io
+import abc
 import os
+import csv
+import gzip
+import sys
 import json
+import queue
+import shutil
+import socket
+import sqlite3
+import atexit
+import math
+import time
+import string
+import heapq
+import hashlib
+import tempfile
+import random
 import asyncio
 import logging
+import logging.handlers
+import threading
+import concurrent.futures
+import contextvars
+import traceback
+import subprocess
+import tracemalloc
 import aiohttp
-from datetime import datetime
-from typing import Dict, Any, Optional
+import aiohttp.web
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
 import pytz
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
+from telegram.ext import Application, ApplicationHandlerStop, CommandHandler, CallbackQueryHandler, ChatMemberHandler, ContextTypes, MessageHandler, TypeHandler, filters
 from telegram.constants import ParseMode
-from functools import wraps
+from telegram.error import BadRequest, TelegramError
+from telegram.helpers import escape_markdown
+from functools import wraps, partial
+from collections import deque, OrderedDict
 from dotenv import load_dotenv  # Added
 
+try:
+    import psutil
+except ImportError:  # Optional: system metrics are skipped without it
+    psutil = None
+
 # ===============================
 # CONFIGURATION SECTION
 # ===============================
@@ -39,6 +72,9 @@ ALTERNATE_OWNER_ID = 1087968824  # Alternate owner ID (if using different accoun
 
 # API Configuration
 API_KEY = os.getenv("FREE_FIRE_API_KEY", "GREAT")  # Free Fire like API key
+LIKE_API_URL = os.getenv("LIKE_API_URL", "https://lordlike.onrender.com/like")
+UPSTREAM_TIMEOUT = 30  # Seconds before a like API request is abandoned
+UPSTREAM_FAULTS = os.getenv("UPSTREAM_FAULTS", "")  # Fault injection for resilience tests, e.g. "flapping"
 
 # Contact Information
 CONTACT_OWNER = "@Mahimahmud12"
@@ -54,42 +90,990 @@ VERIFICATION_LINKS = {
 
 # File paths
 DATA_FILE = "tg_data.json"
+PENDING_DELETIONS_FILE = "tg_pending_deletions.json"
+PENDING_DELETIONS_SAVE_INTERVAL = 5  # Seconds between saves of the pending deletions; also saved on stop
+
+# Auto-delete settings (seconds)
+UNAUTHORIZED_WARNING_TTL = 10  # Warning shown in unauthorized groups
+GROUP_NOTICE_TTL = 60  # Transient /like notices (usage errors, failures) in groups
+
+# Reply directly if the like API answers within this many seconds
+LIKE_FAST_REPLY_BUDGET = 1.5
+
+# Member notification settings
+NOTIFY_WINDOW_SECONDS = 5  # Buffer join/leave events per group for this long
+NOTIFY_DIGEST_THRESHOLD = 3  # More events than this in a window -> one digest
+NOTIFY_DIGEST_MAX_NAMES = 25  # Names listed per section in a digest
+NOTIFY_DIGEST_SECTION_CHARS = 1600  # Both sections together stay well under Telegram's 4096
+NOTIFY_NAME_MAX_CHARS = 64  # Longer names and titles are cut
+
+# System metrics sampler
+SYSTEM_SAMPLE_INTERVAL = 15  # Seconds between background samples
+SYSTEM_SAMPLE_HISTORY = 40  # Rolling window of samples kept in memory
+
+# Prometheus metrics endpoint (set METRICS_PORT=0 to disable)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Event loop watchdog
+WATCHDOG_INTERVAL = 0.1  # Heartbeat period (seconds)
+WATCHDOG_THRESHOLD = 0.25  # Report blocks longer than this (seconds)
+WATCHDOG_MAX_SITES = 50  # Distinct blocking call sites kept
+WATCHDOG_STACK_DEPTH = 12  # Frames captured per sample
+
+# On-demand profiling
+PROFILER_INTERVAL = 0.005  # Seconds between stack samples
+PROFILER_DEFAULT_SECONDS = 30
+PROFILER_MAX_SECONDS = 300
+TRACEMALLOC_FRAMES = 10  # Frames kept per allocation while tracing
+TRACEMALLOC_TOP = 30  # Entries per snapshot report
+
+# Logging pipeline
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_SAMPLE_RATES = {f"{__name__}.hot": 0.05}  # Logger name: fraction of INFO/DEBUG kept
+LOG_RATE_LIMIT = 20  # Records per message template...
+LOG_RATE_WINDOW = 60  # ...per this many seconds
+
+# Traffic recording for offline replay (see replay.py)
+TRAFFIC_RECORD_FILE = os.getenv("TRAFFIC_RECORD_FILE", "")  # Record from startup when set (.jsonl.gz)
+RECORD_VERBATIM_COMMANDS = {'like', 'player'}  # Region and game UID are needed to replay like API calls
+RECORD_ARG_COMMANDS = {  # Arguments kept as pseudonymised IDs and short keywords; other commands lose theirs
+    'setlimit', 'resetusage', 'tier', 'history', 'groupquota', 'analytics', 'export',
+    'profile', 'memsnap', 'faults', 'record', 'importlimits',
+}
+RECORD_ID_MIN = 100_000  # Numeric arguments this large are treated as IDs; smaller ones are limits
+RECORD_KEYWORD_MAX_CHARS = 16
+
+# Anti-flood limits: command or callback data -> (requests, per seconds, "notice" | "silent")
+FLOOD_USER_LIMITS = {
+    'default': (5, 20, "notice"),
+    'like': (4, 20, "notice"),
+    'start': (3, 30, "notice"),
+    'stats': (3, 30, "notice"),
+    'refresh_stats': (3, 30, "silent"),
+    'refresh_uptime': (3, 30, "silent"),
+    'refresh_commands': (3, 30, "silent"),
+}
+FLOOD_CHAT_LIMITS = {  # Per group, all members together
+    'default': (20, 20, "silent"),
+    'like': (15, 20, "notice"),
+}
+FLOOD_MAX_KEYS = 20000  # Limiter entries kept; idle ones are evicted first
+FLOOD_NOTICE_TTL = 10  # Cooldown notices are deleted after this long
+
+# Group quotas: /groupquota sets a daily budget and concurrency cap per allowed group
+GROUP_MAX_CONCURRENT = int(os.getenv("GROUP_MAX_CONCURRENT", "0"))  # Cap for groups without their own; 0 = none
+GROUP_SLOT_TTL = 120  # Scale-out: a worker's in-flight slots are freed this long after its last /like (must outlast one)
+GROUP_QUOTA_LIST_SIZE = 30  # Busiest groups shown by /groupquota
+
+# Button presses
+CALLBACK_DEBOUNCE_WINDOW = float(os.getenv("CALLBACK_DEBOUNCE_WINDOW", "2"))  # Repeat taps within this are ignored
+CALLBACK_DEBOUNCE_MAX_KEYS = 20000
+
+# Bulk limit import
+BULK_IMPORT_MAX_BYTES = 2_000_000  # Largest upload /importlimits and /resetusage will read
+BULK_PREVIEW_ROWS = 15  # Changes and errors listed in the preview
+
+# /export
+EXPORT_CHUNK_BYTES = 45_000_000  # Compressed size per document; bots may send up to 50 MB
+EXPORT_UPLOAD_TIMEOUT = 120
+
+# Group info cache (seconds)
+MEMBER_COUNT_TTL = 300  # Member counts served from memory for /members
+ADMIN_LIST_TTL = 600  # Administrator lists served from memory for /members
+
+# Player profiles seen in like API responses, for /player
+PLAYER_CACHE_SIZE = int(os.getenv("PLAYER_CACHE_SIZE", "10000"))
+PLAYER_CACHE_TTL = 6 * 3600  # Like counts move during the day; older profiles are dropped
+PLAYER_CACHE_FILE = os.getenv("PLAYER_CACHE_FILE", "")  # Kept across restarts when set
+
+# Like history (/history)
+LIKE_HISTORY_FILE = os.getenv("LIKE_HISTORY_FILE", "like_history.db")
+LIKE_HISTORY_FLUSH_INTERVAL = 2  # Seconds between batched writes
+LIKE_HISTORY_BATCH_SIZE = 200  # A full batch is written right away
+LIKE_HISTORY_RETENTION_DAYS = int(os.getenv("LIKE_HISTORY_RETENTION_DAYS", "30"))
+LIKE_HISTORY_PRUNE_INTERVAL = 3600
+HISTORY_PAGE_SIZE = 10
+HISTORY_UID_MAX_LENGTH = 20  # Keeps page buttons within Telegram's 64-byte callback data
+
+# Scale-out mode: workers share state through STATE_STORE (see run_workers)
+STATE_STORE = os.getenv("STATE_STORE", "")  # "" = this process only, or "sqlite:<path>"
+WORKERS = int(os.getenv("WORKERS", "1"))  # Worker processes started by main()
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))  # Updates each worker handles at once
+LEASE_TTL = 15  # Seconds a singleton duty stays with a worker that stopped renewing
+LEASE_RENEW_INTERVAL = 5
+INTAKE_POLL_TIMEOUT = 5  # getUpdates long-poll; must stay below LEASE_TTL
+SHARED_QUEUE_POLL_INTERVAL = 0.05  # Idle workers check the shared update queue this often
+STORE_MAINTENANCE_INTERVAL = 300
+CHANGE_LOG_RETENTION = 3600  # Workers further behind than this reload everything
+QUOTA_LEASE_SLICE = int(os.getenv("QUOTA_LEASE_SLICE", "5"))  # Likes leased per user at once; 0 = store round trip per /like
+QUOTA_LEASE_TTL = 60  # Seconds a worker serves a leased slice before returning it
+QUOTA_LEASE_GRACE = 15  # Extra seconds before the store treats an unreturned slice as fully used
+WORKER_RESTART_DELAY = 1  # Seconds before restarting a worker that exited; doubles after each fast exit
+WORKER_RESTART_MAX_DELAY = 60
+WORKER_FAST_EXIT = 30  # A worker that exits sooner than this counts as a failed start
+WORKER_MAX_FAST_EXITS = 5  # Fast exits in a row before run_workers gives up
+STATE_SYNC_INTERVAL = float(os.getenv("STATE_SYNC_INTERVAL", "0.5"))  # Seconds between catching up with other workers
+STORE_BUSY_TIMEOUT = float(os.getenv("STORE_BUSY_TIMEOUT", "0.5"))  # Seconds a store call waits for another worker's write lock
+if STATE_STORE:
+    # Files and ports that must not be shared between workers
+    PENDING_DELETIONS_FILE = f"tg_pending_deletions.{WORKER_ID}.json"
+    if PLAYER_CACHE_FILE:
+        PLAYER_CACHE_FILE = f"{PLAYER_CACHE_FILE}.{WORKER_ID}"
+    if METRICS_PORT:
+        METRICS_PORT += WORKER_ID
 
 # Global data storage
-user_limits = {}  # user_id: limit
+user_limits = {}  # user_id: limit (overrides any tier)
+user_tiers = {}  # user_id: tier_id
 user_usage = {}   # user_id: {date: count}
+usage_today = {}  # user_id: count for nepal_clock.today (live view of user_usage)
 user_verification = {}  # user_id: {verified: bool, platforms: []}
-allowed_groups = {}  # group_id: group_info
+allowed_groups = {}  # group_id: group_info (with optional 'tier', 'daily_budget' and 'max_concurrent')
+group_usage = {}  # group_id: {date: count}, likes members sent through the group
+group_usage_today = {}  # group_id: count for nepal_clock.today (live view of group_usage)
+group_in_flight = {}  # group_id: /like calls running in this process (the shared cap is kept in the store)
 default_limit = 2
 
+# Limit tiers; users and groups store only the ID, so changing a tier's limit is one write
+UNLIMITED_LIMIT = 999999
+DEFAULT_TIER = 0
+DEFAULT_TIERS = {
+    DEFAULT_TIER: {'name': "default", 'limit': default_limit},
+    1: {'name': "member", 'limit': int(os.getenv("MEMBER_TIER_LIMIT", "5"))},
+    2: {'name': "vip", 'limit': int(os.getenv("VIP_TIER_LIMIT", "10"))},
+    3: {'name': "unlimited", 'limit': UNLIMITED_LIMIT},
+}
+limit_tiers = {tier_id: dict(tier) for tier_id, tier in DEFAULT_TIERS.items()}  # tier_id: {name, limit}
+
 # ===============================
 # LOGGING SETUP
 # ===============================
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Correlation ID of the update being handled (set by @instrumented)
+log_correlation_id = contextvars.ContextVar("log_correlation_id", default="-")
+
+class CorrelationFilter(logging.Filter):
+    """Attach the current update's correlation ID to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = log_correlation_id.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records per logger; warnings always pass"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self.seen = {}  # logger name: records seen
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.name)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        count = self.seen.get(record.name, 0)
+        self.seen[record.name] = count + 1
+        return rate > 0 and count % max(1, round(1 / rate)) == 0
+
+class RateLimitFilter(logging.Filter):
+    """Allow at most `limit` records per message template per window"""
+
+    def __init__(self, limit: int, window: float, max_keys: int = 1000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.buckets = {}  # (logger, template): [window start, count, suppressed]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None or now - bucket[0] >= self.window:
+            if bucket and bucket[2]:
+                record.suppressed = bucket[2]
+            if bucket is None and len(self.buckets) >= self.max_keys:
+                self.buckets.clear()
+            self.buckets[key] = [now, 1, 0]
+            return True
+        if bucket[1] < self.limit:
+            bucket[1] += 1
+            return True
+        bucket[2] += 1
+        return False
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', '-'),
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as-is; message formatting happens on the writer thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves this process, so nothing needs pickling
+        return record
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background thread"""
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s')
+    output = logging.StreamHandler()
+    output.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    # Filters run on the calling thread so dropped records are never queued
+    queue_handler.addFilter(CorrelationFilter())
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+    queue_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_WINDOW))
+    
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(logging.INFO)
+    
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
 logger = logging.getLogger(__name__)
+# Chatty per-command messages; sampled via LOG_SAMPLE_RATES
+hot_logger = logging.getLogger(f"{__name__}.hot")
 
 # Set httpx logging to WARNING to prevent token exposure in logs
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("telegram").setLevel(logging.WARNING)
 
+# ===============================
+# SHARED STATE STORE
+# ===============================
+
+class StateStore(abc.ABC):
+    """State shared by scale-out workers; subclasses implement one backend
+    
+    Workers keep the usual module globals as a local copy. Every write is
+    appended to a change log that the others replay with changes_since().
+    """
+    
+    @abc.abstractmethod
+    def import_state(self, state: dict):
+        """Replace everything with a data-file shaped dict"""
+    
+    @abc.abstractmethod
+    def is_empty(self) -> bool:
+        pass
+    
+    @abc.abstractmethod
+    def load(self) -> Tuple[int, dict]:
+        """Full state and the change log position it reflects"""
+    
+    @abc.abstractmethod
+    def changes_since(self, seq: int) -> Tuple[int, Optional[list]]:
+        """[(table, key, value)] written after seq; None if seq was pruned (reload)"""
+    
+    @abc.abstractmethod
+    def put(self, table: str, key: int, value) -> int:
+        """Upsert one entry (value None deletes it); the change log position after it"""
+    
+    @abc.abstractmethod
+    def put_many(self, changes: list) -> int:
+        """Apply (table, key, value) puts all at once; the change log position after them"""
+    
+    @abc.abstractmethod
+    def reset_usage(self, user_ids: list, day: str):
+        """Zero several users' counts for a day in one step"""
+    
+    @abc.abstractmethod
+    def reserve_usage(self, key: int, day: str, limit: float, table: str = 'user_usage') -> Optional[int]:
+        """Atomically count one use unless the limit is reached; new count or None
+        
+        table is 'user_usage' (key is a user ID) or 'group_usage' (a group ID).
+        """
+    
+    @abc.abstractmethod
+    def release_usage(self, key: int, day: str, table: str = 'user_usage') -> int:
+        pass
+    
+    @abc.abstractmethod
+    def lease_quota(self, user_id: int, day: str, limit: int, want: int, owner: str, ttl: float) -> int:
+        """Reserve up to `want` uses for one owner; how many were granted (0 at the limit)"""
+    
+    @abc.abstractmethod
+    def settle_quota(self, user_id: int, day: str, owner: str, used: int) -> int:
+        """Count `used` uses of a lease and free the rest; the new usage count"""
+    
+    @abc.abstractmethod
+    def take_group_slot(self, group_id: int, day: str, cap: int, budget: float,
+                        owner: str, ttl: float) -> Tuple[Optional[str], int]:
+        """Atomically take one of a group's `cap` in-flight slots (0 = no cap) and one like from its budget
+        
+        Returns (refusal, today's group usage); refusal is None, 'busy' or
+        'budget'. Slots are counted across all owners; an owner's slots
+        expire `ttl` seconds after it last took one.
+        """
+    
+    @abc.abstractmethod
+    def free_group_slot(self, group_id: int, day: str, owner: str, refund: bool) -> Optional[int]:
+        """Give a slot back, and with refund its like too; the new group usage if refunded"""
+    
+    @abc.abstractmethod
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew a lease; False while another owner holds it"""
+    
+    @abc.abstractmethod
+    def release_lease(self, name: str, owner: str):
+        pass
+    
+    @abc.abstractmethod
+    def enqueue_updates(self, payloads: list, next_offset: Optional[int]):
+        """Queue raw updates and record the getUpdates offset in one step"""
+    
+    @abc.abstractmethod
+    def claim_update(self) -> Optional[dict]:
+        pass
+    
+    @abc.abstractmethod
+    def get_meta(self, key: str) -> Optional[str]:
+        pass
+    
+    @abc.abstractmethod
+    def set_meta(self, key: str, value: str):
+        pass
+    
+    @abc.abstractmethod
+    def prune_changes(self, older_than: float):
+        pass
+    
+    @abc.abstractmethod
+    def snapshot_rows(self):
+        """Iterate (table, key, value) over one consistent read; may run in another thread"""
+    
+    def close(self):
+        pass
+
+class SqliteStateStore(StateStore):
+    """StateStore in one SQLite file in WAL mode (workers on the same host)"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS state (tbl TEXT, key INTEGER, value TEXT NOT NULL, PRIMARY KEY (tbl, key));
+        CREATE TABLE IF NOT EXISTS usage (user_id INTEGER, day TEXT, count INTEGER NOT NULL, PRIMARY KEY (user_id, day));
+        CREATE TABLE IF NOT EXISTS group_usage (group_id INTEGER, day TEXT, count INTEGER NOT NULL, PRIMARY KEY (group_id, day));
+        CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, tbl TEXT, key INTEGER, value TEXT, created REAL);
+        CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT, expires REAL);
+        CREATE TABLE IF NOT EXISTS updates (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS quota_leases (user_id INTEGER, day TEXT, owner TEXT, granted INTEGER, expires REAL,
+                                                 PRIMARY KEY (user_id, day, owner));
+        CREATE TABLE IF NOT EXISTS group_slots (group_id INTEGER, owner TEXT, running INTEGER NOT NULL, expires REAL,
+                                                PRIMARY KEY (group_id, owner));
+    """
+    USAGE_TABLES = {'user_usage': ("usage", "user_id"), 'group_usage': ("group_usage", "group_id")}
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+        self.connections = []
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+    
+    @property
+    def db(self) -> sqlite3.Connection:
+        # One connection per thread: calls from the event loop and the store thread never share a transaction
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, isolation_level=None, timeout=STORE_BUSY_TIMEOUT, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            self.connections.append(db)
+        return db
+    
+    def _log(self, table: str, key: int, value) -> int:
+        return self.db.execute(
+            "INSERT INTO changes (tbl, key, value, created) VALUES (?, ?, ?, ?)",
+            (table, key, None if value is None else json.dumps(value), time.time())).lastrowid
+    
+    def import_state(self, state: dict):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute("DELETE FROM state")
+            self.db.execute("DELETE FROM usage")
+            self.db.execute("DELETE FROM group_usage")
+            for table in ('user_limits', 'user_verification', 'allowed_groups', 'limit_tiers', 'user_tiers'):
+                self.db.executemany(
+                    "INSERT INTO state (tbl, key, value) VALUES (?, ?, ?)",
+                    [(table, int(key), json.dumps(value)) for key, value in state.get(table, {}).items()])
+            self.db.executemany(
+                "INSERT INTO usage (user_id, day, count) VALUES (?, ?, ?)",
+                [(int(user_id), day, count)
+                 for user_id, days in state.get('user_usage', {}).items() for day, count in days.items()])
+            self.db.executemany(
+                "INSERT INTO group_usage (group_id, day, count) VALUES (?, ?, ?)",
+                [(int(group_id), day, count)
+                 for group_id, days in state.get('group_usage', {}).items() for day, count in days.items()])
+            # Everyone's copy is stale now; an empty log position forces a reload
+            self.db.execute("DELETE FROM changes")
+            self._log('reload', 0, None)
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def is_empty(self) -> bool:
+        return self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM state) AND NOT EXISTS (SELECT 1 FROM usage)").fetchone()[0]
+    
+    def load(self) -> Tuple[int, dict]:
+        self.db.execute("BEGIN")
+        try:
+            seq = self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+            state = {'user_limits': {}, 'user_verification': {}, 'allowed_groups': {}, 'user_usage': {},
+                     'limit_tiers': {}, 'user_tiers': {}, 'group_usage': {}}
+            for table, key, value in self.db.execute("SELECT tbl, key, value FROM state"):
+                state[table][key] = json.loads(value)
+            for user_id, day, count in self.db.execute("SELECT user_id, day, count FROM usage"):
+                state['user_usage'].setdefault(user_id, {})[day] = count
+            for group_id, day, count in self.db.execute("SELECT group_id, day, count FROM group_usage"):
+                state['group_usage'].setdefault(group_id, {})[day] = count
+        finally:
+            self.db.execute("COMMIT")
+        return seq, state
+    
+    def snapshot_rows(self):
+        # Own connection: a WAL read transaction sees one snapshot and never blocks writers
+        db = sqlite3.connect(self.path, isolation_level=None, timeout=STORE_BUSY_TIMEOUT)
+        try:
+            db.execute("BEGIN")
+            for table, key, value in db.execute("SELECT tbl, key, value FROM state ORDER BY tbl, key"):
+                yield table, key, json.loads(value)
+            for user_id, day, count in db.execute("SELECT user_id, day, count FROM usage ORDER BY user_id, day"):
+                yield 'user_usage', user_id, [day, count]
+            for group_id, day, count in db.execute("SELECT group_id, day, count FROM group_usage ORDER BY group_id, day"):
+                yield 'group_usage', group_id, [day, count]
+            db.execute("COMMIT")
+        finally:
+            db.close()
+    
+    def changes_since(self, seq: int) -> Tuple[int, Optional[list]]:
+        rows = self.db.execute("SELECT seq, tbl, key, value FROM changes WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+        if not rows:
+            return seq, []
+        if rows[0][0] != seq + 1 or any(row[1] == 'reload' for row in rows):
+            # Gap: pruned entries or a fresh import
+            return rows[-1][0], None
+        return rows[-1][0], [(table, key, None if value is None else json.loads(value)) for _, table, key, value in rows]
+    
+    def _put(self, table: str, key: int, value):
+        if value is None:
+            self.db.execute("DELETE FROM state WHERE tbl = ? AND key = ?", (table, key))
+        else:
+            self.db.execute(
+                "INSERT INTO state (tbl, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (tbl, key) DO UPDATE SET value = excluded.value",
+                (table, key, json.dumps(value)))
+        return self._log(table, key, value)
+    
+    def put(self, table: str, key: int, value) -> int:
+        return self.put_many([(table, key, value)])
+    
+    def put_many(self, changes: list) -> int:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            seq = 0
+            for table, key, value in changes:
+                seq = self._put(table, key, value)
+            self.db.execute("COMMIT")
+            return seq
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def reset_usage(self, user_ids: list, day: str):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for user_id in user_ids:
+                self._set_usage(user_id, day, 0)
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def _set_usage(self, key: int, day: str, count: int, table: str = 'user_usage'):
+        sql_table, column = self.USAGE_TABLES[table]
+        self.db.execute(
+            f"INSERT INTO {sql_table} ({column}, day, count) VALUES (?, ?, ?) "
+            f"ON CONFLICT ({column}, day) DO UPDATE SET count = excluded.count",
+            (key, day, count))
+        self._log(table, key, [day, count])
+    
+    def reserve_usage(self, key: int, day: str, limit: float, table: str = 'user_usage') -> Optional[int]:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._usage_count(key, day, table) + 1
+            if count > limit:
+                self.db.execute("ROLLBACK")
+                return None
+            self._set_usage(key, day, count, table)
+            self.db.execute("COMMIT")
+            return count
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def release_usage(self, key: int, day: str, table: str = 'user_usage') -> int:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            count = max(0, self._usage_count(key, day, table) - 1)
+            self._set_usage(key, day, count, table)
+            self.db.execute("COMMIT")
+            return count
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def _usage_count(self, key: int, day: str, table: str = 'user_usage') -> int:
+        sql_table, column = self.USAGE_TABLES[table]
+        row = self.db.execute(f"SELECT count FROM {sql_table} WHERE {column} = ? AND day = ?", (key, day)).fetchone()
+        return row[0] if row else 0
+    
+    def lease_quota(self, user_id: int, day: str, limit: int, want: int, owner: str, ttl: float) -> int:
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._usage_count(user_id, day)
+            # A slice its owner never returned may have been served in full
+            expired = self.db.execute(
+                "SELECT COALESCE(SUM(granted), 0) FROM quota_leases WHERE user_id = ? AND day = ? AND expires < ?",
+                (user_id, day, now)).fetchone()[0]
+            if expired:
+                self.db.execute("DELETE FROM quota_leases WHERE user_id = ? AND day = ? AND expires < ?",
+                                (user_id, day, now))
+                count += expired
+                self._set_usage(user_id, day, count)
+            held = self.db.execute(
+                "SELECT COALESCE(SUM(granted), 0) FROM quota_leases WHERE user_id = ? AND day = ?",
+                (user_id, day)).fetchone()[0]
+            granted = min(want, limit - count - held)
+            if granted > 0:
+                self.db.execute(
+                    "INSERT INTO quota_leases (user_id, day, owner, granted, expires) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, day, owner) DO UPDATE SET "
+                    "granted = granted + excluded.granted, expires = excluded.expires",
+                    (user_id, day, owner, granted, now + ttl))
+            self.db.execute("COMMIT")
+            return max(0, granted)
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def settle_quota(self, user_id: int, day: str, owner: str, used: int) -> int:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._usage_count(user_id, day)
+            deleted = self.db.execute(
+                "DELETE FROM quota_leases WHERE user_id = ? AND day = ? AND owner = ?", (user_id, day, owner)).rowcount
+            # No row: it expired and was already counted in full
+            if deleted and used:
+                count += used
+                self._set_usage(user_id, day, count)
+            self.db.execute("COMMIT")
+            return count
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def take_group_slot(self, group_id: int, day: str, cap: int, budget: float,
+                        owner: str, ttl: float) -> Tuple[Optional[str], int]:
+        now = time.time()
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            # Slots of a worker that died or stopped renewing
+            self.db.execute("DELETE FROM group_slots WHERE group_id = ? AND expires < ?", (group_id, now))
+            count = self._usage_count(group_id, day, 'group_usage')
+            refusal = None
+            if cap and self.db.execute(
+                    "SELECT COALESCE(SUM(running), 0) FROM group_slots WHERE group_id = ?", (group_id,)).fetchone()[0] >= cap:
+                refusal = 'busy'
+            elif count + 1 > budget:
+                refusal = 'budget'
+            else:
+                count += 1
+                self._set_usage(group_id, day, count, 'group_usage')
+                self.db.execute(
+                    "INSERT INTO group_slots (group_id, owner, running, expires) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (group_id, owner) DO UPDATE SET running = running + 1, expires = excluded.expires",
+                    (group_id, owner, now + ttl))
+            self.db.execute("COMMIT")
+            return refusal, count
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def free_group_slot(self, group_id: int, day: str, owner: str, refund: bool) -> Optional[int]:
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.execute(
+                "UPDATE group_slots SET running = running - 1 WHERE group_id = ? AND owner = ?", (group_id, owner))
+            self.db.execute("DELETE FROM group_slots WHERE group_id = ? AND owner = ? AND running <= 0", (group_id, owner))
+            count = None
+            if refund:
+                count = max(0, self._usage_count(group_id, day, 'group_usage') - 1)
+                self._set_usage(group_id, day, count, 'group_usage')
+            self.db.execute("COMMIT")
+            return count
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self.db.execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+            (name, owner, now + ttl, now))
+        return cursor.rowcount == 1
+    
+    def release_lease(self, name: str, owner: str):
+        self.db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+    
+    def enqueue_updates(self, payloads: list, next_offset: Optional[int]):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.db.executemany("INSERT INTO updates (payload) VALUES (?)",
+                                [(json.dumps(payload, separators=(",", ":")),) for payload in payloads])
+            if next_offset is not None:
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('update_offset', ?)", (str(next_offset),))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+    
+    def claim_update(self) -> Optional[dict]:
+        # Removed on claim: an update is handled at most once, even if its worker dies
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT id, payload FROM updates ORDER BY id LIMIT 1").fetchone()
+            if row:
+                self.db.execute("DELETE FROM updates WHERE id = ?", (row[0],))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return json.loads(row[1]) if row else None
+    
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def set_meta(self, key: str, value: str):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+    
+    def prune_changes(self, older_than: float):
+        self.db.execute("DELETE FROM changes WHERE created < ? AND seq < (SELECT MAX(seq) FROM changes)", (older_than,))
+    
+    def close(self):
+        for db in self.connections:
+            db.close()
+        self.connections = []
+        self.local = threading.local()
+
+state_store: Optional[StateStore] = None
+state_seq = 0  # Change log position the local copy reflects
+store_owner = f"{socket.gethostname()}:{os.getpid()}"  # This worker's rows in the store (group slots)
+# Store calls on the update path run here, one at a time and in order, instead of blocking the event loop
+store_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-store")
+
+async def in_store_thread(function, *args):
+    """Run a blocking state_store call on the store thread"""
+    return await asyncio.get_running_loop().run_in_executor(store_executor, function, *args)
+
+def open_state_store(url: str) -> StateStore:
+    """Connect to STATE_STORE; the first worker imports an existing data file"""
+    global state_store
+    if not url.startswith("sqlite:"):
+        raise ValueError(f"Unsupported STATE_STORE: {url}")
+    state_store = SqliteStateStore(url[len("sqlite:"):])
+    if state_store.is_empty() and os.path.exists(DATA_FILE):
+        with open(DATA_FILE, 'r') as f:
+            state_store.import_state(json.load(f))
+        logger.info("Imported %s into the shared store", DATA_FILE)
+    return state_store
+
+class QuotaLeases:
+    """Slices of users' daily quota leased from the shared store and served from memory
+    
+    The store counts every outstanding slice against the limit, so workers
+    together can never go over it. Unused likes go back when a slice is
+    returned: on expiry, shutdown, rollover or a limit change.
+    """
+    
+    def __init__(self, slice_size: int, ttl: float, grace: float):
+        self.slice_size = slice_size  # 0 disables leasing
+        self.ttl = ttl
+        self.grace = grace
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.leases = {}  # user_id: [day, granted, used, expires]
+        self.settling = {}  # (user_id, day): likes in slices returned but not yet counted by the store
+        self.pending = set()  # Store calls returning slices
+        self.task = None
+    
+    def used(self, user_id: int, day: str) -> int:
+        """Likes served from this worker's slice and not yet in the store"""
+        lease = self.leases.get(user_id)
+        return (lease[2] if lease and lease[0] == day else 0) + self.settling.get((user_id, day), 0)
+    
+    async def reserve(self, user_id: int, day: str, limit: int) -> bool:
+        lease = self.leases.get(user_id)
+        if lease and lease[0] == day and lease[2] < lease[1] and time.time() < lease[3]:
+            lease[2] += 1
+            return True
+        if lease:
+            self.settle(user_id)
+        want = max(1, min(self.slice_size, limit - usage_today.get(user_id, 0)))
+        granted = await in_store_thread(
+            state_store.lease_quota, user_id, day, limit, want, self.owner, self.ttl + self.grace)
+        lease = self.leases.get(user_id)
+        if lease and lease[0] == day:
+            # Another /like leased while we waited; the store added both grants to one lease row,
+            # so even with nothing granted here that slice may have room
+            lease[1] += granted
+            if granted:
+                lease[3] = time.time() + self.ttl
+            if lease[2] >= lease[1] or time.time() >= lease[3]:
+                return False
+            lease[2] += 1
+            return True
+        if not granted:
+            return False
+        self.leases[user_id] = [day, granted, 1, time.time() + self.ttl]
+        return True
+    
+    async def release(self, user_id: int, day: str):
+        lease = self.leases.get(user_id)
+        if lease and lease[0] == day and lease[2] > 0:
+            lease[2] -= 1
+            return
+        # The slice was already returned with this like counted (a concurrent /like, expiry, rollover)
+        count = await in_store_thread(state_store.release_usage, user_id, day)
+        if day == nepal_clock.today:
+            _set_usage_today(user_id, day, count)
+    
+    def settle(self, user_id: int):
+        """Return a slice, keeping the likes it served
+        
+        The store call is queued on the store thread without waiting for it;
+        any store call made later runs after it.
+        """
+        lease = self.leases.pop(user_id, None)
+        if lease is None:
+            return
+        day, _, used, _ = lease
+        self.settling[(user_id, day)] = self.settling.get((user_id, day), 0) + used
+        future = asyncio.get_running_loop().run_in_executor(
+            store_executor, state_store.settle_quota, user_id, day, self.owner, used)
+        self.pending.add(future)
+        future.add_done_callback(partial(self._settled, user_id, day, used))
+    
+    def _settled(self, user_id: int, day: str, used: int, future: asyncio.Future):
+        self.pending.discard(future)
+        remaining = self.settling.pop((user_id, day)) - used
+        if remaining:
+            self.settling[(user_id, day)] = remaining
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            # The store counts the slice in full once it expires
+            logger.error("Error returning quota lease for %s: %s", user_id, future.exception())
+            return
+        if day == nepal_clock.today:
+            _set_usage_today(user_id, day, future.result())
+    
+    def settle_where(self, predicate):
+        for user_id in [user_id for user_id, lease in self.leases.items() if predicate(lease)]:
+            self.settle(user_id)
+    
+    def settle_all(self):
+        self.settle_where(lambda lease: True)
+    
+    async def flush(self):
+        """Wait until the store has counted every returned slice"""
+        if self.pending:
+            await asyncio.gather(*self.pending, return_exceptions=True)
+    
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if state_store is not None:
+            self.settle_all()
+            await self.flush()
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.grace / 3)
+            now = time.time()
+            self.settle_where(lambda lease: now >= lease[3])
+
+quota_leases = QuotaLeases(QUOTA_LEASE_SLICE, QUOTA_LEASE_TTL, QUOTA_LEASE_GRACE)
+
 # ===============================
 # UTILITY FUNCTIONS
 # ===============================
 
+NEPAL_TZ = pytz.timezone("Asia/Kathmandu")
+
+class NepalClock:
+    """Nepal time with the day key cached until the next midnight"""
+
+    def __init__(self, tz):
+        self.tz = tz
+        self.today = ""  # "YYYY-MM-DD", the daily quota key
+        self.next_midnight = 0.0  # Epoch seconds of the next rollover
+        self.listeners = []  # callback(old_day, new_day)
+        self.fields_second = None
+        self.fields = {}
+        self.task = None
+        self._advance()
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def _advance(self):
+        current = self.now()
+        self.today = current.strftime("%Y-%m-%d")
+        midnight = self.tz.localize(datetime(current.year, current.month, current.day) + timedelta(days=1))
+        self.next_midnight = midnight.timestamp()
+
+    def today_key(self) -> str:
+        if time.time() >= self.next_midnight:
+            self.rollover()
+        return self.today
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, self.next_midnight - time.time())
+
+    def time_fields(self) -> Dict[str, str]:
+        """Template date/time fields, formatted at most once per second"""
+        second = int(time.time())
+        if second != self.fields_second:
+            self.fields = time_fields(self.now())
+            self.fields_second = second
+        return self.fields
+
+    def on_rollover(self, callback):
+        self.listeners.append(callback)
+
+    def rollover(self):
+        old_day = self.today
+        self._advance()
+        if self.today == old_day:
+            return
+        logger.info("Day rollover: %s -> %s", old_day, self.today)
+        for callback in self.listeners:
+            try:
+                callback(old_day, self.today)
+            except Exception as e:
+                logger.error("Error in rollover callback %s: %s", getattr(callback, "__name__", callback), e)
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        # Fires the event on time even when no handler asks for today_key()
+        while True:
+            await asyncio.sleep(self.seconds_until_reset() + 0.05)
+            self.today_key()
+
+nepal_clock = NepalClock(NEPAL_TZ)
+
 def get_nepal_time():
     """Get current Nepal time"""
-    tz = pytz.timezone("Asia/Kathmandu")
-    return datetime.now(tz)
+    return nepal_clock.now()
+
+def format_duration(seconds: float) -> str:
+    """Compact "5h 12m" style duration"""
+    minutes = int(seconds) // 60
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours else f"{minutes}m"
+
+class BotStats:
+    """Bot-wide counters kept up to date on every mutation"""
+
+    def __init__(self):
+        self.known_users = set()  # Every user in user_limits, user_usage or user_verification
+        self.verified_users = 0
+        self.custom_limits = 0  # Limits that differ from default_limit
+
+    def rebuild(self):
+        """Full recount; only needed after loading data"""
+        self.known_users = set(user_limits) | set(user_usage) | set(user_verification)
+        self.verified_users = sum(1 for v in user_verification.values() if v.get('verified', False))
+        self.custom_limits = sum(1 for lim in user_limits.values() if lim != default_limit)
+
+    def user_seen(self, user_id: int):
+        self.known_users.add(user_id)
+
+    def verification_changed(self, was_verified: bool, is_verified: bool):
+        self.verified_users += int(is_verified) - int(was_verified)
+
+    def limit_changed(self, old_limit: Optional[int], new_limit: int):
+        was_custom = old_limit is not None and old_limit != default_limit
+        self.custom_limits += int(new_limit != default_limit) - int(was_custom)
+
+bot_stats = BotStats()
+
+def default_tiers() -> dict:
+    return {tier_id: dict(tier) for tier_id, tier in DEFAULT_TIERS.items()}
 
 def load_data():
-    """Load data from JSON file"""
-    global user_limits, user_usage, user_verification, allowed_groups
+    """Load data from JSON file (or the shared store in scale-out mode)"""
+    global user_limits, user_usage, usage_today, user_verification, allowed_groups, state_seq
+    global user_tiers, limit_tiers, group_usage, group_usage_today
     try:
-        if os.path.exists(DATA_FILE):
+        if state_store is not None:
+            state_seq, data = state_store.load()
+            user_limits = data['user_limits']
+            user_usage = data['user_usage']
+            user_verification = data['user_verification']
+            allowed_groups = data['allowed_groups']
+            user_tiers = data['user_tiers']
+            limit_tiers = {**default_tiers(), **data['limit_tiers']}
+            group_usage = data['group_usage']
+            logger.info("Data loaded from shared store")
+        elif os.path.exists(DATA_FILE):
             with open(DATA_FILE, 'r') as f:
                 data = json.load(f)
                 user_limits = data.get('user_limits', {})
@@ -102,33 +1086,122 @@ def load_data():
                 user_verification = {int(k): v for k, v in user_verification.items()}
                 # Convert string group IDs back to integers  
                 allowed_groups = {int(k): v for k, v in allowed_groups.items()}
+                user_tiers = {int(k): v for k, v in data.get('user_tiers', {}).items()}
+                limit_tiers = {**default_tiers(), **{int(k): v for k, v in data.get('limit_tiers', {}).items()}}
+                group_usage = {int(k): v for k, v in data.get('group_usage', {}).items()}
                 logger.info("Data loaded successfully")
     except Exception as e:
-        logger.error(f"Error loading data: {e}")
+        logger.error("Error loading data: %s", e)
         user_limits = {}
         user_usage = {}
         user_verification = {}
         allowed_groups = {}
+        user_tiers = {}
+        limit_tiers = default_tiers()
+        group_usage = {}
+    today = nepal_clock.today_key()
+    usage_today = {user_id: days[today] for user_id, days in user_usage.items() if today in days}
+    group_usage_today = {group_id: days[today] for group_id, days in group_usage.items() if today in days}
+    bot_stats.rebuild()
 
 def save_data():
     """Save data to JSON file"""
+    start = time.perf_counter()
     try:
         data = {
             'user_limits': user_limits,
             'user_usage': user_usage,
             'user_verification': user_verification,
-            'allowed_groups': allowed_groups
+            'allowed_groups': allowed_groups,
+            'user_tiers': user_tiers,
+            'limit_tiers': limit_tiers,
+            'group_usage': group_usage
         }
-        with open(DATA_FILE, 'w') as f:
+        # Write a temp file and swap it in, so a crash never leaves half a file
+        with open(DATA_FILE + ".tmp", 'w') as f:
             json.dump(data, f, indent=2)
-        logger.info("Data saved successfully")
+        os.replace(DATA_FILE + ".tmp", DATA_FILE)
+        hot_logger.info("Data saved successfully")
     except Exception as e:
-        logger.error(f"Error saving data: {e}")
+        logger.error("Error saving data: %s", e)
+    save_duration.observe(time.perf_counter() - start)
+
+async def persist(table: str, key: int, value):
+    """Record one change: shared store in scale-out mode, else rewrite the data file"""
+    if state_store is not None:
+        advance_state_seq(await in_store_thread(state_store.put, table, key, value), 1)
+    else:
+        save_data()
+
+def apply_state_change(table: str, key: int, value):
+    """Apply a change another worker made to the local copy"""
+    if table == 'user_limits':
+        if key in quota_leases.leases:
+            quota_leases.settle(key)
+        bot_stats.user_seen(key)
+        if value is None:
+            bot_stats.limit_changed(user_limits.pop(key, None), default_limit)
+        else:
+            bot_stats.limit_changed(user_limits.get(key), value)
+            user_limits[key] = value
+    elif table == 'user_verification':
+        bot_stats.user_seen(key)
+        was_verified = user_verification.get(key, {}).get('verified', False)
+        if value is None:
+            user_verification.pop(key, None)
+            bot_stats.verification_changed(was_verified, False)
+        else:
+            user_verification[key] = value
+            bot_stats.verification_changed(was_verified, value.get('verified', False))
+    elif table == 'allowed_groups':
+        if value is None:
+            allowed_groups.pop(key, None)
+        else:
+            allowed_groups[key] = value
+    elif table == 'user_tiers':
+        if value is None:
+            user_tiers.pop(key, None)
+        else:
+            user_tiers[key] = value
+    elif table == 'limit_tiers':
+        limit_tiers[key] = value
+        quota_leases.settle_all()  # Slices were sized for the old limit
+    elif table == 'user_usage':
+        day, count = value
+        bot_stats.user_seen(key)
+        user_usage.setdefault(key, {})[day] = count
+        if day == nepal_clock.today_key():
+            usage_today[key] = count
+    elif table == 'group_usage':
+        day, count = value
+        group_usage.setdefault(key, {})[day] = count
+        if day == nepal_clock.today_key():
+            group_usage_today[key] = count
+
+def advance_state_seq(seq: int, written: int):
+    """Count our own write as synced when nobody else wrote since the last sync"""
+    global state_seq
+    if seq - written == state_seq:
+        state_seq = seq
+
+async def sync_shared_state():
+    """Catch up with changes other workers wrote to the shared store"""
+    global state_seq
+    seq, changes = await in_store_thread(state_store.changes_since, state_seq)
+    if seq <= state_seq:
+        return  # Nothing new, or a concurrent update already applied these
+    if changes is None:
+        load_data()
+        return
+    for table, key, value in changes:
+        apply_state_change(table, key, value)
+    state_seq = seq
 
 def is_owner(user_id: int) -> bool:
     """Check if user is owner"""
     is_owner_result = user_id == OWNER_ID or user_id == ALTERNATE_OWNER_ID
-    logger.info(f"Owner check: user_id={user_id}, OWNER_ID={OWNER_ID}, ALTERNATE_ID={ALTERNATE_OWNER_ID}, result={is_owner_result}")
+    hot_logger.debug("Owner check: user_id=%s, OWNER_ID=%s, ALTERNATE_ID=%s, result=%s",
+                      user_id, OWNER_ID, ALTERNATE_OWNER_ID, is_owner_result)
     return is_owner_result
 
 def is_group_allowed(chat_id: int) -> bool:
@@ -139,50 +1212,224 @@ def is_group_allowed(chat_id: int) -> bool:
     # Check if group is in allowed list
     return abs(chat_id) in allowed_groups
 
-def add_allowed_group(chat_id: int, chat_title: str):
+GROUP_SETTINGS = ('tier', 'daily_budget', 'max_concurrent')  # Kept when a group is allowed again
+
+async def add_allowed_group(chat_id: int, chat_title: str):
     """Add group to allowed list"""
     group_id = abs(chat_id)
+    settings = {key: value for key, value in allowed_groups.get(group_id, {}).items() if key in GROUP_SETTINGS}
     allowed_groups[group_id] = {
         'title': chat_title,
         'chat_id': chat_id,
-        'added_date': get_nepal_time().strftime("%Y-%m-%d %H:%M:%S")
+        'added_date': get_nepal_time().strftime("%Y-%m-%d %H:%M:%S"),
+        **settings
     }
-    save_data()
+    await persist('allowed_groups', group_id, allowed_groups[group_id])
 
-def remove_allowed_group(chat_id: int):
+async def remove_allowed_group(chat_id: int):
     """Remove group from allowed list"""
     group_id = abs(chat_id)
     if group_id in allowed_groups:
         del allowed_groups[group_id]
-        save_data()
+        await persist('allowed_groups', group_id, None)
         return True
     return False
 
-def get_user_daily_limit(user_id: int) -> int:
-    """Get user's daily limit"""
+def get_user_daily_limit(user_id: int, chat_id: int = None) -> int:
+    """Get user's daily limit: their override, else the best of their tier and the group's"""
     # Owner has unlimited access
     if is_owner(user_id):
-        return 999999
-    return user_limits.get(user_id, default_limit)
+        return UNLIMITED_LIMIT
+    limit = user_limits.get(user_id)
+    if limit is not None:
+        return limit
+    tiers = [user_tiers.get(user_id)]
+    if chat_id is not None and chat_id < 0:
+        tiers.append(allowed_groups.get(abs(chat_id), {}).get('tier'))
+    limits = [limit_tiers[tier_id]['limit'] for tier_id in tiers if tier_id in limit_tiers]
+    return max(limits) if limits else limit_tiers[DEFAULT_TIER]['limit']
+
+def find_tier(name: str) -> Optional[int]:
+    """Tier ID for a name (case-insensitive)"""
+    name = name.lower()
+    for tier_id, tier in limit_tiers.items():
+        if tier['name'] == name:
+            return tier_id
+    return None
+
+async def set_tier_limit(name: str, limit: int) -> int:
+    """Change a tier's limit (creating the tier if new); every member follows with one write"""
+    tier_id = find_tier(name)
+    if tier_id is None:
+        tier_id = max(limit_tiers) + 1
+    limit_tiers[tier_id] = {'name': name.lower(), 'limit': limit}
+    await persist('limit_tiers', tier_id, limit_tiers[tier_id])
+    quota_leases.settle_all()
+    return tier_id
+
+async def set_user_tier(user_id: int, tier_id: int):
+    """Put a user in a tier; the default tier is stored as no entry"""
+    bot_stats.user_seen(user_id)
+    if user_tiers.get(user_id, DEFAULT_TIER) == tier_id:
+        state_writes_skipped.inc('user_tiers')
+        return
+    if tier_id == DEFAULT_TIER:
+        del user_tiers[user_id]
+        await persist('user_tiers', user_id, None)
+    else:
+        user_tiers[user_id] = tier_id
+        await persist('user_tiers', user_id, tier_id)
+    if user_id in quota_leases.leases:
+        quota_leases.settle(user_id)
+
+async def set_group_setting(group_id: int, setting: str, value: Optional[int]):
+    """Change one of an allowed group's GROUP_SETTINGS (None removes it)"""
+    if allowed_groups[group_id].get(setting) == value:
+        state_writes_skipped.inc('allowed_groups')
+        return
+    group = {key: current for key, current in allowed_groups[group_id].items() if key != setting}
+    if value is not None:
+        group[setting] = value
+    allowed_groups[group_id] = group
+    await persist('allowed_groups', group_id, group)
+
+async def set_group_tier(group_id: int, tier_id: Optional[int]):
+    """Tier for everyone using the bot in an allowed group (None removes it)"""
+    await set_group_setting(group_id, 'tier', tier_id)
 
 def get_user_usage_today(user_id: int) -> int:
     """Get user's usage count for today"""
-    today = get_nepal_time().strftime("%Y-%m-%d")
+    today = nepal_clock.today_key()  # Rolls usage_today over if midnight has passed
     if user_id not in user_usage:
         user_usage[user_id] = {}
-    return user_usage[user_id].get(today, 0)
+        bot_stats.user_seen(user_id)
+    return usage_today.get(user_id, 0) + quota_leases.used(user_id, today)
+
+def _set_usage_today(user_id: int, today: str, count: int):
+    usage_today[user_id] = count
+    days = user_usage.setdefault(user_id, {})
+    if count:
+        days[today] = count
+    else:
+        days.pop(today, None)
 
-def increment_user_usage(user_id: int):
-    """Increment user's usage count for today"""
+async def reserve_user_usage(user_id: int, chat_id: int = None) -> bool:
+    """Take one like from today's quota before calling the API; False at the limit"""
     # Owner usage is not tracked
     if is_owner(user_id):
-        return
+        return True
     
-    today = get_nepal_time().strftime("%Y-%m-%d")
+    today = nepal_clock.today_key()
     if user_id not in user_usage:
         user_usage[user_id] = {}
-    user_usage[user_id][today] = user_usage[user_id].get(today, 0) + 1
-    save_data()
+        bot_stats.user_seen(user_id)
+    limit = get_user_daily_limit(user_id, chat_id)
+    if state_store is not None and quota_leases.slice_size:
+        return await quota_leases.reserve(user_id, today, limit)
+    if state_store is not None:
+        # Atomic across workers
+        count = await in_store_thread(state_store.reserve_usage, user_id, today, limit)
+        if count is None:
+            return False
+    else:
+        count = usage_today.get(user_id, 0) + 1
+        if count > limit:
+            return False
+    _set_usage_today(user_id, today, count)
+    return True
+
+def commit_user_usage(user_id: int):
+    """Keep a reservation that ended in sent likes"""
+    if not is_owner(user_id) and state_store is None:
+        save_data()
+
+async def release_user_usage(user_id: int):
+    """Give back a reservation that did not end in sent likes"""
+    if is_owner(user_id):
+        return
+    today = nepal_clock.today_key()
+    if state_store is not None and quota_leases.slice_size:
+        await quota_leases.release(user_id, today)
+        return
+    if state_store is not None:
+        count = await in_store_thread(state_store.release_usage, user_id, today)
+    else:
+        count = max(0, usage_today.get(user_id, 0) - 1)
+    _set_usage_today(user_id, today, count)
+
+def get_group_usage_today(group_id: int) -> int:
+    nepal_clock.today_key()  # Rolls group_usage_today over if midnight has passed
+    return group_usage_today.get(group_id, 0)
+
+def _set_group_usage_today(group_id: int, today: str, count: int):
+    group_usage_today[group_id] = count
+    days = group_usage.setdefault(group_id, {})
+    if count:
+        days[today] = count
+    else:
+        days.pop(today, None)
+
+async def reserve_group_like(group_id: int) -> Optional[str]:
+    """Take a concurrency slot and one like from the group's daily budget
+    
+    Returns None when the like may go ahead, else why not ('busy' or
+    'budget'). Every successful call needs a finish_group_like(). In
+    scale-out mode both the cap and the budget are shared by all workers.
+    """
+    group = allowed_groups.get(group_id, {})
+    cap = group.get('max_concurrent', GROUP_MAX_CONCURRENT)
+    today = nepal_clock.today_key()
+    budget = group.get('daily_budget')
+    if state_store is not None:
+        # Groups without a budget are only counted
+        refusal, count = await in_store_thread(
+            state_store.take_group_slot, group_id, today, cap, math.inf if budget is None else budget,
+            store_owner, GROUP_SLOT_TTL)
+        _set_group_usage_today(group_id, today, count)
+        if refusal:
+            group_likes_refused.inc(refusal)
+            return refusal
+    else:
+        running = group_in_flight.get(group_id, 0)
+        if cap and running >= cap:
+            group_likes_refused.inc('busy')
+            return 'busy'
+        count = group_usage_today.get(group_id, 0) + 1
+        if budget is not None and count > budget:
+            group_likes_refused.inc('budget')
+            return 'budget'
+        _set_group_usage_today(group_id, today, count)
+    group_in_flight[group_id] = group_in_flight.get(group_id, 0) + 1
+    return None
+
+def _free_group_slot(group_id: int):
+    running = group_in_flight.get(group_id, 0) - 1
+    if running > 0:
+        group_in_flight[group_id] = running
+    else:
+        group_in_flight.pop(group_id, None)
+
+async def finish_group_like(group_id: int, sent: bool):
+    """Free the concurrency slot; the like goes back to the budget unless it was sent"""
+    _free_group_slot(group_id)
+    today = nepal_clock.today_key()
+    if state_store is not None:
+        count = await in_store_thread(state_store.free_group_slot, group_id, today, store_owner, not sent)
+        if count is not None:
+            _set_group_usage_today(group_id, today, count)
+        return
+    if not sent:
+        _set_group_usage_today(group_id, today, max(0, group_usage_today.get(group_id, 0) - 1))
+
+def reset_daily_usage(old_day: str, new_day: str):
+    """Midnight rollover: today's counters start empty (history stays in user_usage and group_usage)"""
+    global usage_today, group_usage_today
+    if state_store is not None:
+        quota_leases.settle_where(lambda lease: lease[0] == old_day)
+    usage_today = {}
+    group_usage_today = {}
+
+nepal_clock.on_rollover(reset_daily_usage)
 
 def is_user_verified(user_id: int) -> bool:
     """Check if user is verified"""
@@ -191,13 +1438,32 @@ def is_user_verified(user_id: int) -> bool:
         return True
     return user_verification.get(user_id, {}).get('verified', False)
 
-def verify_user(user_id: int):
-    """Mark user as verified"""
+async def verify_user(user_id: int) -> bool:
+    """Mark user as verified; False if they already were (nothing is written)"""
+    was_verified = user_verification.get(user_id, {}).get('verified', False)
+    bot_stats.user_seen(user_id)
+    if was_verified:
+        state_writes_skipped.inc('user_verification')
+        return False
+    bot_stats.verification_changed(was_verified, True)
     user_verification[user_id] = {
         'verified': True,
         'verified_date': get_nepal_time().strftime("%Y-%m-%d %H:%M:%S")
     }
-    save_data()
+    await persist('user_verification', user_id, user_verification[user_id])
+    return True
+
+async def set_user_limit(user_id: int, limit: int):
+    """Set a user's daily limit"""
+    bot_stats.user_seen(user_id)
+    if user_limits.get(user_id) == limit:
+        state_writes_skipped.inc('user_limits')
+        return
+    bot_stats.limit_changed(user_limits.get(user_id), limit)
+    user_limits[user_id] = limit
+    await persist('user_limits', user_id, limit)
+    if user_id in quota_leases.leases:
+        quota_leases.settle(user_id)  # Next /like leases under the new limit
 
 def detect_region(region: str) -> str:
     """Detect and convert region"""
@@ -210,114 +1476,264 @@ def detect_region(region: str) -> str:
     return region_map.get(region, 'ag')  # Default to AG (Bangladesh) region
 
 # ===============================
-# PERMISSION DECORATOR
+# SYSTEM METRICS SAMPLER
 # ===============================
 
-def group_permission_required(func):
-    """Decorator to check group permissions"""
-    @wraps(func)
-    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
-        if not update.effective_chat or not update.effective_user:
-            return
-        
-        chat_id = update.effective_chat.id
-        user_id = update.effective_user.id
-        
-        # Owner can use commands anywhere
-        if is_owner(user_id):
-            return await func(update, context, *args, **kwargs)
-        
-        # Check if group is allowed (private chats always allowed)
-        if not is_group_allowed(chat_id):
-            # Send warning message only in groups
-            if chat_id < 0:
-                not_allowed_text = f"""
+class SystemMonitor:
+    """Sample process and system metrics in the background"""
+
+    def __init__(self, interval: float, history: int):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.latest = {}
+        self.started_at = get_nepal_time()
+        self.process = None
+        self.task = None
+        if psutil:
+            self.process = psutil.Process(os.getpid())
+            self.started_at = datetime.fromtimestamp(self.process.create_time(), tz=NEPAL_TZ)
+            self.process.cpu_percent(None)  # First call only primes the counter
+
+    def _collect(self) -> Dict[str, Any]:
+        """Blocking psutil calls; runs in a worker thread"""
+        memory = psutil.virtual_memory()
+        try:
+            connections = len(self.process.net_connections())
+        except AttributeError:  # psutil < 6
+            connections = len(self.process.connections())
+        return {
+            'process_cpu_percent': self.process.cpu_percent(None),
+            'system_cpu_percent': psutil.cpu_percent(None),
+            'rss_mb': self.process.memory_info().rss / (1024 * 1024),
+            'memory_percent': memory.percent,
+            'memory_available_mb': memory.available // (1024 * 1024),
+            'open_connections': connections,
+        }
+
+    async def sample(self, loop_lag_ms: float = 0.0):
+        sample = {'timestamp': time.time(), 'loop_lag_ms': loop_lag_ms}
+        if self.process:
+            try:
+                sample.update(await asyncio.get_running_loop().run_in_executor(None, self._collect))
+            except Exception as e:
+                logger.error("Error sampling system metrics: %s", e)
+        self.samples.append(sample)
+        self.latest = sample
+
+    def max_loop_lag_ms(self) -> float:
+        return max((sample['loop_lag_ms'] for sample in self.samples), default=0.0)
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _run(self):
+        await self.sample()
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            # Oversleeping means something blocked the event loop
+            lag_ms = max(0.0, (time.monotonic() - expected) * 1000)
+            await self.sample(lag_ms)
+
+system_monitor = SystemMonitor(SYSTEM_SAMPLE_INTERVAL, SYSTEM_SAMPLE_HISTORY)
+
+# ===============================
+# MESSAGE CLEANUP SCHEDULER
+# ===============================
+
+class MessageCleanupScheduler:
+    """Delete bot messages after a TTL from one background task"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.heap = []  # (due_timestamp, chat_id, message_id)
+        self.wakeup = asyncio.Event()
+        self.dirty = False
+        self.last_save = 0.0  # Monotonic time of the last save
+        self.task = None
+        self.bot = None
+
+    def load(self):
+        """Restore pending deletions saved by a previous run"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    self.heap = [tuple(item) for item in json.load(f)]
+                heapq.heapify(self.heap)
+                logger.info("Loaded %d pending deletions", len(self.heap))
+        except Exception as e:
+            logger.error("Error loading pending deletions: %s", e)
+            self.heap = []
+
+    def _write(self, items: list):
+        with open(self.path, 'w') as f:
+            json.dump(items, f)
+
+    def save(self):
+        """Persist pending deletions so they survive restarts"""
+        try:
+            self._write(self.heap)
+            self.dirty = False
+        except Exception as e:
+            logger.error("Error saving pending deletions: %s", e)
+
+    async def save_in_thread(self):
+        """save() for the running loop: at most every PENDING_DELETIONS_SAVE_INTERVAL, written off the loop"""
+        self.dirty = False
+        self.last_save = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, list(self.heap))
+        except Exception as e:
+            logger.error("Error saving pending deletions: %s", e)
+            self.dirty = True
+
+    def schedule(self, chat_id: int, message_id: int, delay: float):
+        """Delete a message after `delay` seconds"""
+        heapq.heappush(self.heap, (time.time() + delay, chat_id, message_id))
+        self.dirty = True
+        self.wakeup.set()
+
+    def start(self, bot):
+        self.bot = bot
+        self.load()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.save()
+
+    async def _run(self):
+        while True:
+            if self.dirty and time.monotonic() - self.last_save >= PENDING_DELETIONS_SAVE_INTERVAL:
+                await self.save_in_thread()
+            timeout = self.heap[0][0] - time.time() if self.heap else None
+            if self.dirty:
+                save_in = max(0.0, self.last_save + PENDING_DELETIONS_SAVE_INTERVAL - time.monotonic())
+                timeout = save_in if timeout is None else min(timeout, save_in)
+            if timeout is None or timeout > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._delete_due()
+
+    async def _delete_due(self):
+        """Pop everything that is due and delete it, batched per chat"""
+        now = time.time()
+        batches = {}  # chat_id: {message_id, ...}
+        while self.heap and self.heap[0][0] <= now:
+            _, chat_id, message_id = heapq.heappop(self.heap)
+            batches.setdefault(chat_id, set()).add(message_id)
+        if batches:
+            self.dirty = True
+        await asyncio.gather(*(self._delete_batch(chat_id, ids) for chat_id, ids in batches.items()))
+
+    async def _delete_batch(self, chat_id: int, message_ids: set):
+        for message_id in sorted(message_ids):
+            try:
+                await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                # Already deleted or missing rights; nothing to retry
+                logger.debug("Could not delete message %s in %s: %s", message_id, chat_id, e)
+
+message_cleaner = MessageCleanupScheduler(PENDING_DELETIONS_FILE)
+
+def delete_later(message, delay: float):
+    """Schedule a sent message for deletion"""
+    if message:
+        message_cleaner.schedule(message.chat_id, message.message_id, delay)
+
+def delete_later_in_group(message, delay: float):
+    """Schedule deletion only for messages in groups (private chats keep history)"""
+    if message and message.chat_id < 0:
+        delete_later(message, delay)
+
+# ===============================
+# MESSAGE TEMPLATES
+# ===============================
+
+class MessageTemplate:
+    """Message text with static fields substituted once at startup"""
+
+    def __init__(self, text: str, **static_fields):
+        parts = []
+        self.fields = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(text):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field_name is None:
+                continue
+            if field_name in static_fields:
+                value = format(static_fields[field_name], format_spec or '')
+                parts.append(value.replace('{', '{{').replace('}', '}}'))
+            else:
+                self.fields.append(field_name)
+                conversion = f"!{conversion}" if conversion else ""
+                format_spec = f":{format_spec}" if format_spec else ""
+                parts.append(f"{{{field_name}{conversion}{format_spec}}}")
+        self.text = ''.join(parts)
+        # Fully static screens are rendered exactly once
+        self.static_text = None if self.fields else self.text.format()
+
+    def render(self, **fields) -> str:
+        """Fill in the dynamic fields"""
+        if self.static_text is not None:
+            return self.static_text
+        return self.text.format(**fields)
+
+def time_fields(current_time: datetime) -> Dict[str, str]:
+    """Date and time strings for templates from a single strftime call"""
+    date_str, time_str = current_time.strftime("%Y-%m-%d %H:%M:%S").split(" ")
+    return {'date': date_str, 'time': time_str}
+
+CONTACT_OWNER_URL = f"https://t.me/{CONTACT_OWNER[1:]}"
+STATIC_FIELDS = {
+    'contact_owner': CONTACT_OWNER,
+    'discord_link': DISCORD_LINK,
+    'owner_id': OWNER_ID,
+    'alternate_owner_id': ALTERNATE_OWNER_ID,
+    'default_limit': default_limit,
+}
+
+UNAUTHORIZED_GROUP_TEMPLATE = MessageTemplate("""
 ```
 ❌ UNAUTHORIZED GROUP
 ┌─ STATUS: ACCESS DENIED
 ├─ REASON: Group not authorized by owner
 ├─ SOLUTION: Owner must add this group first
-└─ CONTACT: {CONTACT_OWNER} for authorization
+└─ CONTACT: {contact_owner} for authorization
 ```
 **⚠️ This bot only works in authorized groups**
 **👑 Owner must use /allow to authorize**
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """
-                
-                if update.message:
-                    msg = await update.message.reply_text(
-                        not_allowed_text,
-                        parse_mode=ParseMode.MARKDOWN,
-                        disable_web_page_preview=True
-                    )
-                
-                    # Delete after 10 seconds
-                    await asyncio.sleep(10)
-                    try:
-                        await msg.delete()
-                        if update.message:
-                            await update.message.delete()
-                    except:
-                        pass
-            return
-        
-        return await func(update, context, *args, **kwargs)
-    
-    return wrapper
-
-# ===============================
-# API FUNCTIONS
-# ===============================
+""", **STATIC_FIELDS)
 
-async def fetch_like(uid: str, region: str) -> Optional[Dict[str, Any]]:
-    """Fetch likes from the API"""
-    try:
-        api_region = detect_region(region)
-        url = f"https://lordlike.onrender.com/like?uid={uid}&region={api_region}&key={API_KEY}"
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.error(f"API request failed: {response.status}")
-                    return None
-    except Exception as e:
-        logger.error(f"Error fetching likes: {e}")
-        return None
-
-# ===============================
-# COMMAND HANDLERS
-# ===============================
-
-@group_permission_required
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start command - welcome message"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    current_time = get_nepal_time()
-    date_str = current_time.strftime("%Y-%m-%d")
-    time_str = current_time.strftime("%H:%M:%S")
-    
-    # Check verification status
-    is_verified = is_user_verified(user_id)
-    verification_status = "✅ VERIFIED" if is_verified else "❌ NOT VERIFIED"
-    
-    # Owner special status
-    owner_status = ""
-    if is_owner(user_id):
-        owner_status = "\n**👑 OWNER STATUS: UNLIMITED ACCESS**"
-    
-    welcome_text = f"""
+START_TEMPLATE = MessageTemplate("""
 🌟 **EM OFFICIAL TEAM - FREE FIRE LIKE BOT** 🌟
 
 ╭─────────────────────────────────────╮
 │ 🎮 **COMMANDS:**
 │ • `/verify` - Complete verification
 │ • `/like <region> <uid>` - Send likes
+│ • `/player <region> <uid>` - Player profile
+│ • `/history` - Your like history
 │ • `/contact` - Contact owner
 │ • `/help` - Show help menu
 │ • `/stats` - Your usage statistics
@@ -331,40 +1747,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **⚠️ IMPORTANT:** You must complete verification first!
 **📝 Use `/verify` to start verification process**
 
-🎮 [JOIN DISCORD COMMUNITY]({DISCORD_LINK})
+🎮 [JOIN DISCORD COMMUNITY]({discord_link})
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {date_str} 🕐 {time_str}
-    """
-    
-    # Create inline keyboard
-    keyboard = [
-        [InlineKeyboardButton("🔐 Start Verification", callback_data="start_verify")],
-        [InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)],
-        [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        welcome_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
-    )
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
 
-@group_permission_required
-async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle verification command"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    current_time = get_nepal_time()
-    date_str = current_time.strftime("%Y-%m-%d")
-    time_str = current_time.strftime("%H:%M:%S")
-    
-    # Check if already verified
-    if is_user_verified(user_id):
-        verified_text = f"""
+ALREADY_VERIFIED_TEMPLATE = MessageTemplate("""
 ```
 🎉 VERIFICATION COMPLETED!
 ╭─────────────────────────────────────╮
@@ -374,27 +1762,12 @@ async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 │ 💎 Enjoy unlimited access!
 ╰─────────────────────────────────────╯
 ```
-🎮 [JOIN DISCORD COMMUNITY]({DISCORD_LINK})
+🎮 [JOIN DISCORD COMMUNITY]({discord_link})
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {date_str} 🕐 {time_str}
-        """
-        
-        keyboard = [
-            [InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)],
-            [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
-            verified_text,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-        return
-    
-    # Show verification interface
-    verify_text = f"""
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
+
+VERIFY_STEPS_TEMPLATE = MessageTemplate("""
 🔐 **SIMPLE VERIFICATION SYSTEM** 🔐
 
 ╭─────────────────────────────────────╮
@@ -415,46 +1788,10 @@ async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Get instant verification!
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {date_str} 🕐 {time_str}
-    """
-    
-    # Create verification keyboard
-    keyboard = [
-        [
-            InlineKeyboardButton("1️⃣ YouTube Channel", url=VERIFICATION_LINKS['youtube']),
-            InlineKeyboardButton("2️⃣ Telegram Channel", url=VERIFICATION_LINKS['telegram_channel'])
-        ],
-        [
-            InlineKeyboardButton("3️⃣ Telegram Group", url=VERIFICATION_LINKS['telegram_group']),
-            InlineKeyboardButton("4️⃣ Discord Server", url=VERIFICATION_LINKS['discord'])
-        ],
-        [InlineKeyboardButton("✅ Complete Done", callback_data="complete_verification")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        verify_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
-    )
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
 
-@group_permission_required
-async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle like command"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    # Check verification status for non-owners
-    if not is_owner(user_id) and not is_user_verified(user_id):
-        # Auto-show verification system
-        current_time = get_nepal_time()
-        date_str = current_time.strftime("%Y-%m-%d")
-        time_str = current_time.strftime("%H:%M:%S")
-        
-        verify_text = f"""
+VERIFY_REQUIRED_TEMPLATE = MessageTemplate("""
 ❌ **VERIFICATION REQUIRED TO USE LIKES!**
 
 🔐 **SIMPLE VERIFICATION SYSTEM** 🔐
@@ -477,108 +1814,50 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Then you can use like commands!
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {date_str} 🕐 {time_str}
-        """
-        
-        # Create verification keyboard
-        keyboard = [
-            [
-                InlineKeyboardButton("1️⃣ YouTube Channel", url=VERIFICATION_LINKS['youtube']),
-                InlineKeyboardButton("2️⃣ Telegram Channel", url=VERIFICATION_LINKS['telegram_channel'])
-            ],
-            [
-                InlineKeyboardButton("3️⃣ Telegram Group", url=VERIFICATION_LINKS['telegram_group']),
-                InlineKeyboardButton("4️⃣ Discord Server", url=VERIFICATION_LINKS['discord'])
-            ],
-            [InlineKeyboardButton("✅ Complete Done", callback_data="complete_verification")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
-            verify_text,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup,
-            disable_web_page_preview=True
-        )
-        return
-    
-    # Check arguments
-    if len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Invalid format!**\n"
-            "📝 **Usage:** `/like <region> <uid>`\n"
-            "🎯 **Example:** `/like bd 5914395123`\n"
-            "📋 **Regions:** BD, IND, BR, US",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    region = context.args[0].upper()
-    uid = context.args[1]
-    
-    # Validate region
-    valid_regions = ['BD', 'IND', 'BR', 'US', 'AG', 'NX']
-    if region not in valid_regions:
-        await update.message.reply_text(
-            f"❌ **Invalid region: {region}**\n"
-            "📋 **Valid regions:** BD, IND, BR, US",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    # Check limits for non-owners
-    if not is_owner(user_id):
-        daily_limit = get_user_daily_limit(user_id)
-        usage_today = get_user_usage_today(user_id)
-        
-        if usage_today >= daily_limit:
-            await update.message.reply_text(
-                f"❌ **Daily limit reached!**\n"
-                f"📊 **Used:** {usage_today}/{daily_limit}\n"
-                f"⏰ **Reset:** Tomorrow at 12:00 AM Nepal time\n"
-                f"👥 **Contact:** {CONTACT_OWNER} for limit increase",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            return
-    
-    # Send processing message
-    processing_msg = await update.message.reply_text(
-        "⏳ **Processing your request...**\n"
-        f"🎮 **Region:** {region}\n"
-        f"🆔 **UID:** {uid}\n"
-        "⚡ **Please wait...**",
-        parse_mode=ParseMode.MARKDOWN
-    )
-    
-    try:
-        # Call API
-        result = await fetch_like(uid, region)
-        
-        if result:
-            # Parse API response
-            status = result.get('status', 0)
-            player = result.get('player', {})
-            likes = result.get('likes', {})
-            
-            player_nickname = player.get('nickname', 'Unknown')
-            likes_before = likes.get('before', 0)
-            likes_after = likes.get('after', 0)
-            added_by_api = likes.get('added_by_api', 0)
-            
-            # Handle different status codes
-            if status == 1:  # Success
-                # Increment usage for non-owners
-                if not is_owner(user_id):
-                    increment_user_usage(user_id)
-                    new_usage = get_user_usage_today(user_id)
-                    limit = get_user_daily_limit(user_id)
-                    remaining = limit - new_usage
-                else:
-                    remaining = "♾️ Unlimited"
-                    new_usage = "👑 Owner"
-                    limit = "♾️ Unlimited"
-                
-                success_text = f"""
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
+
+LIKE_USAGE_TEMPLATE = MessageTemplate(
+    "❌ **Invalid format!**\n"
+    "📝 **Usage:** `/like <region> <uid>`\n"
+    "🎯 **Example:** `/like bd 5914395123`\n"
+    "📋 **Regions:** BD, IND, BR, US"
+)
+
+LIKE_INVALID_REGION_TEMPLATE = MessageTemplate(
+    "❌ **Invalid region: {region}**\n"
+    "📋 **Valid regions:** BD, IND, BR, US"
+)
+
+LIKE_LIMIT_REACHED_TEMPLATE = MessageTemplate(
+    "❌ **Daily limit reached!**\n"
+    "📊 **Used:** {usage_today}/{daily_limit}\n"
+    "⏰ **Reset:** in {reset_in} (12:00 AM Nepal time)\n"
+    "👥 **Contact:** {contact_owner} for limit increase",
+    **STATIC_FIELDS
+)
+
+GROUP_BUDGET_REACHED_TEMPLATE = MessageTemplate(
+    "❌ **This group's daily likes are used up!**\n"
+    "📊 **Used:** {group_usage}/{group_budget}\n"
+    "⏰ **Reset:** in {reset_in} (12:00 AM Nepal time)\n"
+    "👥 **Contact:** {contact_owner} for a bigger group budget",
+    **STATIC_FIELDS
+)
+
+GROUP_BUSY_TEMPLATE = MessageTemplate(
+    "⏳ **This group already has {running} likes in progress!**\n"
+    "🔄 Try again in a moment"
+)
+
+LIKE_PROCESSING_TEMPLATE = MessageTemplate(
+    "⏳ **Processing your request...**\n"
+    "🎮 **Region:** {region}\n"
+    "🆔 **UID:** {uid}\n"
+    "⚡ **Please wait...**"
+)
+
+LIKE_SUCCESS_TEMPLATE = MessageTemplate("""
 ✅ **LIKES SENT SUCCESSFULLY!** ✅
 
 ```
@@ -586,7 +1865,7 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ╭─────────────────────────────────────╮
 │ 🆔 UID: {uid}
 │ 👤 Player: {player_nickname}
-│ 🌍 Region: {region.upper()}
+│ 🌍 Region: {region}
 │ 💎 Likes Before: {likes_before:,}
 │ 💎 Likes After: {likes_after:,}
 │ ⚡ Added: +{added_by_api}
@@ -600,15 +1879,9 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **🎉 Congratulations! Likes sent successfully!**
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """
-                
-                await processing_msg.edit_text(
-                    success_text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-            elif status == 2:  # Already received or limit reached
-                error_text = f"""
+""")
+
+LIKE_ALREADY_RECEIVED_TEMPLATE = MessageTemplate("""
 ⚠️ **LIKES ALREADY RECEIVED!** ⚠️
 
 ```
@@ -616,7 +1889,7 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ╭─────────────────────────────────────╮
 │ 🆔 UID: {uid}
 │ 👤 Player: {player_nickname}
-│ 🌍 Region: {region.upper()}
+│ 🌍 Region: {region}
 │ 💎 Current Likes: {likes_before:,}
 │ 📊 Status: ALREADY RECEIVED
 ╰─────────────────────────────────────╯
@@ -627,22 +1900,16 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **🔄 Or try a different UID**
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """
-                
-                await processing_msg.edit_text(
-                    error_text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-            elif status == 3:  # Player not found
-                error_text = f"""
+""")
+
+LIKE_NOT_FOUND_TEMPLATE = MessageTemplate("""
 ❌ **PLAYER NOT FOUND!** ❌
 
 ```
 🎮 SEARCH RESULT
 ╭─────────────────────────────────────╮
 │ 🆔 UID: {uid}
-│ 🌍 Region: {region.upper()}
+│ 🌍 Region: {region}
 │ 📊 Status: PLAYER NOT FOUND
 ╰─────────────────────────────────────╯
 ```
@@ -654,22 +1921,16 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **🔄 Try again with correct information**
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """
-                
-                await processing_msg.edit_text(
-                    error_text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-                
-            else:  # Unknown status
-                error_text = f"""
+""")
+
+LIKE_API_ERROR_TEMPLATE = MessageTemplate("""
 ❌ **API ERROR OCCURRED!** ❌
 
 ```
 🎮 API RESPONSE
 ╭─────────────────────────────────────╮
 │ 🆔 UID: {uid}
-│ 🌍 Region: {region.upper()}
+│ 🌍 Region: {region}
 │ 📊 Status Code: {status}
 │ 📊 Status: ERROR
 ╰─────────────────────────────────────╯
@@ -677,26 +1938,19 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **⚠️ Something went wrong with the API**
 **🔄 Please try again in a few minutes**
-**👥 Contact:** {CONTACT_OWNER} if problem persists
+**👥 Contact:** {contact_owner} if problem persists
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """
-                
-                await processing_msg.edit_text(
-                    error_text,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-        else:
-            # API connection failed
-            await processing_msg.edit_text(
-                f"""
+""", **STATIC_FIELDS)
+
+LIKE_CONNECTION_FAILED_TEMPLATE = MessageTemplate("""
 ❌ **API CONNECTION FAILED!** ❌
 
 ```
 🎮 CONNECTION ERROR
 ╭─────────────────────────────────────╮
 │ 🆔 UID: {uid}
-│ 🌍 Region: {region.upper()}
+│ 🌍 Region: {region}
 │ 📊 Status: CONNECTION FAILED
 ╰─────────────────────────────────────╯
 ```
@@ -704,77 +1958,85 @@ async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **⚠️ Cannot connect to Free Fire API**
 **🔄 Please try again in a few minutes**
 **🌐 Check your internet connection**
-**👥 Contact:** {CONTACT_OWNER} if problem persists
+**👥 Contact:** {contact_owner} if problem persists
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-                """,
-                parse_mode=ParseMode.MARKDOWN
-            )
-    
-    except Exception as e:
-        logger.error(f"Error in like command: {e}")
-        await processing_msg.edit_text(
-            "❌ **An error occurred!**\n"
-            "🔄 **Please try again later**\n"
-            f"👥 **Contact:** {CONTACT_OWNER} if problem persists",
-            parse_mode=ParseMode.MARKDOWN
-        )
+""", **STATIC_FIELDS)
 
-@group_permission_required
-async def uptime_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show bot uptime and status (owner only)"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    # Only owner can use this command
-    if not is_owner(user_id):
-        await update.message.reply_text(
-            "❌ **Owner command only!**\n"
-            f"👑 **Owner ID:** {OWNER_ID}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    current_time = get_nepal_time()
-    
-    # Calculate uptime (assuming bot started when script runs)
-    import psutil
-    import os
-    
-    # Get process info
-    process = psutil.Process(os.getpid())
-    create_time = datetime.fromtimestamp(process.create_time(), tz=pytz.timezone('Asia/Kathmandu'))
-    uptime_duration = current_time - create_time
-    
-    # Format uptime
-    days = uptime_duration.days
-    hours, remainder = divmod(uptime_duration.seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    
-    # System info
-    memory = psutil.virtual_memory()
-    cpu_percent = psutil.cpu_percent()
-    
-    uptime_text = f"""
+PLAYER_USAGE_TEMPLATE = MessageTemplate(
+    "❌ **Invalid format!**\n"
+    "📝 **Usage:** `/player <region> <uid>`\n"
+    "🎯 **Example:** `/player bd 5914395123`\n"
+    "📋 **Regions:** BD, IND, BR, US"
+)
+
+PLAYER_PROFILE_TEMPLATE = MessageTemplate("""
+🎮 **PLAYER PROFILE** 🎮
+
+```
+🎮 PLAYER INFORMATION
+╭─────────────────────────────────────╮
+│ 🆔 UID: {uid}
+│ 👤 Player: {player_nickname}
+│ 🌍 Region: {region}
+│ 💎 Likes: {likes:,}
+│ 🕐 Seen: {seen_ago} ago
+╰─────────────────────────────────────╯
+```
+
+**🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
+""")
+
+PLAYER_NOT_FOUND_TEMPLATE = MessageTemplate(
+    "❌ **Player not found!**\n"
+    "🆔 **UID:** {uid}\n"
+    "🌍 **Region:** {region}\n"
+    "🕐 **Checked:** {seen_ago} ago"
+)
+
+PLAYER_NOT_CACHED_TEMPLATE = MessageTemplate(
+    "ℹ️ **No recent profile for this player**\n"
+    "🆔 **UID:** {uid}\n"
+    "🌍 **Region:** {region}\n"
+    "💡 **Profiles come from likes sent in the last {ttl}; use** `/like {region_arg} {uid}`"
+)
+
+FLOOD_NOTICE_TEMPLATE = MessageTemplate(
+    "⏳ **Slow down!**\n"
+    "🔄 **Try again in {retry_after}s**"
+)
+
+LIKE_FAILED_TEMPLATE = MessageTemplate(
+    "❌ **An error occurred!**\n"
+    "🔄 **Please try again later**\n"
+    "👥 **Contact:** {contact_owner} if problem persists",
+    **STATIC_FIELDS
+)
+
+UPTIME_TEMPLATE = MessageTemplate("""
 ⏰ **BOT UPTIME & STATUS** ⏰
 
 **🚀 Uptime Information:**
-• **Started:** {create_time.strftime('%Y-%m-%d %H:%M:%S')}
+• **Started:** {started}
 • **Running For:** {days}d {hours}h {minutes}m {seconds}s
-• **Current Time:** {current_time.strftime('%Y-%m-%d %H:%M:%S')}
+• **Current Time:** {date} {time}
 
 **💻 System Resources:**
-• **Memory Usage:** {memory.percent}%
+• **Memory Usage:** {memory_percent}%
 • **CPU Usage:** {cpu_percent}%
-• **Memory Available:** {memory.available // (1024*1024)} MB
+• **Memory Available:** {memory_available_mb} MB
+• **Bot CPU:** {process_cpu_percent}%
+• **Bot Memory (RSS):** {rss_mb} MB
+• **Open Connections:** {open_connections}
+• **Event Loop Lag:** {loop_lag_ms} ms (max {max_loop_lag_ms} ms)
 
 **📊 Bot Statistics:**
-• **Total Users:** {len(set(user_limits) | set(user_usage) | set(user_verification))}
-• **Verified Users:** {sum(1 for v in user_verification.values() if v.get('verified', False))}
-• **Allowed Groups:** {len(allowed_groups)}
-• **User Limits Set:** {sum(1 for _, lim in user_limits.items() if lim != default_limit)}
+• **Total Users:** {total_users}
+• **Verified Users:** {verified_users}
+• **Allowed Groups:** {allowed_group_count}
+• **User Limits Set:** {custom_limits}
+• **Fast Like Replies:** {fast_replies} ({fast_replies} Telegram calls saved)
+• **Slow Like Replies:** {slow_replies}
 
 **🔄 Status Checks:**
 • ✅ **Bot Process:** Running
@@ -783,55 +2045,21 @@ async def uptime_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • ✅ **Member Tracking:** Active
 
 **📡 Connection Info:**
-• **Process ID:** {os.getpid()}
+• **Process ID:** {pid}
 • **Platform:** Replit Free Tier
-• **Auto-restart:** {"✅ Enabled" if "REPLIT_ENVIRONMENT" in os.environ else "❌ Disabled"}
+• **Auto-restart:** {auto_restart}
 
 **🔥 EM OFFICIAL TEAM - UPTIME MONITOR 🔥**
-    """
-    
-    keyboard = [
-        [
-            InlineKeyboardButton("🔄 Refresh Status", callback_data="refresh_uptime"),
-            InlineKeyboardButton("📊 Full Stats", callback_data="refresh_stats")
-        ],
-        [
-            InlineKeyboardButton("💾 Save Report", callback_data="save_uptime_report"),
-            InlineKeyboardButton("👑 Owner Help", callback_data="refresh_owner_help")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        uptime_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
-    )
+""", pid=os.getpid(),
+    auto_restart="✅ Enabled" if "REPLIT_ENVIRONMENT" in os.environ else "❌ Disabled")
 
-async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Quick status check for all users"""
-    if not update.effective_user or not update.message:
-        return
-    
-    current_time = get_nepal_time()
-    
-    # Quick system check
-    try:
-        import psutil
-        memory = psutil.virtual_memory()
-        status = "🟢 ONLINE"
-        performance = "⚡ Good" if memory.percent < 80 else "⚠️ High Usage"
-    except:
-        status = "🟡 LIMITED"
-        performance = "❓ Unknown"
-    
-    status_text = f"""
+STATUS_TEMPLATE = MessageTemplate("""
 📊 **QUICK BOT STATUS** 📊
 
 **🤖 Bot Status:** {status}
 **⚡ Performance:** {performance}
-**🕐 Current Time:** {current_time.strftime('%H:%M:%S')}
-**📅 Date:** {current_time.strftime('%Y-%m-%d')}
+**🕐 Current Time:** {time}
+**📅 Date:** {date}
 
 **📈 Service Status:**
 • ✅ Telegram API Connected
@@ -845,39 +2073,9 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Use `/like bd <uid>` to send likes
 
 **🔥 EM OFFICIAL TEAM BOT 🔥**
-    """
-    
-    keyboard = [
-        [
-            InlineKeyboardButton("📝 All Commands", callback_data="refresh_commands"),
-            InlineKeyboardButton("🔐 Verify Now", callback_data="start_verification")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        status_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
-    )
+""")
 
-async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show user statistics"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    current_time = get_nepal_time()
-    
-    # Get user data
-    is_verified = is_user_verified(user_id)
-    daily_limit = get_user_daily_limit(user_id)
-    usage_today = get_user_usage_today(user_id)
-    remaining = daily_limit - usage_today if daily_limit != 999999 else "Unlimited"
-    
-    # Owner special handling
-    if is_owner(user_id):
-        stats_text = f"""
+OWNER_STATS_TEMPLATE = MessageTemplate("""
 👑 **OWNER STATISTICS** 👑
 
 ```
@@ -905,17 +2103,17 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • `/broadcast <message>` - Send message to all users
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {current_time.strftime("%Y-%m-%d")} 🕐 {current_time.strftime("%H:%M:%S")}
-        """
-    else:
-        stats_text = f"""
+📅 {date} 🕐 {time}
+""")
+
+USER_STATS_TEMPLATE = MessageTemplate("""
 📊 **YOUR STATISTICS** 📊
 
 ```
 📈 USAGE STATISTICS
 ╭─────────────────────────────────────╮
 │ 🆔 User ID: {user_id}
-│ 🔐 Verified: {"✅ YES" if is_verified else "❌ NO"}
+│ 🔐 Verified: {verified}
 │ 📊 Used Today: {usage_today}/{daily_limit}
 │ ⚡ Remaining: {remaining}
 │ 🕐 Reset: Tomorrow 12:00 AM Nepal
@@ -924,38 +2122,19 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **🎮 COMMANDS AVAILABLE:**
 • `/like <region> <uid>` - Send likes
+• `/player <region> <uid>` - Player profile
+• `/history` - Your like history
 • `/verify` - Complete verification
 • `/help` - Show help menu
 • `/contact` - Contact owner
 
-**💡 TIP:** {"Complete verification to use bot!" if not is_verified else "Use /like command to send likes!"}
+**💡 TIP:** {tip}
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {current_time.strftime("%Y-%m-%d")} 🕐 {current_time.strftime("%H:%M:%S")}
-        """
-    
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh Stats", callback_data="refresh_stats")],
-        [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        stats_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
-    )
+📅 {date} 🕐 {time}
+""")
 
-@group_permission_required
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show help menu"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    current_time = get_nepal_time()
-    
-    help_text = f"""
+HELP_TEMPLATE = MessageTemplate("""
 🆘 **HELP & SUPPORT** 🆘
 
 ```
@@ -964,6 +2143,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 │ 🏠 /start - Welcome & main menu
 │ 🔐 /verify - Complete verification
 │ 💎 /like <region> <uid> - Send likes
+│ 🎮 /player <region> <uid> - Player profile
+│ 📜 /history - Your like history
 │ 📊 /stats - Your statistics
 │ 🆘 /help - This help menu
 │ 👥 /contact - Contact owner
@@ -988,42 +2169,20 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • Contact owner for support
 
 **👥 NEED HELP?**
-Contact: {CONTACT_OWNER}
-Discord: [Join Server]({DISCORD_LINK})
+Contact: {contact_owner}
+Discord: [Join Server]({discord_link})
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {current_time.strftime("%Y-%m-%d")} 🕐 {current_time.strftime("%H:%M:%S")}
-    """
-    
-    keyboard = [
-        [InlineKeyboardButton("🔐 Start Verification", callback_data="start_verify")],
-        [InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)],
-        [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        help_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
-    )
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
 
-@group_permission_required
-async def contact_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show contact information"""
-    if not update.effective_user or not update.message:
-        return
-    
-    current_time = get_nepal_time()
-    
-    contact_text = f"""
+CONTACT_TEMPLATE = MessageTemplate("""
 👥 **CONTACT INFORMATION** 👥
 
 ```
 📞 SUPPORT CONTACTS
 ╭─────────────────────────────────────╮
-│ 👑 Owner: {CONTACT_OWNER}
+│ 👑 Owner: {contact_owner}
 │ 🎮 Discord: Community Server
 │ 📢 Channel: Official Updates
 │ 👥 Group: Support Group
@@ -1045,152 +2204,10 @@ async def contact_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **⚡ RESPONSE TIME:** Usually within 24 hours
 
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-📅 {current_time.strftime("%Y-%m-%d")} 🕐 {current_time.strftime("%H:%M:%S")}
-    """
-    
-    keyboard = [
-        [
-            InlineKeyboardButton("👑 Message Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}"),
-            InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)
-        ],
-        [
-            InlineKeyboardButton("📢 Channel", url=VERIFICATION_LINKS['telegram_channel']),
-            InlineKeyboardButton("👥 Group", url=VERIFICATION_LINKS['telegram_group'])
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        contact_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup,
-        disable_web_page_preview=True
-    )
-
-# ===============================
-# OWNER COMMANDS
-# ===============================
-
-async def allow_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Owner command to allow groups"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    # Debug logging
-    logger.info(f"Allow command called by user_id: {user_id}")
-    
-    if not is_owner(user_id):
-        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
-        return
-    
-    chat_id = update.effective_chat.id
-    chat_title = update.effective_chat.title or "Private Chat"
-    
-    if chat_id > 0:
-        await update.message.reply_text("❌ **This command only works in groups!**", parse_mode=ParseMode.MARKDOWN)
-        return
-    
-    # Add group to allowed list
-    add_allowed_group(chat_id, chat_title)
-    
-    await update.message.reply_text(
-        f"✅ **Group authorized successfully!**\n"
-        f"📝 **Group:** {chat_title}\n"
-        f"🆔 **ID:** {chat_id}\n"
-        f"🎮 **Bot is now active in this group**",
-        parse_mode=ParseMode.MARKDOWN
-    )
-
-async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Owner command to remove groups"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    if not is_owner(user_id):
-        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
-        return
-    
-    chat_id = update.effective_chat.id
-    
-    if chat_id > 0:
-        await update.message.reply_text("❌ **This command only works in groups!**", parse_mode=ParseMode.MARKDOWN)
-        return
-    
-    # Remove group from allowed list
-    if remove_allowed_group(chat_id):
-        await update.message.reply_text(
-            f"✅ **Group removed successfully!**\n"
-            f"🚫 **Bot is now inactive in this group**",
-            parse_mode=ParseMode.MARKDOWN
-        )
-    else:
-        await update.message.reply_text(
-            f"❌ **Group was not in allowed list!**",
-            parse_mode=ParseMode.MARKDOWN
-        )
-
-async def setlimit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Owner command to set user limits"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    if not is_owner(user_id):
-        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
-        return
-    
-    if len(context.args) < 2:
-        await update.message.reply_text(
-            "❌ **Invalid format!**\n"
-            "📝 **Usage:** `/setlimit <user_id> <limit>`\n"
-            "🎯 **Example:** `/setlimit 123456789 5`",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    try:
-        target_user_id = int(context.args[0])
-        new_limit = int(context.args[1])
-        
-        if new_limit < 0:
-            await update.message.reply_text("❌ **Limit must be 0 or greater!**", parse_mode=ParseMode.MARKDOWN)
-            return
-        
-        user_limits[target_user_id] = new_limit
-        save_data()
-        
-        await update.message.reply_text(
-            f"✅ **Limit updated successfully!**\n"
-            f"👤 **User ID:** {target_user_id}\n"
-            f"📊 **New Limit:** {new_limit} likes/day",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        
-    except ValueError:
-        await update.message.reply_text(
-            "❌ **Invalid numbers!**\n"
-            "📝 **Usage:** `/setlimit <user_id> <limit>`",
-            parse_mode=ParseMode.MARKDOWN
-        )
+📅 {date} 🕐 {time}
+""", **STATIC_FIELDS)
 
-async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show all available commands"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    current_time = get_nepal_time()
-    date_str = current_time.strftime("%Y-%m-%d")
-    time_str = current_time.strftime("%H:%M:%S")
-    
-    # Check if user is owner for special display
-    if is_owner(user_id):
-        commands_text = f"""
+OWNER_COMMANDS_TEMPLATE = MessageTemplate("""
 👑 **ALL COMMANDS - OWNER ACCESS** 👑
 
 ```
@@ -1199,6 +2216,8 @@ async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 │ 🏠 /start - Welcome & main menu
 │ 🔐 /verify - Complete verification
 │ 💎 /like <region> <uid> - Send likes
+│ 🎮 /player <region> <uid> - Player profile
+│ 📜 /history - Your like history
 │ 📊 /stats - Your statistics
 │ 🔄 /status - Quick bot status
 │ 🆘 /help - Help menu
@@ -1213,11 +2232,22 @@ async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 │ ✅ /allow - Authorize current group
 │ ❌ /remove - Remove current group
 │ ⚙️ /setlimit <id> <limit> - Set limits
+│ 🏷 /tier - Limit tiers (users/groups)
+│ 👥 /groupquota - Group budgets & usage
+│ 📥 /importlimits - Limits from a file
+│ ♻️ /resetusage <id ...> - Clear usage
+│ 📦 /export [csv] - Download all data
+│ 📈 /analytics [week|month] - Usage trends
 │ 📢 /broadcast <msg> - Send to all
 │ 👥 /members - Show group members
 │ ⏰ /uptime - Bot uptime & monitoring
 │ 🧪 /testowner - Test owner status
 │ 👑 /ownerhelp - Owner commands help
+│ 🩺 /blocking - Event loop blocking report
+│ 🔬 /profile - Sampling profiler
+│ 🧠 /memsnap - Memory snapshots
+│ 💥 /faults - Upstream fault injection
+│ ⏺ /record - Record traffic for replay
 ╰─────────────────────────────────────╯
 ```
 
@@ -1227,11 +2257,11 @@ async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • `/allow` - Authorize group
 
 **👑 OWNER STATUS:** UNLIMITED ACCESS
-**📅 {date_str} 🕐 {time_str}**
+**📅 {date} 🕐 {time}**
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-        """
-    else:
-        commands_text = f"""
+""")
+
+USER_COMMANDS_TEMPLATE = MessageTemplate("""
 📝 **ALL AVAILABLE COMMANDS** 📝
 
 ```
@@ -1240,6 +2270,8 @@ async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 │ 🏠 /start - Welcome & main menu
 │ 🔐 /verify - Complete verification
 │ 💎 /like <region> <uid> - Send likes
+│ 🎮 /player <region> <uid> - Player profile
+│ 📜 /history - Your like history
 │ 📊 /stats - Your statistics
 │ 🔄 /status - Quick bot status
 │ 🆘 /help - Help menu
@@ -1255,45 +2287,14 @@ async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 **📋 REGIONS:** BD, IND, BR, US
 **⚡ DAILY LIMIT:** 2 likes per day
-**🔐 STATUS:** {"✅ VERIFIED" if is_user_verified(user_id) else "❌ NOT VERIFIED"}
+**🔐 STATUS:** {verification_status}
 
 **💡 TIP:** Use `/verify` first to unlock like commands!
-**📅 {date_str} 🕐 {time_str}**
+**📅 {date} 🕐 {time}**
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-        """
-    
-    keyboard = [
-        [InlineKeyboardButton("🔄 Refresh Commands", callback_data="refresh_commands")],
-        [InlineKeyboardButton("👥 Contact Owner", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        commands_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
-    )
+""")
 
-async def ownerhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Owner-only help command"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    
-    if not is_owner(user_id):
-        await update.message.reply_text(
-            "❌ **Owner command only!**\n"
-            f"👑 **Owner ID:** {OWNER_ID}",
-            parse_mode=ParseMode.MARKDOWN
-        )
-        return
-    
-    current_time = get_nepal_time()
-    date_str = current_time.strftime("%Y-%m-%d")
-    time_str = current_time.strftime("%H:%M:%S")
-    
-    owner_help_text = f"""
+OWNER_HELP_TEMPLATE = MessageTemplate("""
 👑 **OWNER COMMANDS HELP** 👑
 
 ```
@@ -1309,6 +2310,12 @@ async def ownerhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 👥 USER MANAGEMENT
 ╭─────────────────────────────────────╮
 │ ⚙️ /setlimit <user_id> <limit>
+│ 🏷 /tier set|user|group|clear
+│ 👥 /groupquota budget|concurrency
+│ 📥 /importlimits - CSV/JSON upload
+│ ♻️ /resetusage <user_id ...>
+│ 📦 /export [ndjson|csv]
+│ 📈 /analytics [day|week|month]
 │ 📊 /stats - View system statistics
 │ 👥 /members - Show group members
 │ 🧪 /testowner - Test owner recognition
@@ -1346,6 +2353,22 @@ async def ownerhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 ╰─────────────────────────────────────╯
 ```
 
+```
+🩺 DIAGNOSTICS
+╭─────────────────────────────────────╮
+│ 🩺 /blocking - Event loop blocking report
+│ 🩺 /blocking reset - Clear the report
+│ 🔬 /profile [seconds] - Profile, get stacks
+│ 🔬 /profile stop - Stop early
+│ 🧠 /memsnap start - Start memory tracing
+│ 🧠 /memsnap - Snapshot (diffs previous)
+│ 🧠 /memsnap stop - Stop memory tracing
+│ 💥 /faults - Upstream fault injection
+│ 💥 /faults <preset> | off - Toggle faults
+│ ⏺ /record start|stop - Record traffic
+╰─────────────────────────────────────╯
+```
+
 **🔧 OWNER PRIVILEGES:**
 • ♾️ Unlimited likes per day
 • 🏠 Can use bot in any group
@@ -1356,55 +2379,3149 @@ async def ownerhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • 📊 Group member information access
 
 **📊 CURRENT STATUS:**
-• **Owner ID:** {OWNER_ID} & {ALTERNATE_OWNER_ID}
-• **Groups Allowed:** {len(allowed_groups)}
+• **Owner ID:** {owner_id} & {alternate_owner_id}
+• **Groups Allowed:** {allowed_group_count}
 • **Default Limit:** {default_limit} likes/day
 
-**📅 {date_str} 🕐 {time_str}**
+**📅 {date} 🕐 {time}**
 **🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-    """
-    
-    keyboard = [
-        [
-            InlineKeyboardButton("📊 View Stats", callback_data="refresh_stats"),
-            InlineKeyboardButton("🔄 Refresh Help", callback_data="refresh_owner_help")
-        ],
-        [InlineKeyboardButton("👥 Contact Support", url=f"https://t.me/{CONTACT_OWNER[1:]}")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        owner_help_text,
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
-    )
+""", **STATIC_FIELDS)
 
-async def test_owner_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Test command to check owner recognition"""
-    if not update.effective_user or not update.message:
-        return
-    
-    user_id = update.effective_user.id
-    logger.info(f"Test owner command called by user_id: {user_id}")
-    
-    if not is_owner(user_id):
+VERIFICATION_COMPLETED_TEMPLATE = MessageTemplate("""
+🎉 **VERIFICATION COMPLETED!** 🎉
+
+```
+✅ CONGRATULATIONS!
+╭─────────────────────────────────────╮
+│ 🔐 Status: FULLY VERIFIED
+│ 🎮 Access: GRANTED
+│ 💎 Limits: ACTIVE
+│ 🚀 Ready: YES
+╰─────────────────────────────────────╯
+```
+
+**🎮 YOU CAN NOW:**
+• Send Free Fire likes
+• Use all bot commands
+• Access premium features
+
+**🎯 TRY NOW:** `/like bd 5914395123`
+
+**🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
+""")
+
+LIKE_HELP_TEMPLATE = MessageTemplate("""
+💎 **LIKE COMMAND GUIDE** 💎
+
+**📝 FORMAT:**
+`/like <region> <uid>`
+
+**🌍 REGIONS:**
+• **BD** - Bangladesh
+• **IND** - India  
+• **BR** - Brazil
+• **US** - United States
+
+**🎯 EXAMPLES:**
+• `/like bd 5914395123`
+• `/like ind 1234567890`
+• `/like br 9876543210`
+
+**⚡ START SENDING LIKES NOW!**
+""")
+
+# Keyboards are immutable in python-telegram-bot v20, so each one is built once
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔐 Start Verification", callback_data="start_verify")],
+    [InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)],
+    [InlineKeyboardButton("👥 Contact Owner", url=CONTACT_OWNER_URL)]
+])
+
+VERIFIED_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)],
+    [InlineKeyboardButton("👥 Contact Owner", url=CONTACT_OWNER_URL)]
+])
+
+VERIFY_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("1️⃣ YouTube Channel", url=VERIFICATION_LINKS['youtube']),
+        InlineKeyboardButton("2️⃣ Telegram Channel", url=VERIFICATION_LINKS['telegram_channel'])
+    ],
+    [
+        InlineKeyboardButton("3️⃣ Telegram Group", url=VERIFICATION_LINKS['telegram_group']),
+        InlineKeyboardButton("4️⃣ Discord Server", url=VERIFICATION_LINKS['discord'])
+    ],
+    [InlineKeyboardButton("✅ Complete Done", callback_data="complete_verification")]
+])
+
+UPTIME_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔄 Refresh Status", callback_data="refresh_uptime"),
+        InlineKeyboardButton("📊 Full Stats", callback_data="refresh_stats")
+    ],
+    [
+        InlineKeyboardButton("💾 Save Report", callback_data="save_uptime_report"),
+        InlineKeyboardButton("👑 Owner Help", callback_data="refresh_owner_help")
+    ]
+])
+
+STATUS_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📝 All Commands", callback_data="refresh_commands"),
+        InlineKeyboardButton("🔐 Verify Now", callback_data="start_verification")
+    ]
+])
+
+STATS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh Stats", callback_data="refresh_stats")],
+    [InlineKeyboardButton("👥 Contact Owner", url=CONTACT_OWNER_URL)]
+])
+
+HELP_KEYBOARD = START_KEYBOARD
+
+CONTACT_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("👑 Message Owner", url=CONTACT_OWNER_URL),
+        InlineKeyboardButton("🎮 Join Discord", url=DISCORD_LINK)
+    ],
+    [
+        InlineKeyboardButton("📢 Channel", url=VERIFICATION_LINKS['telegram_channel']),
+        InlineKeyboardButton("👥 Group", url=VERIFICATION_LINKS['telegram_group'])
+    ]
+])
+
+COMMANDS_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Refresh Commands", callback_data="refresh_commands")],
+    [InlineKeyboardButton("👥 Contact Owner", url=CONTACT_OWNER_URL)]
+])
+
+OWNER_HELP_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📊 View Stats", callback_data="refresh_stats"),
+        InlineKeyboardButton("🔄 Refresh Help", callback_data="refresh_owner_help")
+    ],
+    [InlineKeyboardButton("👥 Contact Support", url=CONTACT_OWNER_URL)]
+])
+
+MEMBERS_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔄 Refresh Info", callback_data="refresh_members"),
+        InlineKeyboardButton("📊 Get Stats", callback_data="refresh_stats")
+    ],
+    [InlineKeyboardButton("👑 Owner Help", callback_data="refresh_owner_help")]
+])
+
+VERIFICATION_COMPLETED_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎮 Try Like Command", callback_data="show_like_help")],
+    [InlineKeyboardButton("📊 View Stats", callback_data="refresh_stats")]
+])
+
+# ===============================
+# ADAPTIVE REPLIES
+# ===============================
+
+# Fast replies send one message instead of "Processing" + edit
+like_reply_stats = {'fast_replies': 0, 'slow_replies': 0}
+
+async def reply_or_edit(message, processing_msg, text: str):
+    """Edit the processing message if one was shown, otherwise reply once"""
+    if processing_msg:
+        return await processing_msg.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+    return await message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
+async def show_screen(update: Update, text: str, **kwargs) -> bool:
+    """Reply to a command, or redraw the message whose button was pressed; False if nothing changed"""
+    if update.callback_query:
+        return await edit_callback_message(update.callback_query, text, **kwargs)
+    await update.message.reply_text(text, **kwargs)
+    return True
+
+# ===============================
+# METRICS
+# ===============================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    """Render a Prometheus label set"""
+    pairs = [
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}  # label values tuple: count
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.callback = callback
+        self.values = {}
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        values = self.values
+        if self.callback:
+            try:
+                values = {(): self.callback()}
+            except Exception as e:
+                logger.error("Error reading gauge %s: %s", self.name, e)
+                values = {}
+        for label_values, value in values.items():
+            lines.append(f"{self.name}{format_labels(self.labels, label_values)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}  # label values tuple: [bucket counts, sum, count]
+
+    def observe(self, value: float, *label_values):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][index] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, label_values)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, label_values)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric and serves them in Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+        self.runner = None
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    async def handle_scrape(self, request):
+        return aiohttp.web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host: str, port: int):
+        """Serve /metrics on a local HTTP port"""
+        app = aiohttp.web.Application()
+        app.router.add_get("/metrics", self.handle_scrape)
+        self.runner = aiohttp.web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await aiohttp.web.TCPSite(self.runner, host, port).start()
+        logger.info("Metrics available at http://%s:%s/metrics", host, port)
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+metrics = MetricsRegistry()
+
+handler_latency = metrics.register(Histogram(
+    "bot_handler_duration_seconds", "Time spent in each update handler", ("handler",)))
+handler_errors = metrics.register(Counter(
+    "bot_handler_errors_total", "Unhandled exceptions raised by update handlers", ("handler",)))
+update_lag = metrics.register(Histogram(
+    "bot_update_lag_seconds", "Delay between the Telegram message date and handler start", ("handler",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)))
+upstream_latency = metrics.register(Histogram(
+    "bot_upstream_duration_seconds", "Like API request duration", ("region", "status")))
+upstream_errors = metrics.register(Counter(
+    "bot_upstream_errors_total", "Like API requests that failed", ("region", "reason")))
+group_likes_refused = metrics.register(Counter(
+    "bot_group_likes_refused_total", "/like calls refused by a group's budget or concurrency cap", ("reason",)))
+save_duration = metrics.register(Histogram(
+    "bot_save_duration_seconds", "Time save_data() blocks the event loop",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)))
+metrics.register(Gauge(
+    "bot_pending_deletions", "Messages waiting in the auto-delete scheduler",
+    callback=lambda: len(message_cleaner.heap)))
+metrics.register(Gauge(
+    "bot_pending_member_events", "Join/leave events waiting for a digest",
+    callback=lambda: sum(len(entry['events']) for entry in member_notifier.pending.values())))
+metrics.register(Gauge(
+    "bot_loop_lag_seconds", "Event loop lag from the latest system sample",
+    callback=lambda: system_monitor.latest.get('loop_lag_ms', 0.0) / 1000))
+
+def instrumented(func):
+    """Decorator recording handler latency, update lag and errors"""
+    name = func.__name__.replace("_command", "")
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        message = update.effective_message if update else None
+        if message and message.date and not update.callback_query:
+            update_lag.observe(max(0.0, time.time() - message.date.timestamp()), name)
+        token = log_correlation_id.set(f"{update.update_id}:{name}" if update else name)
+        start = time.perf_counter()
+        try:
+            return await func(update, context, *args, **kwargs)
+        except Exception:
+            handler_errors.inc(name)
+            raise
+        finally:
+            handler_latency.observe(time.perf_counter() - start, name)
+            log_correlation_id.reset(token)
+    
+    return wrapper
+
+# ===============================
+# EVENT LOOP WATCHDOG
+# ===============================
+
+class LoopWatchdog:
+    """Detect event-loop blocking and record where the loop was stuck"""
+
+    def __init__(self, interval: float, threshold: float, max_sites: int):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_sites = max_sites
+        self.sites = {}  # call site: {'count', 'total', 'max', 'stack'}
+        self.blocks = 0
+        self.last_beat = time.monotonic()
+        self.beat_id = 0
+        self.captured = None  # (beat_id, call site, stack lines) from the watcher thread
+        self.loop_thread_id = None
+        self.task = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopping.clear()
+        self.task = asyncio.create_task(self._heartbeat())
+        self.thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self.thread.start()
+
+    async def stop(self):
+        self.stopping.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def _heartbeat(self):
+        """Runs on the loop; a late wake-up means the loop was blocked"""
+        while True:
+            expected = time.monotonic() + self.interval
+            self.last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - expected
+            if lag >= self.threshold:
+                self._record_block(lag)
+            self.beat_id += 1
+
+    def _watch(self):
+        """Runs in a thread; samples the loop thread's stack while it is stuck"""
+        while not self.stopping.wait(self.interval):
+            beat_id = self.beat_id
+            stalled = time.monotonic() - self.last_beat - self.interval
+            if stalled < self.threshold or (self.captured and self.captured[0] == beat_id):
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame, limit=WATCHDOG_STACK_DEPTH)
+            del frame
+            self.captured = (beat_id, self._call_site(stack), traceback.format_list(stack))
+
+    @staticmethod
+    def _call_site(stack) -> str:
+        """Innermost frame in this file, else the innermost frame"""
+        for entry in reversed(stack):
+            if entry.filename == __file__:
+                return f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+        entry = stack[-1]
+        return f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+
+    def _record_block(self, seconds: float):
+        self.blocks += 1
+        loop_blocks.inc()
+        loop_block_duration.observe(seconds)
+        captured = self.captured
+        if captured and captured[0] == self.beat_id:
+            site, stack = captured[1], captured[2]
+        else:
+            # Block ended before the watcher thread could sample it
+            site, stack = "unknown (not sampled)", []
+        entry = self.sites.get(site)
+        if entry is None:
+            if len(self.sites) >= self.max_sites:
+                # Evict the least significant site to bound memory
+                del self.sites[min(self.sites, key=lambda key: self.sites[key]['total'])]
+            entry = self.sites[site] = {'count': 0, 'total': 0.0, 'max': 0.0, 'stack': stack}
+        entry['count'] += 1
+        entry['total'] += seconds
+        entry['max'] = max(entry['max'], seconds)
+        if stack:
+            entry['stack'] = stack
+        logger.warning("Event loop blocked for %.0f ms at %s", seconds * 1000, site)
+
+    def top_sites(self, limit: int = 5) -> list:
+        return sorted(self.sites.items(), key=lambda item: item[1]['total'], reverse=True)[:limit]
+
+    def reset(self):
+        self.sites.clear()
+        self.blocks = 0
+
+loop_blocks = metrics.register(Counter(
+    "bot_loop_blocks_total", "Times the event loop was blocked longer than the watchdog threshold"))
+loop_block_duration = metrics.register(Histogram(
+    "bot_loop_block_seconds", "Duration of detected event loop blocks",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)))
+
+loop_watchdog = LoopWatchdog(WATCHDOG_INTERVAL, WATCHDOG_THRESHOLD, WATCHDOG_MAX_SITES)
+
+# ===============================
+# ON-DEMAND PROFILING
+# ===============================
+
+class SamplingProfiler:
+    """Stack-sampling profiler; the sampler thread only exists while profiling"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = {}  # collapsed stack: sample count
+        self.samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+        self.stop_requested = None  # asyncio.Event set by stop() to end a run early
+        self.task = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self.stopping.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                parts.append(names.get(thread_id, str(thread_id)))
+                key = ";".join(reversed(parts))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    async def profile(self, seconds: float) -> str:
+        """Sample for `seconds` (or until stop()) and return collapsed stacks"""
+        self.stacks = {}
+        self.samples = 0
+        self.stopping.clear()
+        self.stop_requested = asyncio.Event()
+        self.thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        try:
+            try:
+                await asyncio.wait_for(self.stop_requested.wait(), seconds)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            self.stopping.set()
+            await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+            self.thread = None
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])]
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        """End the current run early; its results are still sent"""
+        if self.running and self.stop_requested is not None:
+            self.stop_requested.set()
+
+profiler = SamplingProfiler(PROFILER_INTERVAL)
+
+async def run_profile_and_report(bot, chat_id: int, seconds: float):
+    """Background job behind /profile: profile, then send the result as a document"""
+    # stop() ends the run early and still reports; cancellation propagates without sending
+    collapsed = await profiler.profile(seconds)
+    try:
+        await bot.send_document(
+            chat_id=chat_id,
+            document=io.BytesIO(collapsed.encode()),
+            filename=f"profile_{get_nepal_time().strftime('%Y%m%d_%H%M%S')}.collapsed.txt",
+            caption=f"🔬 Profile: {profiler.samples} samples (collapsed stacks, flamegraph.pl compatible)"
+        )
+    except Exception as e:
+        logger.error("Failed to send profile: %s", e)
+
+class MemorySnapshots:
+    """tracemalloc snapshots; tracing is off unless an owner starts it"""
+
+    def __init__(self, frames: int, top: int):
+        self.frames = frames
+        self.top = top
+        self.last = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.last = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self.last = None
+
+    def take(self) -> str:
+        """Snapshot now; diff against the previous snapshot when there is one"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        header = [
+            f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB",
+        ]
+        if self.last is None:
+            header.append(f"Top {self.top} allocators (baseline snapshot):")
+            stats = snapshot.statistics('lineno')[:self.top]
+            body = [str(stat) for stat in stats]
+        else:
+            header.append(f"Top {self.top} changes since previous snapshot:")
+            stats = snapshot.compare_to(self.last, 'traceback')[:self.top]
+            body = []
+            for stat in stats:
+                body.append(str(stat))
+                body.extend(f"    {line}" for line in stat.traceback.format()[-6:])
+        self.last = snapshot
+        return "\n".join(header + [""] + body) + "\n"
+
+memory_snapshots = MemorySnapshots(TRACEMALLOC_FRAMES, TRACEMALLOC_TOP)
+
+# ===============================
+# PERMISSION DECORATOR
+# ===============================
+
+def group_permission_required(func):
+    """Decorator to check group permissions"""
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        if not update.effective_chat or not update.effective_user:
+            return
+        
+        chat_id = update.effective_chat.id
+        user_id = update.effective_user.id
+        
+        # Owner can use commands anywhere
+        if is_owner(user_id):
+            return await func(update, context, *args, **kwargs)
+        
+        # Check if group is allowed (private chats always allowed)
+        if not is_group_allowed(chat_id):
+            # Send warning message only in groups
+            if chat_id < 0:
+                not_allowed_text = UNAUTHORIZED_GROUP_TEMPLATE.render()
+                
+                if update.message:
+                    msg = await update.message.reply_text(
+                        not_allowed_text,
+                        parse_mode=ParseMode.MARKDOWN,
+                        disable_web_page_preview=True
+                    )
+                
+                    # Delete warning and command later without holding the handler
+                    delete_later(msg, UNAUTHORIZED_WARNING_TTL)
+                    delete_later(update.message, UNAUTHORIZED_WARNING_TTL)
+            return
+        
+        return await func(update, context, *args, **kwargs)
+    
+    return wrapper
+
+# ===============================
+# ANTI-FLOOD
+# ===============================
+
+class FloodLimiter:
+    """GCRA rate limiter keyed by user or chat and command; idle keys are evicted"""
+    
+    def __init__(self, user_limits: dict, chat_limits: dict, max_keys: int):
+        self.user_limits = user_limits
+        self.chat_limits = chat_limits
+        self.max_keys = max_keys
+        self.state = OrderedDict()  # (scope, id, command): [theoretical arrival time, notified], oldest first
+    
+    @staticmethod
+    def rule(limits: dict, command: str) -> tuple:
+        return limits.get(command, limits['default'])
+    
+    def hit(self, user_id: int, chat_id: int, private: bool, command: str, now: float = None) -> Optional[tuple]:
+        """Count one request; None if allowed, else (scope, retry_after, notify)"""
+        now = time.monotonic() if now is None else now
+        checks = [(('user', user_id, command), self.rule(self.user_limits, command))]
+        if not private:
+            checks.append((('chat', chat_id, command), self.rule(self.chat_limits, command)))
+        
+        # Check every scope before counting the request against any of them
+        arrivals = []
+        for key, (count, period, mode) in checks:
+            entry = self.state.get(key)
+            tat = max(entry[0], now) if entry else now
+            next_tat = tat + period / count
+            if next_tat - now > period:
+                notify = mode == "notice" and not entry[1]
+                entry[1] = True
+                return key[0], next_tat - now - period, notify
+            arrivals.append((key, next_tat))
+        
+        for key, next_tat in arrivals:
+            self.state[key] = [next_tat, False]
+            self.state.move_to_end(key)
+        self._evict(now)
+        return None
+    
+    def _evict(self, now: float):
+        # A key whose arrival time has passed behaves exactly like a missing one
+        while self.state:
+            key, entry = next(iter(self.state.items()))
+            if entry[0] > now and len(self.state) <= self.max_keys:
+                break
+            del self.state[key]
+
+flood_limiter = FloodLimiter(FLOOD_USER_LIMITS, FLOOD_CHAT_LIMITS, FLOOD_MAX_KEYS)
+flood_dropped = metrics.register(Counter(
+    "bot_flood_dropped_total", "Updates dropped by the anti-flood limiter", ("command", "scope")))
+
+def update_command(update: Update) -> Optional[str]:
+    """Command name or callback action (data up to the first ':') an update would trigger, if any"""
+    if update.callback_query:
+        # Page cursors and other arguments must not get their own limiter bucket or metric label
+        return (update.callback_query.data or "").split(":", 1)[0]
+    message = update.message
+    if message and message.text and message.text.startswith("/"):
+        return message.text.split(maxsplit=1)[0][1:].split("@")[0].lower()
+    return None
+
+async def flood_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs before the command handlers and stops updates over their limit"""
+    user = update.effective_user
+    chat = update.effective_chat
+    if not user or not chat or is_owner(user.id):
+        return
+    command = update_command(update)
+    if command is None:
+        return
+    
+    blocked = flood_limiter.hit(user.id, chat.id, chat.type == "private", command)
+    if blocked is None:
+        return
+    
+    scope, retry_after, notify = blocked
+    flood_dropped.inc(command, scope)
+    retry_after = max(1, math.ceil(retry_after))
+    try:
+        if update.callback_query:
+            # Always answered, or the button keeps spinning until Telegram gives up
+            await update.callback_query.answer(f"⏳ Slow down! Try again in {retry_after}s" if notify else None)
+        elif notify and update.message:
+            msg = await update.message.reply_text(
+                FLOOD_NOTICE_TEMPLATE.render(retry_after=retry_after),
+                parse_mode=ParseMode.MARKDOWN
+            )
+            delete_later(msg, FLOOD_NOTICE_TTL)
+    except Exception as e:
+        logger.error("Failed to send cooldown notice: %s", e)
+    raise ApplicationHandlerStop
+
+# ===============================
+# TRAFFIC RECORDING
+# ===============================
+
+class TrafficRecorder:
+    """Writes anonymised updates and like API responses for offline replay"""
+    
+    NAME_FIELDS = ('first_name', 'last_name', 'username', 'title', 'bio', 'invite_link')
+    
+    def __init__(self):
+        self.file = None
+        self.path = None
+        self.salt = b""
+        self.started = 0.0
+        self.records = 0
+    
+    @property
+    def recording(self) -> bool:
+        return self.file is not None
+    
+    def anon_id(self, value: int) -> int:
+        """Stable pseudonym for a Telegram user or chat ID (sign kept, owners kept)"""
+        if value in (OWNER_ID, ALTERNATE_OWNER_ID):
+            return value
+        digest = hashlib.blake2b(str(abs(value)).encode(), key=self.salt, digest_size=5).digest()
+        anon = 10 ** 9 + int.from_bytes(digest, "big") % (9 * 10 ** 12)
+        return -anon if value < 0 else anon
+    
+    def anonymise_command(self, text: str) -> str:
+        """Command name kept; arguments only as far as replay needs them"""
+        command, *args = text.split()
+        name = command[1:].split("@")[0].lower()
+        if name in RECORD_VERBATIM_COMMANDS:
+            return " ".join([command, *args])
+        if name not in RECORD_ARG_COMMANDS:
+            return command
+        kept = [command]
+        for arg in args:
+            if arg.isascii() and arg.lstrip("-").isdigit() and abs(int(arg)) >= RECORD_ID_MIN:
+                kept.append(str(self.anon_id(int(arg))))
+            elif arg.isascii() and len(arg) <= RECORD_KEYWORD_MAX_CHARS and arg.replace("-", "").replace("_", "").isalnum():
+                kept.append(arg)
+            else:
+                kept.append("[redacted]")
+        return " ".join(kept)
+    
+    def anonymise(self, value):
+        if isinstance(value, dict):
+            # Free text is dropped and command arguments pseudonymised; only commands matter for replay
+            text = value.get('text') or value.get('caption')
+            command = isinstance(text, str) and text.startswith("/")
+            redact = isinstance(text, str) and not command
+            result = {}
+            for key, item in value.items():
+                if key in ('id', 'user_id', 'chat_id') and isinstance(item, int):
+                    result[key] = self.anon_id(item)
+                elif key in self.NAME_FIELDS and isinstance(item, str):
+                    result[key] = key.replace("_", " ").title()
+                elif redact and key in ('text', 'caption'):
+                    result[key] = "[redacted]"
+                elif redact and key in ('entities', 'caption_entities'):
+                    continue
+                elif command and key in ('text', 'caption'):
+                    result[key] = self.anonymise_command(item)
+                elif command and key in ('entities', 'caption_entities'):
+                    # Only the leading command survives; other entities point into rewritten text
+                    result[key] = [self.anonymise(entity) for entity in item
+                                   if entity.get('type') == "bot_command" and entity.get('offset') == 0]
+                else:
+                    result[key] = self.anonymise(item)
+            return result
+        if isinstance(value, list):
+            return [self.anonymise(item) for item in value]
+        return value
+    
+    def snapshot_state(self) -> dict:
+        """Anonymised copy of the data file contents"""
+        return {
+            'user_limits': {self.anon_id(k): v for k, v in user_limits.items()},
+            'user_usage': {self.anon_id(k): v for k, v in user_usage.items()},
+            'user_verification': {self.anon_id(k): v for k, v in user_verification.items()},
+            'allowed_groups': {self.anon_id(k): self.anonymise(v) for k, v in allowed_groups.items()},
+            'user_tiers': {self.anon_id(k): v for k, v in user_tiers.items()},
+            'limit_tiers': limit_tiers,
+            'group_usage': {self.anon_id(k): v for k, v in group_usage.items()},
+        }
+    
+    def _write(self, record: dict):
+        self.file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self.records += 1
+    
+    def start(self, path: str):
+        if self.recording:
+            self.stop()
+        self.salt = os.urandom(16)
+        self.path = path
+        self.file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.monotonic()
+        self.records = 0
+        self._write({'kind': "header", 'version': 1, 'date': nepal_clock.today_key(),
+                     'state': self.snapshot_state()})
+        logger.info("Recording traffic to %s", path)
+    
+    def stop(self):
+        if self.file is not None:
+            self.file.close()
+            logger.info("Recorded %s records to %s", self.records, self.path)
+            self.file = None
+    
+    def update(self, update: Update):
+        self._write({'kind': "update", 't': round(time.monotonic() - self.started, 4),
+                     'update': self.anonymise(update.to_dict())})
+    
+    def upstream(self, params: dict, duration: float, status: int = None, body: str = None, error: str = None):
+        record = {'kind': "upstream", 't': round(time.monotonic() - self.started, 4),
+                  'uid': params.get('uid'), 'region': params.get('region'), 'duration': round(duration, 4)}
+        if error:
+            record['error'] = error
+        else:
+            record['status'] = status
+            record['body'] = body
+        self._write(record)
+
+traffic_recorder = TrafficRecorder()
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs before every other handler; cheap no-op unless recording"""
+    if traffic_recorder.recording:
+        traffic_recorder.update(update)
+
+# ===============================
+# UPSTREAM CLIENT
+# ===============================
+
+class FaultInjector:
+    """Degrades like API requests on purpose to test how the bot copes"""
+    
+    FAULTS = ('timeout', 'server_error', 'truncated_json', 'invalid_json', 'bad_status')
+    LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'exponential', 'lognormal')
+    PRESETS = {
+        'slow': {'latency_ms': 2000, 'latency_dist': 'lognormal'},
+        'flapping': {'server_error': 0.3, 'timeout': 0.1, 'latency_ms': 500, 'latency_dist': 'exponential'},
+        'garbage': {'truncated_json': 0.15, 'invalid_json': 0.15, 'bad_status': 0.15},
+        'outage': {'server_error': 1.0},
+    }
+    
+    def __init__(self):
+        self.settings = {}
+        self.injected = {}  # fault: count
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.settings)
+    
+    @classmethod
+    def parse(cls, spec: str) -> dict:
+        """Parse "off", a preset name or "fault=rate latency_ms=N latency_dist=name" pairs"""
+        settings = {}
+        for token in spec.replace(",", " ").split():
+            token = token.lower()
+            if token == "off":
+                continue
+            if token in cls.PRESETS:
+                settings.update(cls.PRESETS[token])
+                continue
+            key, sep, value = token.partition("=")
+            if not sep:
+                raise ValueError(f"unknown preset: {token}")
+            if key == 'latency_dist':
+                if value not in cls.LATENCY_DISTRIBUTIONS:
+                    raise ValueError(f"unknown latency distribution: {value}")
+                settings[key] = value
+            elif key == 'latency_ms':
+                settings[key] = max(0.0, float(value))
+            elif key in cls.FAULTS:
+                settings[key] = min(1.0, max(0.0, float(value)))
+            else:
+                raise ValueError(f"unknown fault: {key}")
+        if sum(settings.get(fault, 0.0) for fault in cls.FAULTS) > 1.0:
+            raise ValueError("fault rates add up to more than 1")
+        return {key: value for key, value in settings.items() if value}
+    
+    def configure(self, spec: str):
+        self.settings = self.parse(spec)
+        self.injected = {}
+        if self.settings:
+            logger.warning("Upstream fault injection enabled: %s", self.describe())
+    
+    def describe(self) -> str:
+        if not self.settings:
+            return "off"
+        return " ".join(f"{key}={value}" for key, value in sorted(self.settings.items()))
+    
+    def delay(self) -> float:
+        """Extra latency for one request, drawn from the configured distribution"""
+        mean = self.settings.get('latency_ms', 0.0) / 1000
+        if not mean:
+            return 0.0
+        distribution = self.settings.get('latency_dist', 'fixed')
+        if distribution == 'uniform':
+            return random.uniform(0, 2 * mean)
+        if distribution == 'normal':
+            return max(0.0, random.gauss(mean, mean / 4))
+        if distribution == 'exponential':
+            return random.expovariate(1 / mean)
+        if distribution == 'lognormal':
+            # Median at the mean setting with a long tail, like a cold-starting host
+            return random.lognormvariate(0, 1) * mean
+        return mean
+    
+    def pick(self) -> Optional[str]:
+        """Choose at most one fault for a request"""
+        roll = random.random()
+        for fault in self.FAULTS:
+            rate = self.settings.get(fault, 0.0)
+            if roll < rate:
+                self.injected[fault] = self.injected.get(fault, 0) + 1
+                upstream_faults.inc(fault)
+                return fault
+            roll -= rate
+        return None
+    
+    @staticmethod
+    def corrupt(fault: str, body: str) -> str:
+        """Damage a real response body"""
+        if fault == 'truncated_json':
+            return body[:len(body) // 2]
+        if fault == 'invalid_json':
+            return "<html><head><title>502 Bad Gateway</title></head><body>Bad Gateway</body></html>"
+        if fault == 'bad_status':
+            try:
+                payload = json.loads(body)
+                payload['status'] = random.choice((0, 4, 99, -1))
+                return json.dumps(payload)
+            except (ValueError, TypeError):
+                return body
+        return body
+
+class UpstreamClient:
+    """Shared HTTP session for the like API, with optional fault injection"""
+    
+    def __init__(self, faults: FaultInjector):
+        self.faults = faults
+        self.session = None
+    
+    async def get(self, url: str, params: dict) -> Tuple[int, str]:
+        """GET a URL and return (status, body text)"""
+        fault = None
+        if self.faults.enabled:
+            delay = self.faults.delay()
+            if delay >= UPSTREAM_TIMEOUT:
+                await asyncio.sleep(UPSTREAM_TIMEOUT)
+                raise asyncio.TimeoutError()
+            if delay:
+                await asyncio.sleep(delay)
+            fault = self.faults.pick()
+            if fault == 'timeout':
+                await asyncio.sleep(max(0.0, UPSTREAM_TIMEOUT - delay))
+                raise asyncio.TimeoutError()
+            if fault == 'server_error':
+                return random.choice((500, 502, 503, 504)), "Service Unavailable"
+        
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+        start = time.perf_counter()
+        try:
+            async with self.session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=UPSTREAM_TIMEOUT)) as response:
+                status = response.status
+                body = await response.text()
+        except Exception as e:
+            if traffic_recorder.recording:
+                traffic_recorder.upstream(params, time.perf_counter() - start, error=type(e).__name__)
+            raise
+        if traffic_recorder.recording:
+            traffic_recorder.upstream(params, time.perf_counter() - start, status=status, body=body)
+        
+        if fault:
+            body = self.faults.corrupt(fault, body)
+        return status, body
+    
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+upstream_faults = metrics.register(Counter(
+    "bot_upstream_faults_injected_total", "Faults injected into like API requests", ("fault",)))
+fault_injector = FaultInjector()
+fault_injector.configure(UPSTREAM_FAULTS)
+upstream = UpstreamClient(fault_injector)
+
+# ===============================
+# API FUNCTIONS
+# ===============================
+
+class PlayerCache:
+    """LRU + TTL cache of player profiles taken from like API responses"""
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (api_region, uid): {nickname, likes, found, seen}, least recent first
+        self.hits = 0
+        self.misses = 0
+    
+    def record(self, uid: str, api_region: str, result: dict):
+        """Keep what a like API response says about the player"""
+        status = result.get('status')
+        player = result.get('player') or {}
+        likes = result.get('likes') or {}
+        if status == 1:
+            entry = {'nickname': player.get('nickname', 'Unknown'), 'likes': likes.get('after', 0), 'found': True}
+        elif status == 2:
+            entry = {'nickname': player.get('nickname', 'Unknown'), 'likes': likes.get('before', 0), 'found': True}
+        elif status == 3:
+            entry = {'found': False}
+        else:
+            return
+        entry['seen'] = time.time()
+        self.put((api_region, uid), entry)
+    
+    def put(self, key: tuple, entry: dict):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def get(self, uid: str, api_region: str) -> Optional[dict]:
+        key = (api_region, uid)
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry['seen'] >= self.ttl:
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+    
+    def load(self, path: str):
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path) as f:
+                rows = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Error loading player cache: %s", e)
+            return
+        cutoff = time.time() - self.ttl
+        for api_region, uid, entry in rows:
+            if entry['seen'] > cutoff:
+                self.put((api_region, uid), entry)
+        logger.info("Loaded %s cached player profiles", len(self.entries))
+    
+    def save(self, path: str):
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump([[api_region, uid, entry] for (api_region, uid), entry in self.entries.items()], f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.error("Error saving player cache: %s", e)
+
+player_cache = PlayerCache(PLAYER_CACHE_SIZE, PLAYER_CACHE_TTL)
+metrics.register(Gauge(
+    "bot_player_cache_entries", "Player profiles held for /player", callback=lambda: len(player_cache.entries)))
+
+async def fetch_like(uid: str, region: str) -> Optional[Dict[str, Any]]:
+    """Fetch likes from the API"""
+    api_region = detect_region(region)
+    start = time.perf_counter()
+    try:
+        status, body = await upstream.get(LIKE_API_URL, {'uid': uid, 'region': api_region, 'key': API_KEY})
+    except Exception as e:
+        logger.error("Error fetching likes: %s", e)
+        elapsed = time.perf_counter() - start
+        upstream_latency.observe(elapsed, api_region, "error")
+        usage_analytics.upstream_latency(elapsed)
+        upstream_errors.inc(api_region, type(e).__name__)
+        return None
+    
+    elapsed = time.perf_counter() - start
+    upstream_latency.observe(elapsed, api_region, status)
+    usage_analytics.upstream_latency(elapsed)
+    if status != 200:
+        logger.error("API request failed: %s", status)
+        upstream_errors.inc(api_region, "http_status")
+        return None
+    
+    try:
+        result = json.loads(body)
+    except ValueError:
+        logger.error("API returned invalid JSON: %.80r", body)
+        upstream_errors.inc(api_region, "invalid_json")
+        return None
+    if not isinstance(result, dict):
+        logger.error("API returned unexpected payload: %.80r", body)
+        upstream_errors.inc(api_region, "invalid_payload")
+        return None
+    player_cache.record(uid, api_region, result)
+    return result
+
+# ===============================
+# LIKE HISTORY
+# ===============================
+
+class LikeHistory:
+    """Append-only log of /like attempts in SQLite, indexed by UID, user and day
+    
+    record() only appends to a buffer; a background task writes batches from a
+    thread and prunes events older than the retention period.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS like_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, day TEXT, user_id INTEGER, chat_id INTEGER,
+            uid TEXT, region TEXT, outcome TEXT, added INTEGER);
+        CREATE INDEX IF NOT EXISTS like_events_uid ON like_events (uid, id);
+        CREATE INDEX IF NOT EXISTS like_events_user ON like_events (user_id, id);
+        CREATE INDEX IF NOT EXISTS like_events_day ON like_events (day, id);
+    """
+    FILTERS = {'user': "user_id", 'uid': "uid", 'day': "day", 'all': None}
+    
+    def __init__(self, path: str, flush_interval: float, batch_size: int, retention_days: int):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.buffer = []
+        self.db = None
+        self.lock = threading.Lock()  # The connection is used from executor threads
+        self.wakeup = None
+        self.task = None
+        self.written = 0
+        self.last_prune = 0.0
+    
+    def record(self, user_id: int, chat_id: int, uid: str, region: str, outcome: str, added: int = 0):
+        self.buffer.append((time.time(), nepal_clock.today_key(), user_id, chat_id, uid, region, outcome, added))
+        if len(self.buffer) >= self.batch_size and self.wakeup:
+            self.wakeup.set()
+    
+    def _connect(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, isolation_level=None, timeout=10, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(self.SCHEMA)
+    
+    def _write(self, events: list):
+        with self.lock:
+            self._connect()
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.executemany(
+                    "INSERT INTO like_events (ts, day, user_id, chat_id, uid, region, outcome, added) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", events)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+    
+    def _prune(self, older_than: float) -> int:
+        with self.lock:
+            self._connect()
+            return self.db.execute("DELETE FROM like_events WHERE ts < ?", (older_than,)).rowcount
+    
+    def _page(self, kind: str, value, before: Optional[int], after: Optional[int], limit: int) -> list:
+        column = self.FILTERS[kind]
+        where, params = [], []
+        if column:
+            where.append(f"{column} = ?")
+            params.append(value)
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        if after is not None:
+            where.append("id > ?")
+            params.append(after)
+        sql = "SELECT id, ts, user_id, uid, region, outcome, added FROM like_events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Newer pages walk the index upwards, then read back newest first
+        sql += f" ORDER BY id {'ASC' if after is not None else 'DESC'} LIMIT ?"
+        with self.lock:
+            self._connect()
+            rows = self.db.execute(sql, params + [limit]).fetchall()
+        return rows[::-1] if after is not None else rows
+    
+    def _events(self, start: float, end: float) -> list:
+        with self.lock:
+            self._connect()
+            rows = self.db.execute(
+                "SELECT ts, day, user_id, chat_id, region, outcome FROM like_events WHERE ts >= ? AND ts < ?",
+                (start, end)).fetchall()
+        return [(day, datetime.fromtimestamp(ts, NEPAL_TZ).hour, user_id, chat_id, detect_region(region), outcome)
+                for ts, day, user_id, chat_id, region, outcome in rows]
+    
+    async def flush(self):
+        if not self.buffer:
+            return
+        events, self.buffer = self.buffer, []
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, events)
+            self.written += len(events)
+        except Exception as e:
+            logger.error("Error writing like history: %s", e)
+            # Retry with the next batch, but never hold more than a bounded backlog
+            self.buffer[:0] = events[-self.batch_size * 100:]
+    
+    async def events(self, start: float, end: float) -> list:
+        """(day, hour, user_id, chat_id, api_region, outcome) for events between two timestamps"""
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(None, self._events, start, end)
+    
+    async def page(self, kind: str, value, before: int = None, after: int = None, limit: int = 10) -> list:
+        """Newest-first events matching a filter, before or after an event ID"""
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(None, self._page, kind, value, before, after, limit)
+    
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+        if self.db is not None:
+            with self.lock:
+                self.db.close()
+                self.db = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+            if time.monotonic() - self.last_prune >= LIKE_HISTORY_PRUNE_INTERVAL:
+                self.last_prune = time.monotonic()
+                try:
+                    removed = await asyncio.get_running_loop().run_in_executor(
+                        None, self._prune, time.time() - self.retention_days * 86400)
+                    if removed:
+                        logger.info("Pruned %s like history events", removed)
+                except sqlite3.Error as e:
+                    logger.error("Error pruning like history: %s", e)
+
+like_history = LikeHistory(LIKE_HISTORY_FILE, LIKE_HISTORY_FLUSH_INTERVAL, LIKE_HISTORY_BATCH_SIZE,
+                           LIKE_HISTORY_RETENTION_DAYS)
+metrics.register(Gauge(
+    "bot_like_history_buffered", "Like events waiting to be written", callback=lambda: len(like_history.buffer)))
+
+HISTORY_OUTCOMES = {'sent': "✅", 'already': "⚠️", 'not_found': "❌", 'api_error': "🛑", 'failed': "🔌"}
+HISTORY_USAGE = (
+    "📝 **Usage:** `/history` (everything), `/history uid <uid>`, "
+    "`/history user <user_id>` or `/history day <YYYY-MM-DD>`"
+)
+
+async def render_history(kind: str, value, before: int = None, after: int = None) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """One page of history, newest first, with buttons carrying the cursor"""
+    rows = await like_history.page(kind, value, before, after, HISTORY_PAGE_SIZE + 1)
+    if after is not None:
+        has_newer, has_older = len(rows) > HISTORY_PAGE_SIZE, True
+        rows = rows[-HISTORY_PAGE_SIZE:]
+    else:
+        has_newer, has_older = before is not None, len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+    
+    title = {'user': f"user `{value}`", 'uid': f"UID `{value}`", 'day': f"day {value}", 'all': "all users"}[kind]
+    lines = [f"📜 **LIKE HISTORY** - {title}\n"]
+    for _, ts, user_id, uid, region, outcome, added in rows:
+        when = datetime.fromtimestamp(ts, NEPAL_TZ).strftime("%m-%d %H:%M")
+        uid = uid.replace("`", "'")
+        result = f"{HISTORY_OUTCOMES.get(outcome, '❔')} {outcome}" + (f" +{added}" if added else "")
+        by = "" if kind == 'user' else f" • 👤 `{user_id}`"
+        lines.append(f"`{when}` {region} `{uid}` {result}{by}")
+    if not rows:
+        lines.append("ℹ️ **No more events**")
+    
+    buttons = []
+    token = f"hist:{kind}:{value if value is not None else '-'}"
+    if rows and has_newer:
+        buttons.append(InlineKeyboardButton("⬅️ Newer", callback_data=f"{token}:a:{rows[0][0]}"))
+    if rows and has_older:
+        buttons.append(InlineKeyboardButton("Older ➡️", callback_data=f"{token}:b:{rows[-1][0]}"))
+    return "\n".join(lines), InlineKeyboardMarkup([buttons]) if buttons else None
+
+@instrumented
+@group_permission_required
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show past /like attempts: your own, or anyone's for the owner"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    args = context.args or []
+    
+    if not is_owner(user_id):
+        kind, value = 'user', user_id
+    elif not args:
+        kind, value = 'all', None
+    elif len(args) == 2 and args[0].lower() in ('uid', 'user', 'day'):
+        kind, value = args[0].lower(), args[1]
+        try:
+            if kind == 'user':
+                value = int(value)
+            elif kind == 'day':
+                datetime.strptime(value, "%Y-%m-%d")
+            elif not (value.isascii() and value.isdigit()) or len(value) > HISTORY_UID_MAX_LENGTH:
+                raise ValueError(value)
+        except ValueError:
+            await update.message.reply_text("❌ **Invalid value!**\n" + HISTORY_USAGE, parse_mode=ParseMode.MARKDOWN)
+            return
+    else:
+        await update.message.reply_text("❌ **Invalid format!**\n" + HISTORY_USAGE, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    text, keyboard = await render_history(kind, value)
+    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
+
+async def history_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Turn a /history page"""
+    query = update.callback_query
+    try:
+        _, kind, value, direction, cursor = query.data.split(":")
+        cursor = int(cursor)
+        value = int(value) if kind == 'user' else (None if kind == 'all' else value)
+    except ValueError:
+        return False
+    if kind not in LikeHistory.FILTERS:
+        return False
+    # Users may only page through their own history
+    if not is_owner(query.from_user.id) and (kind != 'user' or value != query.from_user.id):
+        return await edit_callback_message(query, "❌ **Unauthorized!**")
+    
+    text, keyboard = await render_history(
+        kind, value, before=cursor if direction == "b" else None, after=cursor if direction == "a" else None)
+    return await edit_callback_message(query, text, parse_mode=ParseMode.MARKDOWN, reply_markup=keyboard)
+
+# ===============================
+# USAGE ANALYTICS
+# ===============================
+
+def shift_day(day: str, days: int) -> str:
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+def merge_counts(target: dict, source: dict, sign: int = 1):
+    """Add (or with sign=-1 subtract) one count dict into another, dropping zeros"""
+    for key, value in source.items():
+        total = target.get(key, 0) + sign * value
+        if total:
+            target[key] = total
+        else:
+            target.pop(key, None)
+
+class UsageAggregate:
+    """Counters for one day, or the running sum over a window of days"""
+    
+    def __init__(self):
+        self.hours = [0] * 24  # Like attempts per Nepal hour of day
+        self.outcomes = {}  # (api_region, outcome): count
+        self.users = {}  # user_id: like attempts
+        self.groups = {}  # chat_id: like attempts
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)  # Upstream calls per bucket, last is +Inf
+        self.quota_users = {}  # user_id: times they hit the daily limit
+    
+    def add_like(self, hour: int, user_id: int, chat_id: int, api_region: str, outcome: str):
+        self.hours[hour] += 1
+        key = (api_region, outcome)
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+        self.users[user_id] = self.users.get(user_id, 0) + 1
+        if chat_id < 0:
+            self.groups[chat_id] = self.groups.get(chat_id, 0) + 1
+    
+    def merge(self, other: 'UsageAggregate', sign: int = 1):
+        for index, count in enumerate(other.hours):
+            self.hours[index] += sign * count
+        for index, count in enumerate(other.latency):
+            self.latency[index] += sign * count
+        for mine, theirs in ((self.outcomes, other.outcomes), (self.users, other.users),
+                             (self.groups, other.groups), (self.quota_users, other.quota_users)):
+            merge_counts(mine, theirs, sign)
+    
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given rank (None: no data, inf: over the last bound)"""
+        total = sum(self.latency)
+        if not total:
+            return None
+        rank = fraction * total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (math.inf,), self.latency):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+class UsageAnalytics:
+    """Per-day aggregates plus running week and month sums, updated on every event
+    
+    Each event touches today's bucket and the two running windows; at midnight
+    the day leaving a window is subtracted from it, so reading any window never
+    scans events.
+    """
+    
+    WINDOWS = {'day': 1, 'week': 7, 'month': 30}
+    
+    def __init__(self):
+        self.days = deque()  # (day, UsageAggregate), newest last, up to the longest window
+        self.windows = {name: UsageAggregate() for name in self.WINDOWS if name != 'day'}
+        self.live_since = time.time()
+        self.task = None  # History rebuild started by start()
+    
+    def start(self):
+        self.task = asyncio.create_task(load_analytics_history())
+    
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+    
+    def today(self) -> UsageAggregate:
+        day = nepal_clock.today_key()
+        while not self.days or self.days[-1][0] < day:
+            # Quiet days still get an empty bucket so the windows age correctly
+            self.roll(shift_day(self.days[-1][0], 1) if self.days else day)
+        return self.days[-1][1]
+    
+    def roll(self, day: str):
+        """Start a new day; days that fall out of a window are subtracted from it"""
+        self.days.append((day, UsageAggregate()))
+        for name, aggregate in self.windows.items():
+            span = self.WINDOWS[name]
+            if len(self.days) > span:
+                aggregate.merge(self.days[-span - 1][1], sign=-1)
+        while len(self.days) > max(self.WINDOWS.values()):
+            self.days.popleft()
+    
+    def _targets(self):
+        return [self.today(), *self.windows.values()]
+    
+    def like(self, user_id: int, chat_id: int, api_region: str, outcome: str):
+        targets = self._targets()
+        hour = min(23, max(0, int((time.time() - nepal_clock.next_midnight + 86400) // 3600)))
+        for aggregate in targets:
+            aggregate.add_like(hour, user_id, chat_id, api_region, outcome)
+    
+    def upstream_latency(self, seconds: float):
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        for aggregate in self._targets():
+            aggregate.latency[index] += 1
+    
+    def quota_exhausted(self, user_id: int):
+        for aggregate in self._targets():
+            aggregate.quota_users[user_id] = aggregate.quota_users.get(user_id, 0) + 1
+    
+    def window(self, name: str) -> UsageAggregate:
+        today = self.today()
+        return today if name == 'day' else self.windows[name]
+    
+    def load_history(self, events: list):
+        """Fold in (day, hour, user_id, chat_id, api_region, outcome) events recorded before startup"""
+        self.today()
+        longest = max(self.WINDOWS.values())
+        while len(self.days) < longest:
+            self.days.appendleft((shift_day(self.days[0][0], -1), UsageAggregate()))
+        ages = {day: (age, aggregate) for age, (day, aggregate) in enumerate(reversed(self.days))}
+        for day, hour, user_id, chat_id, api_region, outcome in events:
+            if day not in ages:
+                continue
+            age, aggregate = ages[day]
+            aggregate.add_like(hour, user_id, chat_id, api_region, outcome)
+            for name, window in self.windows.items():
+                if age < self.WINDOWS[name]:
+                    window.add_like(hour, user_id, chat_id, api_region, outcome)
+
+usage_analytics = UsageAnalytics()
+
+async def load_analytics_history():
+    """Rebuild like counts from the history log, so restarts keep the windows"""
+    try:
+        events = await like_history.events(
+            usage_analytics.live_since - UsageAnalytics.WINDOWS['month'] * 86400, usage_analytics.live_since)
+    except sqlite3.Error as e:
+        logger.error("Error reading like history for analytics: %s", e)
+        return
+    usage_analytics.load_history(events)
+    logger.info("Analytics rebuilt from %s like history events", len(events))
+
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+ANALYTICS_TOP = 5
+
+def format_rate(count: int, total: int) -> str:
+    return f"{count * 100 / total:.0f}%" if total else "0%"
+
+def render_analytics(name: str) -> str:
+    aggregate = usage_analytics.window(name)
+    total = sum(aggregate.hours)
+    sent = sum(count for (_, outcome), count in aggregate.outcomes.items() if outcome == "sent")
+    title = {'day': "TODAY", 'week': "LAST 7 DAYS", 'month': "LAST 30 DAYS"}[name]
+    lines = [f"📈 **ANALYTICS - {title}** 📈\n", f"💎 **Like attempts:** {total} ({format_rate(sent, total)} sent)"]
+    
+    peak = max(aggregate.hours)
+    if peak:
+        spark = "".join(SPARK_BLOCKS[count * (len(SPARK_BLOCKS) - 1) // peak] for count in aggregate.hours)
+        lines.append(f"🕐 **Per hour (00-23):** `{spark}`")
+        lines.append(f"🔝 **Busiest hour:** {aggregate.hours.index(peak):02d}:00 ({peak})")
+    
+    regions = {}
+    for (api_region, outcome), count in aggregate.outcomes.items():
+        regions.setdefault(api_region, {})[outcome] = count
+    if regions:
+        lines.append("\n🌍 **Regions:**")
+        for api_region, outcomes in sorted(regions.items(), key=lambda item: -sum(item[1].values())):
+            attempts = sum(outcomes.values())
+            rates = " ".join(
+                f"{HISTORY_OUTCOMES[outcome]} {format_rate(outcomes.get(outcome, 0), attempts)}"
+                for outcome in ("sent", "already", "not_found")
+            )
+            errors = attempts - sum(outcomes.get(outcome, 0) for outcome in ("sent", "already", "not_found"))
+            lines.append(f"• `{api_region}`: {attempts} - {rates} 🛑 {format_rate(errors, attempts)}")
+    
+    if aggregate.users:
+        top = heapq.nlargest(ANALYTICS_TOP, aggregate.users.items(), key=lambda item: item[1])
+        lines.append("\n👤 **Top users:** " + ", ".join(f"`{user_id}` {count}" for user_id, count in top))
+    if aggregate.groups:
+        top = heapq.nlargest(ANALYTICS_TOP, aggregate.groups.items(), key=lambda item: item[1])
+        titles = [str(allowed_groups.get(abs(chat_id), {}).get('title', chat_id)).replace("`", "'") for chat_id, _ in top]
+        lines.append("👥 **Top groups:** " + ", ".join(
+            f"`{title}` {count}" for title, (_, count) in zip(titles, top)))
+    
+    calls = sum(aggregate.latency)
+    if calls:
+        def bound(fraction: float) -> str:
+            value = aggregate.latency_percentile(fraction)
+            return f">{LATENCY_BUCKETS[-1]:.0f}s" if value == math.inf else f"≤{value * 1000:.0f}ms"
+        lines.append(f"\n⚡ **Upstream latency:** p50 {bound(0.5)}, p95 {bound(0.95)}, p99 {bound(0.99)} ({calls} calls)")
+    
+    exhausted = sum(aggregate.quota_users.values())
+    lines.append(f"🚫 **Daily limit reached:** {exhausted} times by {len(aggregate.quota_users)} users")
+    return "\n".join(lines)
+
+def analytics_keyboard(current: str) -> InlineKeyboardMarkup:
+    labels = {'day': "Today", 'week': "7 days", 'month': "30 days"}
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(("• " if name == current else "") + label, callback_data=f"analytics:{name}")
+        for name, label in labels.items()
+    ]])
+
+@instrumented
+async def analytics_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner dashboard from the running aggregates"""
+    if not update.effective_user or not update.message:
+        return
+    
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    name = context.args[0].lower() if context.args else "day"
+    if name not in UsageAnalytics.WINDOWS:
+        await update.message.reply_text(
+            "❌ **Unknown window!**\n📝 **Usage:** `/analytics [day|week|month]`", parse_mode=ParseMode.MARKDOWN)
+        return
+    await update.message.reply_text(
+        render_analytics(name), parse_mode=ParseMode.MARKDOWN, reply_markup=analytics_keyboard(name))
+
+async def analytics_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    query = update.callback_query
+    if not is_owner(query.from_user.id):
+        return await edit_callback_message(query, "❌ **Unauthorized!**")
+    name = query.data.split(":", 1)[1]
+    if name not in UsageAnalytics.WINDOWS:
+        return False
+    return await edit_callback_message(
+        query, render_analytics(name), parse_mode=ParseMode.MARKDOWN, reply_markup=analytics_keyboard(name))
+
+# ===============================
+# COMMAND HANDLERS
+# ===============================
+
+@instrumented
+@group_permission_required
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start command - welcome message"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    # Check verification status
+    is_verified = is_user_verified(user_id)
+    verification_status = "✅ VERIFIED" if is_verified else "❌ NOT VERIFIED"
+    
+    # Owner special status
+    owner_status = ""
+    if is_owner(user_id):
+        owner_status = "\n**👑 OWNER STATUS: UNLIMITED ACCESS**"
+    
+    welcome_text = START_TEMPLATE.render(
+        verification_status=verification_status,
+        owner_status=owner_status,
+        **nepal_clock.time_fields()
+    )
+    
+    await update.message.reply_text(
+        welcome_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=START_KEYBOARD,
+        disable_web_page_preview=True
+    )
+
+@instrumented
+@group_permission_required
+async def verify_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle verification command"""
+    if not update.effective_user or not update.effective_message:
+        return False
+    
+    user_id = update.effective_user.id
+    fields = nepal_clock.time_fields()
+    
+    # Check if already verified
+    if is_user_verified(user_id):
+        return await show_screen(
+            update,
+            ALREADY_VERIFIED_TEMPLATE.render(**fields),
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=VERIFIED_KEYBOARD,
+            disable_web_page_preview=True
+        )
+    
+    # Show verification interface
+    return await show_screen(
+        update,
+        VERIFY_STEPS_TEMPLATE.render(**fields),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=VERIFY_KEYBOARD,
+        disable_web_page_preview=True
+    )
+
+@instrumented
+@group_permission_required
+async def like_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle like command"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    # Check verification status for non-owners
+    if not is_owner(user_id) and not is_user_verified(user_id):
+        # Auto-show verification system
+        await update.message.reply_text(
+            VERIFY_REQUIRED_TEMPLATE.render(**nepal_clock.time_fields()),
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=VERIFY_KEYBOARD,
+            disable_web_page_preview=True
+        )
+        return
+    
+    # Check arguments
+    if len(context.args) < 2:
+        msg = await update.message.reply_text(
+            LIKE_USAGE_TEMPLATE.render(),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    region = context.args[0].upper()
+    uid = context.args[1]
+    
+    # Validate region
+    valid_regions = ['BD', 'IND', 'BR', 'US', 'AG', 'NX']
+    if region not in valid_regions:
+        msg = await update.message.reply_text(
+            LIKE_INVALID_REGION_TEMPLATE.render(region=region),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    # Check limits for non-owners; the reserved like is given back unless sent
+    if not await reserve_user_usage(user_id, update.effective_chat.id):
+        usage_analytics.quota_exhausted(user_id)
+        msg = await update.message.reply_text(
+            LIKE_LIMIT_REACHED_TEMPLATE.render(
+                usage_today=get_user_usage_today(user_id),
+                daily_limit=get_user_daily_limit(user_id, update.effective_chat.id),
+                reset_in=format_duration(nepal_clock.seconds_until_reset())
+            ),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    # Group budget and concurrency cap, shared by all members (owners are not counted)
+    group_id = abs(update.effective_chat.id) if update.effective_chat.id < 0 and not is_owner(user_id) else None
+    try:
+        refusal = await reserve_group_like(group_id) if group_id is not None else None
+    except Exception:
+        await release_user_usage(user_id)  # e.g. the shared store is locked; the user's like is not spent
+        raise
+    if refusal:
+        await release_user_usage(user_id)
+        if refusal == 'busy':
+            # Busy means every slot is taken, here or on other workers
+            text = GROUP_BUSY_TEMPLATE.render(
+                running=allowed_groups.get(group_id, {}).get('max_concurrent', GROUP_MAX_CONCURRENT))
+        else:
+            text = GROUP_BUDGET_REACHED_TEMPLATE.render(
+                group_usage=get_group_usage_today(group_id),
+                group_budget=allowed_groups[group_id]['daily_budget'],
+                reset_in=format_duration(nepal_clock.seconds_until_reset())
+            )
+        msg = await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    # Start the API call; only show a processing message if it is slow
+    fetch_task = asyncio.create_task(fetch_like(uid, region))
+    processing_msg = None
+    likes_sent = False
+    outcome, added = "failed", 0
+    
+    try:
+        done, _ = await asyncio.wait({fetch_task}, timeout=LIKE_FAST_REPLY_BUDGET)
+        if done:
+            like_reply_stats['fast_replies'] += 1
+        else:
+            processing_msg = await update.message.reply_text(
+                LIKE_PROCESSING_TEMPLATE.render(region=region, uid=uid),
+                parse_mode=ParseMode.MARKDOWN
+            )
+            like_reply_stats['slow_replies'] += 1
+        
+        result = await fetch_task
+        
+        if result:
+            # Parse API response
+            status = result.get('status', 0)
+            player = result.get('player', {})
+            likes = result.get('likes', {})
+            
+            player_nickname = player.get('nickname', 'Unknown')
+            likes_before = likes.get('before', 0)
+            likes_after = likes.get('after', 0)
+            added_by_api = likes.get('added_by_api', 0)
+            
+            # Handle different status codes
+            if status == 1:  # Success
+                likes_sent = True
+                outcome, added = "sent", added_by_api
+                # Keep the reserved usage for non-owners
+                if not is_owner(user_id):
+                    commit_user_usage(user_id)
+                    new_usage = get_user_usage_today(user_id)
+                    limit = get_user_daily_limit(user_id, update.effective_chat.id)
+                    remaining = limit - new_usage
+                else:
+                    remaining = "♾️ Unlimited"
+                    new_usage = "👑 Owner"
+                    limit = "♾️ Unlimited"
+                
+                result_text = LIKE_SUCCESS_TEMPLATE.render(
+                    uid=uid,
+                    player_nickname=player_nickname,
+                    region=region,
+                    likes_before=likes_before,
+                    likes_after=likes_after,
+                    added_by_api=added_by_api,
+                    new_usage=new_usage,
+                    limit=limit,
+                    remaining=remaining
+                )
+                
+            elif status == 2:  # Already received or limit reached
+                outcome = "already"
+                result_text = LIKE_ALREADY_RECEIVED_TEMPLATE.render(
+                    uid=uid,
+                    player_nickname=player_nickname,
+                    region=region,
+                    likes_before=likes_before
+                )
+                
+            elif status == 3:  # Player not found
+                outcome = "not_found"
+                result_text = LIKE_NOT_FOUND_TEMPLATE.render(uid=uid, region=region)
+                
+            else:  # Unknown status
+                outcome = "api_error"
+                result_text = LIKE_API_ERROR_TEMPLATE.render(uid=uid, region=region, status=status)
+            
+            await reply_or_edit(update.message, processing_msg, result_text)
+        else:
+            # API connection failed
+            msg = await reply_or_edit(
+                update.message,
+                processing_msg,
+                LIKE_CONNECTION_FAILED_TEMPLATE.render(uid=uid, region=region)
+            )
+            delete_later_in_group(msg, GROUP_NOTICE_TTL)
+    
+    except Exception as e:
+        logger.error("Error in like command: %s", e)
+        if not fetch_task.done():
+            fetch_task.cancel()
+        msg = await reply_or_edit(update.message, processing_msg, LIKE_FAILED_TEMPLATE.render())
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+    
+    finally:
+        if not likes_sent:
+            await release_user_usage(user_id)
+        if group_id is not None:
+            await finish_group_like(group_id, likes_sent)
+        like_history.record(user_id, update.effective_chat.id, uid, region, outcome, added)
+        usage_analytics.like(user_id, update.effective_chat.id, detect_region(region), outcome)
+
+@instrumented
+@group_permission_required
+async def player_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show a player's profile from recent like responses, without calling the API"""
+    if not update.effective_user or not update.message:
+        return
+    
+    if len(context.args) < 2:
+        msg = await update.message.reply_text(PLAYER_USAGE_TEMPLATE.render(), parse_mode=ParseMode.MARKDOWN)
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    region = context.args[0].upper()
+    uid = context.args[1]
+    
+    if region not in ['BD', 'IND', 'BR', 'US', 'AG', 'NX']:
+        msg = await update.message.reply_text(
+            LIKE_INVALID_REGION_TEMPLATE.render(region=region),
+            parse_mode=ParseMode.MARKDOWN
+        )
+        delete_later_in_group(msg, GROUP_NOTICE_TTL)
+        return
+    
+    entry = player_cache.get(uid, detect_region(region))
+    if entry is None:
+        text = PLAYER_NOT_CACHED_TEMPLATE.render(
+            uid=uid, region=region, region_arg=region.lower(), ttl=format_duration(PLAYER_CACHE_TTL))
+    else:
+        seen_ago = format_duration(time.time() - entry['seen'])
+        if entry['found']:
+            text = PLAYER_PROFILE_TEMPLATE.render(
+                uid=uid, player_nickname=entry['nickname'], region=region, likes=entry['likes'], seen_ago=seen_ago)
+        else:
+            text = PLAYER_NOT_FOUND_TEMPLATE.render(uid=uid, region=region, seen_ago=seen_ago)
+    await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+
+@instrumented
+@group_permission_required
+async def uptime_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show bot uptime and status (owner only)"""
+    if not update.effective_user or not update.effective_message:
+        return False
+    
+    user_id = update.effective_user.id
+    
+    # Only owner can use this command
+    if not is_owner(user_id):
+        return await show_screen(
+            update,
+            "❌ **Owner command only!**\n"
+            f"👑 **Owner ID:** {OWNER_ID}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    current_time = get_nepal_time()
+    
+    # Uptime since the bot process started
+    uptime_duration = current_time - system_monitor.started_at
+    
+    # Format uptime
+    days = uptime_duration.days
+    hours, remainder = divmod(uptime_duration.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    
+    # Latest background sample (no blocking psutil calls here)
+    sample = system_monitor.latest
+    
+    uptime_text = UPTIME_TEMPLATE.render(
+        started=system_monitor.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+        days=days,
+        hours=hours,
+        minutes=minutes,
+        seconds=seconds,
+        memory_percent=sample.get('memory_percent', '?'),
+        cpu_percent=sample.get('system_cpu_percent', '?'),
+        memory_available_mb=sample.get('memory_available_mb', '?'),
+        process_cpu_percent=sample.get('process_cpu_percent', '?'),
+        rss_mb=f"{sample['rss_mb']:.1f}" if 'rss_mb' in sample else '?',
+        open_connections=sample.get('open_connections', '?'),
+        loop_lag_ms=f"{sample.get('loop_lag_ms', 0.0):.1f}",
+        max_loop_lag_ms=f"{system_monitor.max_loop_lag_ms():.1f}",
+        total_users=len(bot_stats.known_users),
+        verified_users=bot_stats.verified_users,
+        allowed_group_count=len(allowed_groups),
+        custom_limits=bot_stats.custom_limits,
+        fast_replies=like_reply_stats['fast_replies'],
+        slow_replies=like_reply_stats['slow_replies'],
+        **time_fields(current_time)
+    )
+    
+    return await show_screen(
+        update,
+        uptime_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=UPTIME_KEYBOARD
+    )
+
+@instrumented
+async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Quick status check for all users"""
+    if not update.effective_user or not update.message:
+        return
+    
+    # Quick system check from the latest background sample
+    memory_percent = system_monitor.latest.get('memory_percent')
+    if memory_percent is not None:
+        status = "🟢 ONLINE"
+        performance = "⚡ Good" if memory_percent < 80 else "⚠️ High Usage"
+    else:
+        status = "🟡 LIMITED"
+        performance = "❓ Unknown"
+    
+    status_text = STATUS_TEMPLATE.render(
+        status=status,
+        performance=performance,
+        **nepal_clock.time_fields()
+    )
+    
+    await update.message.reply_text(
+        status_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=STATUS_KEYBOARD
+    )
+
+@instrumented
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show user statistics"""
+    if not update.effective_user or not update.effective_message:
+        return False
+    
+    user_id = update.effective_user.id
+    fields = nepal_clock.time_fields()
+    
+    # Owner special handling
+    if is_owner(user_id):
+        stats_text = OWNER_STATS_TEMPLATE.render(user_id=user_id, **fields)
+    else:
+        # Get user data
+        is_verified = is_user_verified(user_id)
+        daily_limit = get_user_daily_limit(user_id, update.effective_chat.id)
+        usage_today = get_user_usage_today(user_id)
+        remaining = daily_limit - usage_today if daily_limit != UNLIMITED_LIMIT else "Unlimited"
+        
+        stats_text = USER_STATS_TEMPLATE.render(
+            user_id=user_id,
+            verified="✅ YES" if is_verified else "❌ NO",
+            usage_today=usage_today,
+            daily_limit=daily_limit,
+            remaining=remaining,
+            tip="Complete verification to use bot!" if not is_verified else "Use /like command to send likes!",
+            **fields
+        )
+    
+    return await show_screen(
+        update,
+        stats_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=STATS_KEYBOARD
+    )
+
+@instrumented
+@group_permission_required
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show help menu"""
+    if not update.effective_user or not update.message:
+        return
+    
+    await update.message.reply_text(
+        HELP_TEMPLATE.render(**nepal_clock.time_fields()),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=HELP_KEYBOARD,
+        disable_web_page_preview=True
+    )
+
+@instrumented
+@group_permission_required
+async def contact_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show contact information"""
+    if not update.effective_user or not update.message:
+        return
+    
+    await update.message.reply_text(
+        CONTACT_TEMPLATE.render(**nepal_clock.time_fields()),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=CONTACT_KEYBOARD,
+        disable_web_page_preview=True
+    )
+
+# ===============================
+# OWNER COMMANDS
+# ===============================
+
+@instrumented
+async def allow_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to allow groups"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    # Debug logging
+    logger.info("Allow command called by user_id: %s", user_id)
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    chat_id = update.effective_chat.id
+    chat_title = update.effective_chat.title or "Private Chat"
+    
+    if chat_id > 0:
+        await update.message.reply_text("❌ **This command only works in groups!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    # Add group to allowed list
+    await add_allowed_group(chat_id, chat_title)
+    
+    await update.message.reply_text(
+        f"✅ **Group authorized successfully!**\n"
+        f"📝 **Group:** {chat_title}\n"
+        f"🆔 **ID:** {chat_id}\n"
+        f"🎮 **Bot is now active in this group**",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+@instrumented
+async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to remove groups"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    if chat_id > 0:
+        await update.message.reply_text("❌ **This command only works in groups!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    # Remove group from allowed list
+    if await remove_allowed_group(chat_id):
+        await update.message.reply_text(
+            f"✅ **Group removed successfully!**\n"
+            f"🚫 **Bot is now inactive in this group**",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    else:
+        await update.message.reply_text(
+            f"❌ **Group was not in allowed list!**",
+            parse_mode=ParseMode.MARKDOWN
+        )
+
+@instrumented
+async def setlimit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to set user limits"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if len(context.args) < 2:
+        await update.message.reply_text(
+            "❌ **Invalid format!**\n"
+            "📝 **Usage:** `/setlimit <user_id> <limit>`\n"
+            "🎯 **Example:** `/setlimit 123456789 5`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    try:
+        target_user_id = int(context.args[0])
+        new_limit = int(context.args[1])
+        
+        if new_limit < 0:
+            await update.message.reply_text("❌ **Limit must be 0 or greater!**", parse_mode=ParseMode.MARKDOWN)
+            return
+        
+        await set_user_limit(target_user_id, new_limit)
+        
+        await update.message.reply_text(
+            f"✅ **Limit updated successfully!**\n"
+            f"👤 **User ID:** {target_user_id}\n"
+            f"📊 **New Limit:** {new_limit} likes/day",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        
+    except ValueError:
+        await update.message.reply_text(
+            "❌ **Invalid numbers!**\n"
+            "📝 **Usage:** `/setlimit <user_id> <limit>`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+
+TIER_USAGE = (
+    "📝 **Usage:**\n"
+    "• `/tier` - List tiers\n"
+    "• `/tier set <name> <limit|unlimited>` - Change or create a tier\n"
+    "• `/tier user <user_id> <name>` - Put a user in a tier\n"
+    "• `/tier group <name|none>` - Tier for this group (use in the group)\n"
+    "• `/tier clear <user_id>` - Drop a user's /setlimit override"
+)
+
+@instrumented
+async def tier_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to manage limit tiers"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    args = context.args or []
+    action = args[0].lower() if args else "list"
+    
+    try:
+        if action == "list":
+            members = {}
+            for tier_id in user_tiers.values():
+                members[tier_id] = members.get(tier_id, 0) + 1
+            groups = {}
+            for group in allowed_groups.values():
+                if 'tier' in group:
+                    groups[group['tier']] = groups.get(group['tier'], 0) + 1
+            lines = ["🏷 **LIMIT TIERS**\n"]
+            for tier_id, tier in sorted(limit_tiers.items()):
+                limit = "♾️ Unlimited" if tier['limit'] >= UNLIMITED_LIMIT else f"{tier['limit']} likes/day"
+                lines.append(
+                    f"• **{tier['name']}** (`{tier_id}`): {limit} - "
+                    f"{members.get(tier_id, 0)} users, {groups.get(tier_id, 0)} groups"
+                )
+            lines.append(f"\n⚙️ **Per-user overrides:** {len(user_limits)}")
+            lines.append(TIER_USAGE)
+            await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.MARKDOWN)
+        
+        elif action == "set" and len(args) == 3:
+            limit = UNLIMITED_LIMIT if args[2].lower() == "unlimited" else int(args[2])
+            if limit < 0:
+                await update.message.reply_text("❌ **Limit must be 0 or greater!**", parse_mode=ParseMode.MARKDOWN)
+                return
+            tier_id = await set_tier_limit(args[1], limit)
+            await update.message.reply_text(
+                f"✅ **Tier updated!**\n"
+                f"🏷 **Tier:** {limit_tiers[tier_id]['name']} (`{tier_id}`)\n"
+                f"📊 **New Limit:** {'Unlimited' if limit >= UNLIMITED_LIMIT else f'{limit} likes/day'}",
+                parse_mode=ParseMode.MARKDOWN
+            )
+        
+        elif action == "user" and len(args) == 3:
+            target_user_id = int(args[1])
+            tier_id = find_tier(args[2])
+            if tier_id is None:
+                await update.message.reply_text(f"❌ **Unknown tier:** {args[2]}", parse_mode=ParseMode.MARKDOWN)
+                return
+            await set_user_tier(target_user_id, tier_id)
+            note = "\n⚠️ **A /setlimit override still applies**" if target_user_id in user_limits else ""
+            await update.message.reply_text(
+                f"✅ **User tier updated!**\n"
+                f"👤 **User ID:** {target_user_id}\n"
+                f"🏷 **Tier:** {limit_tiers[tier_id]['name']}{note}",
+                parse_mode=ParseMode.MARKDOWN
+            )
+        
+        elif action == "group" and len(args) == 2:
+            group_id = abs(update.effective_chat.id)
+            if update.effective_chat.id > 0 or group_id not in allowed_groups:
+                await update.message.reply_text(
+                    "❌ **Use this in an allowed group!**", parse_mode=ParseMode.MARKDOWN)
+                return
+            tier_id = None if args[1].lower() == "none" else find_tier(args[1])
+            if tier_id is None and args[1].lower() != "none":
+                await update.message.reply_text(f"❌ **Unknown tier:** {args[1]}", parse_mode=ParseMode.MARKDOWN)
+                return
+            await set_group_tier(group_id, tier_id)
+            await update.message.reply_text(
+                f"✅ **Group tier updated!**\n"
+                f"🏷 **Tier:** {limit_tiers[tier_id]['name'] if tier_id is not None else 'none'}",
+                parse_mode=ParseMode.MARKDOWN
+            )
+        
+        elif action == "clear" and len(args) == 2:
+            target_user_id = int(args[1])
+            if target_user_id not in user_limits:
+                await update.message.reply_text("ℹ️ **No override for that user**", parse_mode=ParseMode.MARKDOWN)
+                return
+            bot_stats.limit_changed(user_limits.pop(target_user_id), default_limit)
+            await persist('user_limits', target_user_id, None)
+            if target_user_id in quota_leases.leases:
+                quota_leases.settle(target_user_id)
+            await update.message.reply_text(
+                f"✅ **Override removed!**\n"
+                f"👤 **User ID:** {target_user_id}\n"
+                f"📊 **Limit now:** {get_user_daily_limit(target_user_id)} likes/day",
+                parse_mode=ParseMode.MARKDOWN
+            )
+        
+        else:
+            await update.message.reply_text("❌ **Invalid format!**\n" + TIER_USAGE, parse_mode=ParseMode.MARKDOWN)
+    
+    except ValueError:
+        await update.message.reply_text("❌ **Invalid numbers!**\n" + TIER_USAGE, parse_mode=ParseMode.MARKDOWN)
+
+GROUP_QUOTA_USAGE = (
+    "📝 **Usage:**\n"
+    "• `/groupquota` - Today's likes per group\n"
+    "• `/groupquota budget <likes|off> [group_id]` - Daily likes for a group\n"
+    "• `/groupquota concurrency <n|off|default> [group_id]` - Likes in progress at once\n"
+    "ℹ️ Without a group ID, use it in the group"
+)
+
+def group_quota_line(group_id: int) -> str:
+    group = allowed_groups.get(group_id, {})
+    title = str(group.get('title', "removed group")).replace("`", "'")
+    budget = group.get('daily_budget')
+    cap = group.get('max_concurrent', GROUP_MAX_CONCURRENT)
+    return (
+        f"• `{title}` (`{group_id}`): {get_group_usage_today(group_id)}/{'♾️' if budget is None else budget} today"
+        f" • {group_in_flight.get(group_id, 0)}/{cap or '♾️'} running{' on this worker' if state_store is not None else ''}"
+    )
+
+@instrumented
+async def groupquota_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to view group consumption and set group budgets and concurrency caps"""
+    if not update.effective_user or not update.message:
+        return
+    
+    if not is_owner(update.effective_user.id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    args = context.args or []
+    
+    if not args:
+        groups = set(allowed_groups) | set(group_usage_today)
+        busiest = heapq.nlargest(GROUP_QUOTA_LIST_SIZE, groups, key=get_group_usage_today)
+        lines = ["👥 **GROUP QUOTAS - TODAY**\n"]
+        lines += [group_quota_line(group_id) for group_id in busiest]
+        if not busiest:
+            lines.append("ℹ️ **No allowed groups yet**")
+        elif len(groups) > len(busiest):
+            lines.append(f"… and {len(groups) - len(busiest)} more")
+        lines.append(f"\n💎 **Total:** {sum(group_usage_today.values())} likes in groups today")
+        lines.append(f"⏰ **Reset:** in {format_duration(nepal_clock.seconds_until_reset())}")
+        await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    setting = {'budget': 'daily_budget', 'concurrency': 'max_concurrent'}.get(args[0].lower())
+    if setting is None or len(args) not in (2, 3):
+        await update.message.reply_text("❌ **Invalid format!**\n" + GROUP_QUOTA_USAGE, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    try:
+        group_id = abs(int(args[2])) if len(args) == 3 else abs(update.effective_chat.id)
+        value = args[1].lower()
+        if value == "off":
+            value = None if setting == 'daily_budget' else 0
+        elif value == "default" and setting == 'max_concurrent':
+            value = None
+        else:
+            value = int(value)
+            if value < 0:
+                raise ValueError
+    except ValueError:
+        await update.message.reply_text("❌ **Invalid numbers!**\n" + GROUP_QUOTA_USAGE, parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if group_id not in allowed_groups:
+        await update.message.reply_text(
+            "❌ **Not an allowed group!**\nUse it in the group or pass its ID", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    await set_group_setting(group_id, setting, value)
+    await update.message.reply_text(
+        f"✅ **Group quota updated!**\n{group_quota_line(group_id)}", parse_mode=ParseMode.MARKDOWN)
+
+@instrumented
+async def slag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show all available commands"""
+    if not update.effective_user or not update.effective_message:
+        return False
+    
+    user_id = update.effective_user.id
+    fields = nepal_clock.time_fields()
+    
+    # Check if user is owner for special display
+    if is_owner(user_id):
+        commands_text = OWNER_COMMANDS_TEMPLATE.render(**fields)
+    else:
+        commands_text = USER_COMMANDS_TEMPLATE.render(
+            verification_status="✅ VERIFIED" if is_user_verified(user_id) else "❌ NOT VERIFIED",
+            **fields
+        )
+    
+    return await show_screen(
+        update,
+        commands_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=COMMANDS_KEYBOARD
+    )
+
+@instrumented
+async def ownerhelp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner-only help command"""
+    if not update.effective_user or not update.effective_message:
+        return False
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        return await show_screen(
+            update,
+            "❌ **Owner command only!**\n"
+            f"👑 **Owner ID:** {OWNER_ID}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+    
+    owner_help_text = OWNER_HELP_TEMPLATE.render(
+        allowed_group_count=len(allowed_groups),
+        **nepal_clock.time_fields()
+    )
+    
+    return await show_screen(
+        update,
+        owner_help_text,
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=OWNER_HELP_KEYBOARD
+    )
+
+@instrumented
+async def test_owner_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Test command to check owner recognition"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    logger.info("Test owner command called by user_id: %s", user_id)
+    
+    if not is_owner(user_id):
+        await update.message.reply_text(
+            f"❌ **You are not the owner!**\n"
+            f"👤 **Your ID:** {user_id}\n"
+            f"👑 **Owner ID:** {OWNER_ID}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    await update.message.reply_text(
+        f"✅ **Owner recognized successfully!**\n"
+        f"👑 **Your ID:** {user_id}\n"
+        f"🎮 **You have full access to all commands**",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+@instrumented
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to broadcast messages"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if not context.args:
+        await update.message.reply_text(
+            "❌ **No message provided!**\n"
+            "📝 **Usage:** `/broadcast <message>`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    message = " ".join(context.args)
+    
+    # Confirm broadcast
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ Send", callback_data=f"confirm_broadcast:{message}"),
+            InlineKeyboardButton("❌ Cancel", callback_data="cancel_broadcast")
+        ]
+    ]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    await update.message.reply_text(
+        f"📢 **Confirm Broadcast**\n\n"
+        f"**Message:** {message}\n\n"
+        f"**This will be sent to all bot users!**",
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=reply_markup
+    )
+
+@instrumented
+async def blocking_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to show where the event loop has been blocked"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if context.args and context.args[0].lower() == "reset":
+        loop_watchdog.reset()
+        await update.message.reply_text("✅ **Blocking report reset!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    top_sites = loop_watchdog.top_sites()
+    if not top_sites:
+        await update.message.reply_text(
+            "✅ **No event loop blocking detected!**\n"
+            f"⏱ **Threshold:** {WATCHDOG_THRESHOLD * 1000:.0f} ms",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    lines = []
+    for site, entry in top_sites:
+        lines.append(
+            f"• {site}\n"
+            f"  {entry['count']}x, total {entry['total'] * 1000:.0f} ms, max {entry['max'] * 1000:.0f} ms"
+        )
+    worst_stack = "".join(top_sites[0][1]['stack'][-4:]) or "not sampled\n"
+    
+    # Sent without Markdown: stack traces contain characters it would misparse
+    await update.message.reply_text(
+        f"🩺 EVENT LOOP BLOCKING REPORT\n\n"
+        f"Blocks detected: {loop_watchdog.blocks}\n"
+        f"Threshold: {WATCHDOG_THRESHOLD * 1000:.0f} ms\n\n"
+        f"Top call sites:\n{chr(10).join(lines)}\n\n"
+        f"Worst site stack:\n{worst_stack}"
+    )
+
+@instrumented
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to run the sampling profiler"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if context.args and context.args[0].lower() == "stop":
+        if not profiler.running:
+            await update.message.reply_text("❌ **Profiler is not running!**", parse_mode=ParseMode.MARKDOWN)
+            return
+        profiler.stop()
+        await update.message.reply_text("🛑 **Profiler stopped, sending results...**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if profiler.running:
+        await update.message.reply_text("❌ **Profiler is already running!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    try:
+        seconds = float(context.args[0]) if context.args else PROFILER_DEFAULT_SECONDS
+    except ValueError:
+        await update.message.reply_text(
+            "❌ **Invalid duration!**\n"
+            "📝 **Usage:** `/profile [seconds]` or `/profile stop`",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    seconds = max(1.0, min(seconds, PROFILER_MAX_SECONDS))
+    
+    profiler.task = asyncio.create_task(
+        run_profile_and_report(context.bot, update.effective_chat.id, seconds)
+    )
+    await update.message.reply_text(
+        f"🔬 **Profiling for {seconds:.0f}s...**\n"
+        f"📄 **Results will be sent as a document**",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+@instrumented
+async def memsnap_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to capture and diff tracemalloc snapshots"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    action = context.args[0].lower() if context.args else "snap"
+    
+    if action == "start":
+        memory_snapshots.start()
+        await update.message.reply_text(
+            "✅ **Memory tracing started!**\n"
+            "📝 **Use** `/memsnap` **to capture, again to diff**",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    if action == "stop":
+        memory_snapshots.stop()
+        await update.message.reply_text("🛑 **Memory tracing stopped!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if not tracemalloc.is_tracing():
+        await update.message.reply_text(
+            "❌ **Memory tracing is off!**\n"
+            "📝 **Use** `/memsnap start` **first**",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    # Snapshots are CPU-heavy; keep them off the event loop
+    report = await asyncio.get_running_loop().run_in_executor(None, memory_snapshots.take)
+    await update.message.reply_document(
+        document=io.BytesIO(report.encode()),
+        filename=f"memsnap_{get_nepal_time().strftime('%Y%m%d_%H%M%S')}.txt",
+        caption="🧠 Memory snapshot"
+    )
+
+@instrumented
+async def faults_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to toggle upstream fault injection"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    if context.args:
+        try:
+            fault_injector.configure(" ".join(context.args))
+        except ValueError as e:
+            await update.message.reply_text(
+                f"❌ **Invalid fault spec:** `{e}`\n"
+                "📝 **Usage:** `/faults off`, `/faults <preset>` or `/faults server_error=0.2 latency_ms=800`\n"
+                f"📋 **Presets:** {', '.join(FaultInjector.PRESETS)}\n"
+                f"📋 **Faults:** `{', '.join(FaultInjector.FAULTS)}`",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return
+        logger.warning("Upstream faults set to '%s' by %s", fault_injector.describe(), user_id)
+    
+    injected = ", ".join(f"{fault}={count}" for fault, count in sorted(fault_injector.injected.items())) or "none"
+    state = "💥 ON" if fault_injector.enabled else "✅ OFF"
+    await update.message.reply_text(
+        f"💥 **UPSTREAM FAULT INJECTION**\n\n"
+        f"📊 **State:** {state}\n"
+        f"⚙️ **Settings:** `{fault_injector.describe()}`\n"
+        f"🎯 **Injected:** `{injected}`\n"
+        f"⏱ **Timeout:** {UPSTREAM_TIMEOUT}s",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+@instrumented
+async def record_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to record anonymised traffic for replay.py"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    action = context.args[0].lower() if context.args else "status"
+    
+    if action == "start":
+        path = f"traffic_{get_nepal_time().strftime('%Y%m%d_%H%M%S')}.jsonl.gz"
+        traffic_recorder.start(path)
+        await update.message.reply_text(
+            f"⏺ **Recording traffic to** `{path}`\n"
+            "📝 **Use** `/record stop` **to finish**",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    if action == "stop":
+        if not traffic_recorder.recording:
+            await update.message.reply_text("❌ **Not recording!**", parse_mode=ParseMode.MARKDOWN)
+            return
+        traffic_recorder.stop()
+        await update.message.reply_text(
+            f"⏹ **Recording saved:** `{traffic_recorder.path}`\n"
+            f"📊 **Records:** {traffic_recorder.records}",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    if traffic_recorder.recording:
+        status = f"⏺ **Recording:** `{traffic_recorder.path}` ({traffic_recorder.records} records)"
+    else:
+        status = "⏹ **Not recording**"
+    await update.message.reply_text(
+        f"{status}\n"
+        "📝 **Usage:** `/record start` or `/record stop`",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+# ===============================
+# BULK LIMITS
+# ===============================
+
+BULK_FLAGS = {'1': True, 'true': True, 'yes': True, 'y': True, '0': False, 'false': False, 'no': False, 'n': False}
+
+class BulkImport:
+    """Validated rows of an uploaded limits file: user_id -> (limit, verified or None)"""
+    
+    def __init__(self):
+        self.rows = {}
+        self.errors = []  # (line, message)
+        self.duplicates = 0
+    
+    def add(self, line: int, fields: list):
+        """Validate one row: [user_id, limit] or [user_id, limit, verified]"""
+        if len(fields) not in (2, 3):
+            self.errors.append((line, f"expected 2 or 3 fields, got {len(fields)}"))
+            return
+        try:
+            user_id = int(str(fields[0]).strip())
+            limit = int(str(fields[1]).strip())
+        except ValueError:
+            self.errors.append((line, "user_id and limit must be numbers"))
+            return
+        if user_id <= 0 or limit < 0:
+            self.errors.append((line, "user_id must be positive and limit 0 or greater"))
+            return
+        verified = None
+        if len(fields) == 3 and str(fields[2]).strip():
+            verified = BULK_FLAGS.get(str(fields[2]).strip().lower())
+            if verified is None:
+                self.errors.append((line, "verified must be yes or no"))
+                return
+        if user_id in self.rows:
+            self.duplicates += 1  # The last row wins
+        self.rows[user_id] = (limit, verified)
+
+BULK_HEADER_NAMES = {"user_id", "user id", "userid", "user", "id"}  # First CSV column of a header row
+BULK_READ_ERRORS = (ValueError, UnicodeDecodeError, csv.Error, TelegramError)  # Bad file, or expired/undownloadable
+BULK_JSON_CHUNK = 16384  # Characters of a JSON array upload decoded at a time
+
+class BoundedBuffer(io.BytesIO):
+    """Download target that refuses to grow past `limit` bytes"""
+    
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+    
+    def write(self, data) -> int:
+        if self.tell() + len(data) > self.limit:
+            raise ValueError(f"file is larger than {self.limit // 1000} KB")
+        return super().write(data)
+
+def iter_json_array(text, chunk_size: int = BULK_JSON_CHUNK):
+    """Items of a top-level JSON array, decoded one at a time from a text stream"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    
+    def fill() -> bool:
+        nonlocal buffer
+        chunk = text.read(chunk_size)
+        buffer += chunk
+        return bool(chunk)
+    
+    def next_token() -> str:
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip()
+            if buffer or not fill():
+                return buffer[:1]
+    
+    if next_token() != "[":
+        raise ValueError("expected a JSON array")
+    buffer = buffer[1:]
+    if next_token() == "]":
+        buffer = buffer[1:]
+    else:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer)
+                rest = buffer[end:].lstrip()
+            except json.JSONDecodeError:
+                rest = ""
+            # Until a separator follows, the item may be cut by the chunk edge ("1." of "1.5")
+            if rest[:1] not in (",", "]"):
+                if fill():
+                    continue
+                raise ValueError("not valid JSON")
+            yield item
+            buffer = rest[1:]
+            if rest[0] == "]":
+                break
+            next_token()
+    if next_token():
+        raise ValueError("not valid JSON")
+
+def read_bulk_rows(stream, filename: str, bulk: BulkImport):
+    """Stream rows of a CSV, JSON array or JSON Lines upload into `bulk`"""
+    if filename.lower().endswith(".csv"):
+        for line, fields in enumerate(csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")), 1):
+            if not fields or not "".join(fields).strip() or fields[0].strip().startswith("#"):
+                continue
+            if line == 1 and fields[0].strip().lower() in BULK_HEADER_NAMES:
+                continue  # Header row
+            bulk.add(line, fields)
+        return
+    
+    def fields_of(item) -> list:
+        if isinstance(item, dict):
+            return [item.get(key) for key in ("user_id", "limit", "verified") if key in item]
+        return list(item) if isinstance(item, list) else [item]
+    
+    if stream.read(64).lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"["):
+        stream.seek(0)
+        for line, item in enumerate(iter_json_array(io.TextIOWrapper(stream, encoding="utf-8-sig")), 1):
+            bulk.add(line, fields_of(item))
+        return
+    stream.seek(0)
+    for line, raw in enumerate(stream, 1):
+        if not raw.strip():
+            continue
+        try:
+            bulk.add(line, fields_of(json.loads(raw)))
+        except json.JSONDecodeError:
+            bulk.errors.append((line, "not valid JSON"))
+
+def bulk_changes(bulk: BulkImport) -> tuple:
+    """Limit and verification changes against the current state, and a digest of them"""
+    limits, verifications = {}, {}
+    for user_id, (limit, verified) in bulk.rows.items():
+        if user_limits.get(user_id) != limit:
+            limits[user_id] = limit
+        if verified is not None and user_verification.get(user_id, {}).get('verified', False) != verified:
+            verifications[user_id] = verified
+    digest = hashlib.sha1(json.dumps([sorted(limits.items()), sorted(verifications.items())]).encode()).hexdigest()[:16]
+    return limits, verifications, digest
+
+async def apply_bulk_changes(limits: dict, verifications: dict):
+    """Apply many limit and verification changes with one flush"""
+    verified_date = get_nepal_time().strftime("%Y-%m-%d %H:%M:%S")
+    changes = [('user_limits', user_id, limit) for user_id, limit in limits.items()]
+    changes += [
+        ('user_verification', user_id, {'verified': True, 'verified_date': verified_date} if verified else None)
+        for user_id, verified in verifications.items()
+    ]
+    if state_store is not None:
+        # One transaction: all rows or none
+        advance_state_seq(await in_store_thread(state_store.put_many, changes), len(changes))
+    
+    for user_id, limit in limits.items():
+        bot_stats.user_seen(user_id)
+        bot_stats.limit_changed(user_limits.get(user_id), limit)
+        user_limits[user_id] = limit
+        if user_id in quota_leases.leases:
+            quota_leases.settle(user_id)
+    for user_id, verified in verifications.items():
+        bot_stats.user_seen(user_id)
+        bot_stats.verification_changed(not verified, verified)
+        if verified:
+            user_verification[user_id] = {'verified': True, 'verified_date': verified_date}
+        else:
+            user_verification.pop(user_id, None)
+    
+    if state_store is None:
+        save_data()
+
+async def reset_usage_bulk(user_ids: list) -> int:
+    """Clear today's usage for several users with one flush; how many had used any"""
+    today = nepal_clock.today_key()
+    had_usage = sum(1 for user_id in user_ids if usage_today.get(user_id, 0) + quota_leases.used(user_id, today))
+    for user_id in user_ids:
+        if user_id in quota_leases.leases:
+            quota_leases.settle(user_id)
+    if state_store is not None:
+        await in_store_thread(state_store.reset_usage, user_ids, today)
+    for user_id in user_ids:
+        _set_usage_today(user_id, today, 0)
+    if state_store is None:
+        save_data()
+    return had_usage
+
+def parse_user_ids(tokens: list) -> Tuple[list, int]:
+    """Distinct positive user IDs in order, and how many non-empty tokens were not one"""
+    user_ids, rejected = [], 0
+    for token in tokens:
+        # isascii: str.isdigit() also accepts characters like "²" that int() rejects
+        if token.isascii() and token.isdigit() and int(token) > 0:
+            user_ids.append(int(token))
+        elif token:
+            rejected += 1
+    return list(dict.fromkeys(user_ids)), rejected
+
+async def download_upload(bot, document) -> io.BytesIO:
+    """Download an uploaded document, refusing anything over BULK_IMPORT_MAX_BYTES before it is buffered"""
+    too_large = ValueError(f"file is larger than {BULK_IMPORT_MAX_BYTES // 1000} KB")
+    if document.file_size and document.file_size > BULK_IMPORT_MAX_BYTES:
+        raise too_large
+    file = await bot.get_file(document.file_id)
+    if file.file_size and file.file_size > BULK_IMPORT_MAX_BYTES:
+        raise too_large
+    buffer = BoundedBuffer(BULK_IMPORT_MAX_BYTES)  # Size unknown up front: stop at the limit
+    await file.download_to_memory(buffer)
+    buffer.seek(0)
+    return buffer
+
+async def read_bulk_upload(bot, document, bulk: BulkImport):
+    """Download an uploaded document and parse it into `bulk`"""
+    read_bulk_rows(await download_upload(bot, document), document.file_name or "", bulk)
+
+def bulk_preview_text(bulk: BulkImport, limits: dict, verifications: dict) -> str:
+    lines = [
+        "📋 **BULK LIMIT IMPORT PREVIEW**\n",
+        f"📄 **Valid rows:** {len(bulk.rows)}",
+        f"✏️ **Limit changes:** {len(limits)}",
+        f"🔐 **Verification changes:** {len(verifications)}",
+        f"⏸ **Unchanged users:** {sum(1 for user_id in bulk.rows if user_id not in limits and user_id not in verifications)}",
+    ]
+    if bulk.duplicates:
+        lines.append(f"♻️ **Duplicate users (last row wins):** {bulk.duplicates}")
+    if bulk.errors:
+        lines.append(f"⚠️ **Rejected rows:** {len(bulk.errors)}")
+        lines += [f"  `line {line}: {message}`" for line, message in bulk.errors[:BULK_PREVIEW_ROWS]]
+    diff = [
+        f"`{user_id}`: {get_user_daily_limit(user_id)} → {limit}"
+        for user_id, limit in list(limits.items())[:BULK_PREVIEW_ROWS]
+    ]
+    diff += [
+        f"`{user_id}`: {'✅ verify' if verified else '❌ unverify'}"
+        for user_id, verified in list(verifications.items())[:max(0, BULK_PREVIEW_ROWS - len(diff))]
+    ]
+    if diff:
+        lines.append("\n**🔍 Changes:**")
+        lines += diff
+        more = len(limits) + len(verifications) - len(diff)
+        if more > 0:
+            lines.append(f"… and {more} more")
+    return "\n".join(lines)
+
+def bulk_preview_keyboard(digest: str, changes: int) -> Optional[InlineKeyboardMarkup]:
+    if not changes:
+        return None
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton(f"✅ Apply {changes} changes", callback_data=f"apply_import:{digest}"),
+        InlineKeyboardButton("❌ Cancel", callback_data="cancel_import")
+    ]])
+
+def uploaded_document(message):
+    """Document sent with the command as caption, or the one the command replies to"""
+    if message.document:
+        return message, message.document
+    if message.reply_to_message and message.reply_to_message.document:
+        return message.reply_to_message, message.reply_to_message.document
+    return None, None
+
+@instrumented
+async def importlimits_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to set many limits from a CSV or JSON upload"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    upload, document = uploaded_document(update.message)
+    if document is None:
+        await update.message.reply_text(
+            "❌ **No file!**\n"
+            "📝 **Usage:** send a `.csv` or `.json` file with the caption `/importlimits`, "
+            "or reply to one with `/importlimits`\n"
+            "📄 **CSV:** `user_id,limit[,verified]` per line\n"
+            "📄 **JSON:** `[{\"user_id\": 123456789, \"limit\": 5, \"verified\": true}]` or one object per line",
+            parse_mode=ParseMode.MARKDOWN
+        )
+        return
+    
+    bulk = BulkImport()
+    try:
+        await read_bulk_upload(context.bot, document, bulk)
+    except BULK_READ_ERRORS as e:
+        await update.message.reply_text(
+            f"❌ **Could not read file:** {escape_markdown(str(e))}", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    limits, verifications, digest = bulk_changes(bulk)
+    # The preview replies to the upload so Apply can read the file again
+    await upload.reply_text(
+        bulk_preview_text(bulk, limits, verifications),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=bulk_preview_keyboard(digest, len(limits) + len(verifications))
+    )
+
+async def apply_import_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Apply a previewed import, unless the state changed since the preview"""
+    query = update.callback_query
+    if not is_owner(query.from_user.id):
+        return await edit_callback_message(query, "❌ **Unauthorized!**")
+    
+    upload = query.message.reply_to_message if query.message else None
+    if not upload or not upload.document:
+        return await edit_callback_message(query, "❌ **Upload not found, send the file again**")
+    
+    bulk = BulkImport()
+    try:
+        await read_bulk_upload(context.bot, upload.document, bulk)
+    except BULK_READ_ERRORS as e:
+        return await edit_callback_message(
+            query, f"❌ **Could not read file:** {escape_markdown(str(e))}\n📤 **Send the file again**",
+            parse_mode=ParseMode.MARKDOWN)
+    limits, verifications, digest = bulk_changes(bulk)
+    if digest != query.data.split(":", 1)[1]:
+        return await edit_callback_message(
+            query,
+            "⚠️ **Data changed since the preview, review again**\n\n" + bulk_preview_text(bulk, limits, verifications),
+            parse_mode=ParseMode.MARKDOWN,
+            reply_markup=bulk_preview_keyboard(digest, len(limits) + len(verifications))
+        )
+    
+    await apply_bulk_changes(limits, verifications)
+    return await edit_callback_message(
+        query,
+        f"✅ **Bulk import applied!**\n"
+        f"✏️ **Limits changed:** {len(limits)}\n"
+        f"🔐 **Verifications changed:** {len(verifications)}\n"
+        f"⚠️ **Rows rejected:** {len(bulk.errors)}",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def cancel_import_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    return await edit_callback_message(update.callback_query, "❌ **Bulk import cancelled**")
+
+@instrumented
+async def resetusage_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to clear today's usage for a list of users"""
+    if not update.effective_user or not update.message:
+        return
+    
+    user_id = update.effective_user.id
+    
+    if not is_owner(user_id):
+        await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
+        return
+    
+    tokens = list(context.args or [])
+    _, document = uploaded_document(update.message)
+    if document is not None:
+        try:
+            buffer = await download_upload(context.bot, document)
+        except (ValueError, TelegramError) as e:
+            await update.message.reply_text(
+                f"❌ **Could not read file:** {escape_markdown(str(e))}", parse_mode=ParseMode.MARKDOWN)
+            return
+        # First column of each line; a limits file works too
+        for line in io.TextIOWrapper(buffer, encoding="utf-8-sig", errors="replace"):
+            tokens.append(line.replace(",", " ").split(maxsplit=1)[0] if line.strip() else "")
+    
+    user_ids, rejected = parse_user_ids(tokens)
+    
+    if not user_ids:
         await update.message.reply_text(
-            f"❌ **You are not the owner!**\n"
-            f"👤 **Your ID:** {user_id}\n"
-            f"👑 **Owner ID:** {OWNER_ID}",
+            "❌ **No user IDs!**\n"
+            "📝 **Usage:** `/resetusage <user_id> [user_id ...]`, or send/reply to a file with one ID per line",
             parse_mode=ParseMode.MARKDOWN
         )
         return
     
+    had_usage = await reset_usage_bulk(user_ids)
     await update.message.reply_text(
-        f"✅ **Owner recognized successfully!**\n"
-        f"👑 **Your ID:** {user_id}\n"
-        f"🎮 **You have full access to all commands**",
+        f"✅ **Usage reset for today!**\n"
+        f"👥 **Users:** {len(user_ids)}\n"
+        f"📊 **Had used likes:** {had_usage}\n"
+        f"⚠️ **Skipped entries:** {rejected}",
         parse_mode=ParseMode.MARKDOWN
     )
 
-async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Owner command to broadcast messages"""
+# ===============================
+# STATE EXPORT
+# ===============================
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CSV_FIELDS = ("table", "id", "day", "value")
+export_task = None
+
+def export_snapshot():
+    """Rows of a consistent state snapshot as (table, key, value); read lazily, off the event loop"""
+    if state_store is not None:
+        return state_store.snapshot_rows()
+    return data_file_rows(DATA_FILE)
+
+def data_file_rows(path: str):
+    # save_data() swaps in a whole new file after every change, so any one read is consistent
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        data = json.load(f)
+    for table in ('user_limits', 'user_verification', 'allowed_groups', 'limit_tiers', 'user_tiers'):
+        for key, value in data.get(table, {}).items():
+            yield table, int(key), value
+    for user_id, days in data.get('user_usage', {}).items():
+        for day, count in days.items():
+            yield 'user_usage', int(user_id), [day, count]
+    for group_id, days in data.get('group_usage', {}).items():
+        for day, count in days.items():
+            yield 'group_usage', int(group_id), [day, count]
+
+def export_record(table: str, key: int, value) -> dict:
+    if table == 'user_limits':
+        return {'table': table, 'user_id': key, 'limit': value}
+    if table == 'user_usage':
+        return {'table': table, 'user_id': key, 'day': value[0], 'count': value[1]}
+    if table == 'group_usage':
+        return {'table': table, 'chat_id': key, 'day': value[0], 'count': value[1]}
+    if table == 'allowed_groups':
+        return {'table': table, 'chat_id': key, **value}
+    if table == 'limit_tiers':
+        return {'table': table, 'tier_id': key, **value}
+    if table == 'user_tiers':
+        return {'table': table, 'user_id': key, 'tier_id': value}
+    return {'table': table, 'user_id': key, **value}
+
+def export_csv_row(table: str, key: int, value) -> tuple:
+    if table in ('user_usage', 'group_usage'):
+        return table, key, value[0], value[1]
+    return table, key, "", value if isinstance(value, int) else json.dumps(value, ensure_ascii=False)
+
+def write_export(rows, fmt: str, directory: str, prefix: str, chunk_bytes: int) -> list:
+    """Write rows to gzip files of about chunk_bytes at most; [(path, records)]"""
+    chunks = []
+    raw = text = writer = None
+    
+    def open_chunk():
+        nonlocal raw, text, writer
+        path = os.path.join(directory, f"{prefix}_part{len(chunks) + 1}.{fmt}.gz")
+        raw = open(path, "wb")
+        text = io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode="wb"), encoding="utf-8", newline="")
+        if fmt == "csv":
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_CSV_FIELDS)
+        chunks.append([path, 0])
+    
+    def close_chunk():
+        text.close()  # Ends the gzip stream; the file under it stays open
+        raw.close()
+    
+    open_chunk()
+    for table, key, value in rows:
+        # raw.tell() trails the compressor by its small buffer, well inside the 50 MB margin
+        if chunks[-1][1] and raw.tell() >= chunk_bytes:
+            close_chunk()
+            open_chunk()
+        if fmt == "csv":
+            writer.writerow(export_csv_row(table, key, value))
+        else:
+            text.write(json.dumps(export_record(table, key, value), ensure_ascii=False) + "\n")
+        chunks[-1][1] += 1
+    close_chunk()
+    return [tuple(chunk) for chunk in chunks]
+
+async def run_export_and_send(bot, chat_id: int, fmt: str):
+    """Background job behind /export: snapshot, compress in a thread, send each part"""
+    prefix = f"export_{get_nepal_time().strftime('%Y%m%d_%H%M%S')}"
+    directory = tempfile.mkdtemp(prefix="em_export_")
+    try:
+        rows = export_snapshot()
+        start = time.perf_counter()
+        chunks = await asyncio.get_running_loop().run_in_executor(
+            None, write_export, rows, fmt, directory, prefix, EXPORT_CHUNK_BYTES)
+        logger.info("Exported %s records in %s parts in %.2fs",
+                    sum(records for _, records in chunks), len(chunks), time.perf_counter() - start)
+        for index, (path, records) in enumerate(chunks, 1):
+            with open(path, "rb") as f:
+                await bot.send_document(
+                    chat_id=chat_id,
+                    document=f,
+                    filename=os.path.basename(path),
+                    caption=f"📦 Export part {index}/{len(chunks)}: {records} records ({fmt.upper()}, gzip)",
+                    write_timeout=EXPORT_UPLOAD_TIMEOUT
+                )
+            os.unlink(path)
+    except Exception as e:
+        logger.error("Export failed: %s", e)
+        try:
+            await bot.send_message(chat_id=chat_id, text=f"❌ Export failed: {e}")
+        except Exception:
+            pass
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+@instrumented
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Owner command to download all bot state"""
+    global export_task
     if not update.effective_user or not update.message:
         return
     
@@ -1414,37 +5531,217 @@ async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ **Owner command only!**", parse_mode=ParseMode.MARKDOWN)
         return
     
-    if not context.args:
+    fmt = context.args[0].lower() if context.args else "ndjson"
+    if fmt not in EXPORT_FORMATS:
         await update.message.reply_text(
-            "❌ **No message provided!**\n"
-            "📝 **Usage:** `/broadcast <message>`",
+            "❌ **Unknown format!**\n"
+            "📝 **Usage:** `/export` (NDJSON) or `/export csv`",
             parse_mode=ParseMode.MARKDOWN
         )
         return
     
-    message = " ".join(context.args)
-    
-    # Confirm broadcast
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ Send", callback_data=f"confirm_broadcast:{message}"),
-            InlineKeyboardButton("❌ Cancel", callback_data="cancel_broadcast")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    if export_task and not export_task.done():
+        await update.message.reply_text("⏳ **An export is already running!**", parse_mode=ParseMode.MARKDOWN)
+        return
     
+    export_task = asyncio.create_task(run_export_and_send(context.bot, update.effective_chat.id, fmt))
     await update.message.reply_text(
-        f"📢 **Confirm Broadcast**\n\n"
-        f"**Message:** {message}\n\n"
-        f"**This will be sent to all bot users!**",
-        parse_mode=ParseMode.MARKDOWN,
-        reply_markup=reply_markup
+        f"📦 **Exporting users, usage, verification and groups as {fmt.upper()}...**\n"
+        f"📄 **Sent as gzip documents of up to {EXPORT_CHUNK_BYTES // 1_000_000} MB each**",
+        parse_mode=ParseMode.MARKDOWN
     )
 
 # ===============================
 # MEMBER TRACKING SYSTEM
 # ===============================
 
+def markdown_name(value) -> str:
+    """A user-chosen name, cut to NOTIFY_NAME_MAX_CHARS and safe inside legacy Markdown"""
+    value = str(value or "")
+    if len(value) > NOTIFY_NAME_MAX_CHARS:
+        value = value[:NOTIFY_NAME_MAX_CHARS - 1] + "…"
+    return escape_markdown(value)
+
+def format_member_event(kind: str, member, chat, event_time: datetime) -> str:
+    """Format a single join/leave notification"""
+    header = "🆕 **NEW MEMBER JOINED**" if kind == "join" else "❌ **MEMBER LEFT GROUP**"
+    return f"""
+{header}
+
+**👤 User Details:**
+• **Name:** {markdown_name(member.first_name)} {markdown_name(member.last_name)}
+• **Username:** @{markdown_name(member.username) if member.username else 'No username'}
+• **User ID:** `{member.id}`
+
+**🏠 Group Details:**
+• **Group:** {markdown_name(chat.title)}
+• **Group ID:** `{chat.id}`
+• **Group Type:** {chat.type}
+
+**⏰ Time:** {event_time.strftime("%H:%M:%S")}
+**📅 Date:** {event_time.strftime("%Y-%m-%d")}
+
+**🔥 EM OFFICIAL TEAM TRACKER 🔥**
+    """
+
+def format_member_digest(chat, events: list) -> str:
+    """Format one digest message for a burst of join/leave events"""
+    joined = [member for kind, member, _ in events if kind == "join"]
+    left = [member for kind, member, _ in events if kind == "left"]
+    first_time = events[0][2]
+    last_time = events[-1][2]
+
+    def member_lines(members: list) -> str:
+        lines, size = [], 0
+        for member in members[:NOTIFY_DIGEST_MAX_NAMES]:
+            username = markdown_name(member.username) if member.username else 'No username'
+            line = f"• {markdown_name(member.first_name)} (@{username}) - `{member.id}`"
+            if size + len(line) > NOTIFY_DIGEST_SECTION_CHARS:
+                break
+            lines.append(line)
+            size += len(line) + 1
+        if len(members) > len(lines):
+            lines.append(f"• ...and {len(members) - len(lines)} more")
+        return chr(10).join(lines) if lines else "• None"
+
+    return f"""
+📋 **MEMBER ACTIVITY DIGEST**
+
+**🏠 Group Details:**
+• **Group:** {markdown_name(chat.title)}
+• **Group ID:** `{chat.id}`
+• **Group Type:** {chat.type}
+
+**🆕 Joined ({len(joined)}):**
+{member_lines(joined)}
+
+**❌ Left ({len(left)}):**
+{member_lines(left)}
+
+**⏰ Window:** {first_time.strftime("%H:%M:%S")} - {last_time.strftime("%H:%M:%S")}
+**📅 Date:** {last_time.strftime("%Y-%m-%d")}
+
+**🔥 EM OFFICIAL TEAM TRACKER 🔥**
+    """
+
+def get_owner_ids() -> list:
+    """Get the distinct owner chat IDs to notify"""
+    if ALTERNATE_OWNER_ID != OWNER_ID:
+        return [OWNER_ID, ALTERNATE_OWNER_ID]
+    return [OWNER_ID]
+
+async def notify_owners(bot, text: str):
+    """Send the same message to every owner concurrently"""
+    results = await asyncio.gather(
+        *(bot.send_message(chat_id=owner_id, text=text, parse_mode=ParseMode.MARKDOWN)
+          for owner_id in get_owner_ids()),
+        return_exceptions=True
+    )
+    for owner_id, result in zip(get_owner_ids(), results):
+        if isinstance(result, Exception):
+            logger.error("Failed to notify owner %s: %s", owner_id, result)
+
+class MemberEventAggregator:
+    """Buffer join/leave events per group and flush them as digests"""
+
+    def __init__(self, window: float, digest_threshold: int):
+        self.window = window
+        self.digest_threshold = digest_threshold
+        self.pending = {}  # chat_id: {'chat': chat, 'bot': bot, 'events': [...]}
+        self.flush_tasks = {}  # chat_id: asyncio.Task
+
+    def add(self, bot, chat, kind: str, member, event_time: datetime):
+        """Queue an event; the first event for a group starts its window"""
+        entry = self.pending.setdefault(chat.id, {'chat': chat, 'bot': bot, 'events': []})
+        entry['events'].append((kind, member, event_time))
+        if chat.id not in self.flush_tasks:
+            self.flush_tasks[chat.id] = asyncio.create_task(self._flush_later(chat.id))
+
+    async def _flush_later(self, chat_id: int):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self.flush_tasks.pop(chat_id, None)
+        await self.flush(chat_id)
+
+    async def flush(self, chat_id: int):
+        """Send everything buffered for a group"""
+        entry = self.pending.pop(chat_id, None)
+        if not entry or not entry['events']:
+            return
+        chat, bot, events = entry['chat'], entry['bot'], entry['events']
+        try:
+            if len(events) <= self.digest_threshold:
+                # Low volume: keep the detailed per-event messages
+                for kind, member, event_time in events:
+                    await notify_owners(bot, format_member_event(kind, member, chat, event_time))
+            else:
+                await notify_owners(bot, format_member_digest(chat, events))
+        except Exception as e:
+            logger.error("Failed to flush member notifications for %s: %s", chat_id, e)
+
+    async def flush_all(self):
+        """Flush every group immediately (used on shutdown)"""
+        for task in list(self.flush_tasks.values()):
+            task.cancel()
+        self.flush_tasks.clear()
+        for chat_id in list(self.pending):
+            await self.flush(chat_id)
+
+member_notifier = MemberEventAggregator(NOTIFY_WINDOW_SECONDS, NOTIFY_DIGEST_THRESHOLD)
+
+class ChatInfoCache:
+    """Per-chat TTL cache for member counts and administrator lists"""
+
+    def __init__(self, member_count_ttl: float, admin_list_ttl: float):
+        self.ttls = {'member_count': member_count_ttl, 'admins': admin_list_ttl}
+        self.entries = {}  # (kind, chat_id): (expires_at, value)
+        self.in_flight = {}  # (kind, chat_id): asyncio.Task
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, kind: str, chat_id: int, fetch):
+        key = (kind, chat_id)
+        entry = self.entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        # Concurrent refreshes for the same chat share one API call
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(kind, key, fetch))
+            self.in_flight[key] = task
+        # Shielded, so one cancelled caller does not cancel the call the others wait on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, kind: str, key: tuple, fetch):
+        try:
+            value = await fetch()
+        finally:
+            self.in_flight.pop(key, None)
+        self.entries[key] = (time.monotonic() + self.ttls[kind], value)
+        return value
+
+    async def get_member_count(self, bot, chat_id: int) -> int:
+        return await self._get('member_count', chat_id, lambda: bot.get_chat_member_count(chat_id))
+
+    async def get_administrators(self, bot, chat_id: int):
+        return await self._get('admins', chat_id, lambda: bot.get_chat_administrators(chat_id))
+
+    def invalidate_member_count(self, chat_id: int):
+        self.entries.pop(('member_count', chat_id), None)
+
+    def invalidate_admins(self, chat_id: int):
+        self.entries.pop(('admins', chat_id), None)
+
+    def invalidate(self, chat_id: int):
+        self.invalidate_member_count(chat_id)
+        self.invalidate_admins(chat_id)
+
+chat_info_cache = ChatInfoCache(MEMBER_COUNT_TTL, ADMIN_LIST_TTL)
+
+@instrumented
 async def track_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Track when new members join groups"""
     if not update.message or not update.message.new_chat_members:
@@ -1457,53 +5754,18 @@ async def track_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ['group', 'supergroup']:
         return
     
+    chat_info_cache.invalidate_member_count(chat.id)
     current_time = get_nepal_time()
-    time_str = current_time.strftime("%H:%M:%S")
-    date_str = current_time.strftime("%Y-%m-%d")
     
     for member in new_members:
         # Skip bot joins
         if member.is_bot:
             continue
-            
-        # Notify owner about new member
-        member_info = f"""
-🆕 **NEW MEMBER JOINED**
-
-**👤 User Details:**
-• **Name:** {member.first_name} {member.last_name or ''}
-• **Username:** @{member.username if member.username else 'No username'}
-• **User ID:** `{member.id}`
-
-**🏠 Group Details:**
-• **Group:** {chat.title}
-• **Group ID:** `{chat.id}`
-• **Group Type:** {chat.type}
-
-**⏰ Time:** {time_str}
-**📅 Date:** {date_str}
-
-**🔥 EM OFFICIAL TEAM TRACKER 🔥**
-        """
         
-        try:
-            # Send notification to owner
-            await context.bot.send_message(
-                chat_id=OWNER_ID,
-                text=member_info,
-                parse_mode=ParseMode.MARKDOWN
-            )
-            
-            # Also send to alternate owner ID if different
-            if ALTERNATE_OWNER_ID != OWNER_ID:
-                await context.bot.send_message(
-                    chat_id=ALTERNATE_OWNER_ID,
-                    text=member_info,
-                    parse_mode=ParseMode.MARKDOWN
-                )
-        except Exception as e:
-            logger.error(f"Failed to notify owner about new member: {e}")
+        # Queue notification for the owner digest
+        member_notifier.add(context.bot, chat, "join", member, current_time)
 
+@instrumented
 async def track_member_left(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Track when members leave groups"""
     if not update.message or not update.message.left_chat_member:
@@ -1516,88 +5778,70 @@ async def track_member_left(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if chat.type not in ['group', 'supergroup']:
         return
     
+    chat_info_cache.invalidate_member_count(chat.id)
+    
     # Skip bot leaves
     if left_member.is_bot:
         return
     
-    current_time = get_nepal_time()
-    time_str = current_time.strftime("%H:%M:%S")
-    date_str = current_time.strftime("%Y-%m-%d")
+    # Queue notification for the owner digest
+    member_notifier.add(context.bot, chat, "left", left_member, get_nepal_time())
+
+@instrumented
+async def track_chat_member_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Keep the group info cache in sync with membership and admin changes"""
+    member_update = update.chat_member or update.my_chat_member
+    if not member_update:
+        return
     
-    # Notify owner about member leaving
-    member_info = f"""
-❌ **MEMBER LEFT GROUP**
-
-**👤 User Details:**
-• **Name:** {left_member.first_name} {left_member.last_name or ''}
-• **Username:** @{left_member.username if left_member.username else 'No username'}
-• **User ID:** `{left_member.id}`
-
-**🏠 Group Details:**
-• **Group:** {chat.title}
-• **Group ID:** `{chat.id}`
-• **Group Type:** {chat.type}
-
-**⏰ Time:** {time_str}
-**📅 Date:** {date_str}
-
-**🔥 EM OFFICIAL TEAM TRACKER 🔥**
-    """
+    chat_id = member_update.chat.id
+    old_status = member_update.old_chat_member.status
+    new_status = member_update.new_chat_member.status
+    if old_status == new_status:
+        return
     
-    try:
-        # Send notification to owner
-        await context.bot.send_message(
-            chat_id=OWNER_ID,
-            text=member_info,
-            parse_mode=ParseMode.MARKDOWN
-        )
-        
-        # Also send to alternate owner ID if different
-        if ALTERNATE_OWNER_ID != OWNER_ID:
-            await context.bot.send_message(
-                chat_id=ALTERNATE_OWNER_ID,
-                text=member_info,
-                parse_mode=ParseMode.MARKDOWN
-            )
-    except Exception as e:
-        logger.error(f"Failed to notify owner about member leaving: {e}")
+    admin_statuses = ('creator', 'administrator')
+    if old_status in admin_statuses or new_status in admin_statuses:
+        chat_info_cache.invalidate_admins(chat_id)
+    chat_info_cache.invalidate_member_count(chat_id)
 
+@instrumented
 async def members_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show group member information (owner only)"""
-    if not update.effective_user or not update.message:
-        return
+    if not update.effective_user or not update.effective_message:
+        return False
     
     user_id = update.effective_user.id
     chat = update.effective_chat
     
     # Only owner can use this command
     if not is_owner(user_id):
-        await update.message.reply_text(
+        return await show_screen(
+            update,
             "❌ **Owner command only!**\n"
             f"👑 **Owner ID:** {OWNER_ID}",
             parse_mode=ParseMode.MARKDOWN
         )
-        return
     
     # Only works in groups
     if chat.type not in ['group', 'supergroup']:
-        await update.message.reply_text(
+        return await show_screen(
+            update,
             "❌ **This command only works in groups!**\n"
             "💡 **Use this command in a group to see member info**",
             parse_mode=ParseMode.MARKDOWN
         )
-        return
     
     try:
         # Get group member count
-        member_count = await context.bot.get_chat_member_count(chat.id)
+        member_count = await chat_info_cache.get_member_count(context.bot, chat.id)
         
         current_time = get_nepal_time()
         time_str = current_time.strftime("%H:%M:%S")
         date_str = current_time.strftime("%Y-%m-%d")
         
         # Get administrators
-        admins = await context.bot.get_chat_administrators(chat.id)
+        admins = await chat_info_cache.get_administrators(context.bot, chat.id)
         admin_list = []
         owner_info = None
         
@@ -1632,24 +5876,17 @@ async def members_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **🔥 EM OFFICIAL TEAM TRACKER 🔥**
         """
         
-        keyboard = [
-            [
-                InlineKeyboardButton("🔄 Refresh Info", callback_data="refresh_members"),
-                InlineKeyboardButton("📊 Get Stats", callback_data="refresh_stats")
-            ],
-            [InlineKeyboardButton("👑 Owner Help", callback_data="refresh_owner_help")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
+        return await show_screen(
+            update,
             group_info,
             parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup
+            reply_markup=MEMBERS_KEYBOARD
         )
         
     except Exception as e:
-        logger.error(f"Error getting group info: {e}")
-        await update.message.reply_text(
+        logger.error("Error getting group info: %s", e)
+        return await show_screen(
+            update,
             f"❌ **Error getting group information**\n"
             f"📝 **Error:** {str(e)}\n"
             f"💡 **Make sure bot has admin permissions**",
@@ -1660,6 +5897,108 @@ async def members_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # CALLBACK HANDLERS
 # ===============================
 
+class CallbackDebouncer:
+    """Remembers recent (user, message, data) presses so repeat taps can be dropped"""
+    
+    def __init__(self, window: float, max_keys: int):
+        self.window = window
+        self.max_keys = max_keys
+        self.pressed = OrderedDict()  # key: monotonic time of the press, oldest first
+    
+    def repeated(self, key: tuple, now: float = None) -> bool:
+        """Record a press; True if the same press was handled within the window"""
+        now = time.monotonic() if now is None else now
+        last = self.pressed.get(key)
+        if last is not None and now - last < self.window:
+            return True
+        self.pressed[key] = now
+        self.pressed.move_to_end(key)
+        while self.pressed:
+            oldest_key, pressed_at = next(iter(self.pressed.items()))
+            if now - pressed_at < self.window and len(self.pressed) <= self.max_keys:
+                break
+            del self.pressed[oldest_key]
+        return False
+
+callback_debouncer = CallbackDebouncer(CALLBACK_DEBOUNCE_WINDOW, CALLBACK_DEBOUNCE_MAX_KEYS)
+callback_presses = metrics.register(Counter(
+    "bot_callback_presses_total", "Button presses by action and outcome", ("action", "outcome")))
+state_writes_skipped = metrics.register(Counter(
+    "bot_state_writes_skipped_total", "State updates skipped because nothing changed", ("table",)))
+
+async def edit_callback_message(query, text: str, **kwargs) -> bool:
+    """Edit the pressed message; False if it already showed this content"""
+    try:
+        await query.edit_message_text(text, **kwargs)
+        return True
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+        return False
+
+async def complete_verification_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    query = update.callback_query
+    changed = await verify_user(query.from_user.id)
+    edited = await edit_callback_message(
+        query,
+        VERIFICATION_COMPLETED_TEMPLATE.render(),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=VERIFICATION_COMPLETED_KEYBOARD
+    )
+    return changed or edited
+
+async def show_like_help_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    return await edit_callback_message(
+        update.callback_query,
+        LIKE_HELP_TEMPLATE.render(),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def confirm_broadcast_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Handle broadcast confirmation (owner only)"""
+    query = update.callback_query
+    if not is_owner(query.from_user.id):
+        return await edit_callback_message(query, "❌ **Unauthorized!**")
+    
+    message = query.data.replace("confirm_broadcast:", "")
+    
+    # This would implement actual broadcasting to all users
+    # For now, just confirm
+    return await edit_callback_message(
+        query,
+        f"✅ **Broadcast sent successfully!**\n"
+        f"📝 **Message:** {message}",
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def cancel_broadcast_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    return await edit_callback_message(update.callback_query, "❌ **Broadcast cancelled**")
+
+async def save_uptime_report_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    # Placeholder for future feature
+    return await edit_callback_message(
+        update.callback_query, "💾 **Uptime report saved!**\n📧 **Report sent to owner DM**")
+
+# Callback data (up to the first ':') -> handler; command handlers redraw the pressed message via show_screen()
+CALLBACK_ACTIONS = {
+    "start_verify": verify_command,
+    "complete_verification": complete_verification_callback,
+    "refresh_stats": stats_command,
+    "show_like_help": show_like_help_callback,
+    "confirm_broadcast": confirm_broadcast_callback,
+    "cancel_broadcast": cancel_broadcast_callback,
+    "refresh_commands": slag_command,
+    "refresh_owner_help": ownerhelp_command,
+    "refresh_members": members_command,
+    "refresh_uptime": uptime_command,
+    "save_uptime_report": save_uptime_report_callback,
+    "apply_import": apply_import_callback,
+    "cancel_import": cancel_import_callback,
+    "hist": history_callback,
+    "analytics": analytics_callback,
+}
+
+@instrumented
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle button callbacks"""
     if not update.callback_query:
@@ -1670,142 +6009,288 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await query.answer()
     
-    if query.data == "start_verify":
-        # Redirect to verify command
-        await verify_command(update, context)
+    action = (query.data or "").split(":", 1)[0]
+    handler = CALLBACK_ACTIONS.get(action)
+    if handler is None:
+        callback_presses.inc("unknown", "ignored")
+        return
     
-    elif query.data == "complete_verification":
-        # Complete verification
-        verify_user(user_id)
-        
-        success_text = f"""
-🎉 **VERIFICATION COMPLETED!** 🎉
-
-```
-✅ CONGRATULATIONS!
-╭─────────────────────────────────────╮
-│ 🔐 Status: FULLY VERIFIED
-│ 🎮 Access: GRANTED
-│ 💎 Limits: ACTIVE
-│ 🚀 Ready: YES
-╰─────────────────────────────────────╯
-```
-
-**🎮 YOU CAN NOW:**
-• Send Free Fire likes
-• Use all bot commands
-• Access premium features
+    message_id = query.message.message_id if query.message else query.inline_message_id
+    if callback_debouncer.repeated((user_id, message_id, query.data)):
+        callback_presses.inc(action, "debounced")
+        return
+    
+    changed = await handler(update, context)
+    callback_presses.inc(action, "handled" if changed else "unchanged")
 
-**🎯 TRY NOW:** `/like bd 5914395123`
+# ===============================
+# SCALE-OUT WORKERS
+# ===============================
 
-**🔥 DEVELOPER BY EM OFFICIAL TEAM 🔥**
-        """
-        
-        keyboard = [
-            [InlineKeyboardButton("🎮 Try Like Command", callback_data="show_like_help")],
-            [InlineKeyboardButton("📊 View Stats", callback_data="refresh_stats")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            success_text,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup
-        )
+class Lease:
+    """Singleton duty held by one worker at a time; fails over after LEASE_TTL"""
     
-    elif query.data == "refresh_stats":
-        # Refresh statistics (redirect to stats command)
-        await stats_command(update, context)
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.held = False
     
-    elif query.data == "show_like_help":
-        help_text = """
-💎 **LIKE COMMAND GUIDE** 💎
-
-**📝 FORMAT:**
-`/like <region> <uid>`
-
-**🌍 REGIONS:**
-• **BD** - Bangladesh
-• **IND** - India  
-• **BR** - Brazil
-• **US** - United States
-
-**🎯 EXAMPLES:**
-• `/like bd 5914395123`
-• `/like ind 1234567890`
-• `/like br 9876543210`
+    async def refresh(self) -> bool:
+        try:
+            held = await in_store_thread(state_store.acquire_lease, self.name, self.owner, self.ttl)
+        except sqlite3.Error as e:
+            logger.error("Error renewing %s lease: %s", self.name, e)
+            held = False
+        if held != self.held:
+            logger.warning("Worker %s %s the %s lease", WORKER_ID, "acquired" if held else "lost", self.name)
+        self.held = held
+        return held
+    
+    async def release(self):
+        if self.held:
+            await in_store_thread(state_store.release_lease, self.name, self.owner)
+            self.held = False
 
-**⚡ START SENDING LIKES NOW!**
-        """
-        
-        await query.edit_message_text(
-            help_text,
-            parse_mode=ParseMode.MARKDOWN
-        )
+class SharedStateSync:
+    """Catch up with other workers' changes every `interval` seconds
     
-    elif query.data.startswith("confirm_broadcast:"):
-        # Handle broadcast confirmation (owner only)
-        if not is_owner(user_id):
-            await query.edit_message_text("❌ **Unauthorized!**")
-            return
-        
-        message = query.data.replace("confirm_broadcast:", "")
-        
-        # This would implement actual broadcasting to all users
-        # For now, just confirm
-        await query.edit_message_text(
-            f"✅ **Broadcast sent successfully!**\n"
-            f"📝 **Message:** {message}",
-            parse_mode=ParseMode.MARKDOWN
-        )
+    Timed rather than per update, so handlers never wait on a store round
+    trip. Limits and quotas are enforced by the store itself; anything else
+    another worker changes shows up here within `interval`.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.task = None
+    
+    def start(self):
+        self.task = asyncio.create_task(self._run())
     
-    elif query.data == "cancel_broadcast":
-        # Cancel broadcast
-        await query.edit_message_text("❌ **Broadcast cancelled**")
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
     
-    elif query.data == "refresh_commands":
-        # Refresh commands display
-        await slag_command(update, context)
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await sync_shared_state()
+            except sqlite3.Error as e:
+                logger.error("Error syncing shared state: %s", e)
+
+state_sync = SharedStateSync(STATE_SYNC_INTERVAL)
+
+async def run_intake(bot, lease: Lease):
+    """Poll Telegram into the shared queue while holding the intake lease"""
+    while True:
+        if not await lease.refresh():
+            await asyncio.sleep(LEASE_RENEW_INTERVAL)
+            continue
+        try:
+            offset = await in_store_thread(state_store.get_meta, 'update_offset')
+            if offset is None:
+                # First start: skip the backlog, like drop_pending_updates
+                updates = await bot.get_updates(offset=-1, timeout=0)
+                await in_store_thread(state_store.enqueue_updates, [], updates[-1].update_id + 1 if updates else 0)
+                continue
+            updates = await bot.get_updates(
+                offset=int(offset), timeout=INTAKE_POLL_TIMEOUT, allowed_updates=Update.ALL_TYPES)
+            if updates:
+                await in_store_thread(
+                    state_store.enqueue_updates, [u.to_dict() for u in updates], updates[-1].update_id + 1)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error polling updates: %s", e)
+            await asyncio.sleep(1)
+
+async def run_store_maintenance(lease: Lease):
+    """Prune the change log; only the lease holder does it"""
+    last_run = 0.0
+    while True:
+        if await lease.refresh() and time.monotonic() - last_run >= STORE_MAINTENANCE_INTERVAL:
+            await in_store_thread(state_store.prune_changes, time.time() - CHANGE_LOG_RETENTION)
+            last_run = time.monotonic()
+        await asyncio.sleep(LEASE_RENEW_INTERVAL)
+
+async def process_shared_updates(application: Application, concurrency: int, stop_when_empty: bool = False):
+    """Handle updates from the shared queue, up to `concurrency` at a time"""
+    slots = asyncio.Semaphore(concurrency)
+    in_flight = set()
+    
+    async def handle(payload: dict):
+        try:
+            await application.process_update(Update.de_json(payload, application.bot))
+        except Exception as e:
+            logger.error("Error processing shared update: %s", e)
+        finally:
+            slots.release()
+    
+    while True:
+        await slots.acquire()
+        payload = await in_store_thread(state_store.claim_update)
+        if payload is None:
+            slots.release()
+            if stop_when_empty and not in_flight:
+                return
+            await asyncio.sleep(SHARED_QUEUE_POLL_INTERVAL)
+            continue
+        task = asyncio.create_task(handle(payload))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+async def run_worker():
+    """One scale-out worker: intake and maintenance when it holds their leases, handlers always"""
+    open_state_store(STATE_STORE)
+    load_data()
+    application = build_application()
+    await application.initialize()
+    await post_init(application)
     
-    elif query.data == "refresh_owner_help":
-        # Refresh owner help
-        await ownerhelp_command(update, context)
+    leases = [Lease("intake", LEASE_TTL), Lease("maintenance", LEASE_TTL)]
+    tasks = [
+        asyncio.create_task(run_intake(application.bot, leases[0])),
+        asyncio.create_task(run_store_maintenance(leases[1])),
+        asyncio.create_task(process_shared_updates(application, WORKER_CONCURRENCY)),
+    ]
+    logger.info("Worker %s started", WORKER_ID)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for lease in leases:
+            await lease.release()
+        await post_stop(application)
+        await application.shutdown()
+        state_store.close()
+
+def run_workers(count: int):
+    """Start `count` worker processes and restart any that exit
     
-    elif query.data == "refresh_members":
-        # Refresh member info
-        await members_command(update, context)
+    A worker that keeps exiting soon after starting (bad token, locked
+    store) is restarted with exponential backoff; after
+    WORKER_MAX_FAST_EXITS in a row the other workers are stopped too.
+    """
+    workers = {}  # worker_id: process, or None while waiting to restart
+    started = {}  # worker_id: monotonic start time
+    fast_exits = {}  # worker_id: consecutive fast exits
+    restart_at = {}  # worker_id: monotonic time of the next restart
     
-    elif query.data == "refresh_uptime":
-        # Refresh uptime status
-        await uptime_command(update, context)
+    def spawn(worker_id: int):
+        env = dict(os.environ, WORKER_ID=str(worker_id), WORKERS="1")
+        workers[worker_id] = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        started[worker_id] = time.monotonic()
     
-    elif query.data == "save_uptime_report":
-        # Save uptime report (placeholder for future feature)
-        await query.edit_message_text("💾 **Uptime report saved!**\n📧 **Report sent to owner DM**")
+    for worker_id in range(count):
+        spawn(worker_id)
+    try:
+        while True:
+            time.sleep(1)
+            now = time.monotonic()
+            for worker_id, process in list(workers.items()):
+                if process is None:
+                    if now >= restart_at[worker_id]:
+                        spawn(worker_id)
+                    continue
+                if process.poll() is None:
+                    continue
+                if now - started[worker_id] < WORKER_FAST_EXIT:
+                    fast_exits[worker_id] = fast_exits.get(worker_id, 0) + 1
+                else:
+                    fast_exits[worker_id] = 0
+                if fast_exits[worker_id] >= WORKER_MAX_FAST_EXITS:
+                    logger.error("Worker %s exited %s times right after starting (last code %s), giving up",
+                                 worker_id, fast_exits[worker_id], process.returncode)
+                    return
+                delay = min(WORKER_RESTART_MAX_DELAY, WORKER_RESTART_DELAY * 2 ** fast_exits[worker_id])
+                logger.warning("Worker %s exited with code %s, restarting in %ss", worker_id, process.returncode, delay)
+                workers[worker_id] = None
+                restart_at[worker_id] = now + delay
+    except KeyboardInterrupt:
+        pass
+    finally:
+        running = [process for process in workers.values() if process is not None]
+        for process in running:
+            process.terminate()
+        for process in running:
+            process.wait()
 
 # ===============================
 # MAIN APPLICATION
 # ===============================
 
-def main():
-    """Main function to run the bot"""
-    
-    # Check if bot token is set
-    if not TELEGRAM_BOT_TOKEN:
-        print("❌ ERROR: TELEGRAM_BOT_TOKEN environment variable not set!")
-        print("📝 Get your token from @BotFather on Telegram")
-        return
-    
-    # Load data
-    load_data()
+async def post_init(application: Application):
+    """Start background services once the bot is initialized"""
+    message_cleaner.start(application.bot)
+    nepal_clock.start()
+    system_monitor.start()
+    loop_watchdog.start()
+    if TRAFFIC_RECORD_FILE:
+        traffic_recorder.start(TRAFFIC_RECORD_FILE)
+    if state_store is not None:
+        quota_leases.start()
+        state_sync.start()
+    if PLAYER_CACHE_FILE:
+        player_cache.load(PLAYER_CACHE_FILE)
+    like_history.start()
+    usage_analytics.start()
+    if METRICS_PORT:
+        await metrics.start(METRICS_HOST, METRICS_PORT)
+        metrics.register(Gauge(
+            "bot_update_queue_size", "Updates fetched but not yet dispatched",
+            callback=application.update_queue.qsize))
+
+async def post_stop(application: Application):
+    """Flush buffered work while the bot can still send messages"""
+    await member_notifier.flush_all()
+    await message_cleaner.stop()
+    await state_sync.stop()
+    await quota_leases.stop()
+    await nepal_clock.stop()
+    await system_monitor.stop()
+    await loop_watchdog.stop()
+    profiler.stop()
+    await upstream.close()
+    await usage_analytics.stop()
+    await like_history.stop()
+    traffic_recorder.stop()
+    if PLAYER_CACHE_FILE:
+        player_cache.save(PLAYER_CACHE_FILE)
+    await metrics.stop()
+
+def build_application(bot=None, concurrent_updates=False) -> Application:
+    """Create the application and register every handler"""
+    builder = Application.builder()
+    if bot is not None:
+        builder = builder.bot(bot)
+    else:
+        builder = builder.token(TELEGRAM_BOT_TOKEN)
+    application = (
+        builder
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .concurrent_updates(concurrent_updates)
+        .build()
+    )
     
-    # Create application
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Run ahead of every other handler: record, then drop floods
+    application.add_handler(TypeHandler(Update, record_update), group=-2)
+    application.add_handler(TypeHandler(Update, flood_guard), group=-1)
     
     # Add command handlers
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("verify", verify_command))
     application.add_handler(CommandHandler("like", like_command))
+    application.add_handler(CommandHandler("player", player_command))
+    application.add_handler(CommandHandler("history", history_command))
     application.add_handler(CommandHandler("stats", stats_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("contact", contact_command))
@@ -1815,32 +6300,78 @@ def main():
     application.add_handler(CommandHandler("allow", allow_command))
     application.add_handler(CommandHandler("remove", remove_command))
     application.add_handler(CommandHandler("setlimit", setlimit_command))
+    application.add_handler(CommandHandler("tier", tier_command))
+    application.add_handler(CommandHandler("groupquota", groupquota_command))
     application.add_handler(CommandHandler("broadcast", broadcast_command))
     application.add_handler(CommandHandler("testowner", test_owner_command))
     application.add_handler(CommandHandler("ownerhelp", ownerhelp_command))
     application.add_handler(CommandHandler("members", members_command))
     application.add_handler(CommandHandler("uptime", uptime_command))
     application.add_handler(CommandHandler("status", status_command))
+    application.add_handler(CommandHandler("blocking", blocking_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    application.add_handler(CommandHandler("memsnap", memsnap_command))
+    application.add_handler(CommandHandler("faults", faults_command))
+    application.add_handler(CommandHandler("record", record_command))
+    application.add_handler(CommandHandler("importlimits", importlimits_command))
+    application.add_handler(CommandHandler("resetusage", resetusage_command))
+    application.add_handler(CommandHandler("export", export_command))
+    application.add_handler(CommandHandler("analytics", analytics_command))
+    # Files sent with the command as caption
+    application.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/importlimits(@\w+)?\b"), importlimits_command))
+    application.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/resetusage(@\w+)?\b"), resetusage_command))
     
     # Member tracking handlers
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, track_new_member))
     application.add_handler(MessageHandler(filters.StatusUpdate.LEFT_CHAT_MEMBER, track_member_left))
+    application.add_handler(ChatMemberHandler(track_chat_member_update, ChatMemberHandler.ANY_CHAT_MEMBER))
     
     # Callback handlers
     application.add_handler(CallbackQueryHandler(button_callback))
     
+    return application
+
+def main():
+    """Main function to run the bot"""
+    
+    # Check if bot token is set
+    if not TELEGRAM_BOT_TOKEN:
+        print("❌ ERROR: TELEGRAM_BOT_TOKEN environment variable not set!")
+        print("📝 Get your token from @BotFather on Telegram")
+        return
+    
+    # Scale-out mode: several workers sharing STATE_STORE
+    if STATE_STORE:
+        print(f"🤖 EM OFFICIAL TEAM Bot Starting {WORKERS} worker(s) on {STATE_STORE}...")
+        if WORKERS > 1:
+            run_workers(WORKERS)
+        else:
+            try:
+                asyncio.run(run_worker())
+            except KeyboardInterrupt:
+                pass
+        return
+    
+    # Load data
+    load_data()
+    
+    # Create application
+    application = build_application()
+    
     # Start bot
     print("🤖 EM OFFICIAL TEAM Bot Starting...")
     print(f"👑 Owner ID: {OWNER_ID}")
     print("🚀 Bot is running! Press Ctrl+C to stop.")
     
     try:
-        application.run_polling(drop_pending_updates=True)
+        application.run_polling(drop_pending_updates=True, allowed_updates=Update.ALL_TYPES)
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
     except Exception as e:
         print(f"❌ Bot error: {e}")
-        logger.error(f"Bot error: {e}")
+        logger.error("Bot error: %s", e)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOT_FILE = os.path.join(ROOT, "telegram_bot .py")
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "0:test")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_FORMAT", "text")
+
+def load_bot():
+    """Import the bot module (its file name contains a space)"""
+    if "telegram_bot" in sys.modules:
+        return sys.modules["telegram_bot"]
+    spec = importlib.util.spec_from_file_location("telegram_bot", BOT_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["telegram_bot"] = module
+    spec.loader.exec_module(module)
+    return module
+
+bot_module = load_bot()
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def bot(monkeypatch, tmp_path):
+    """The bot module with empty state, saving its JSON file under tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    for name in ("user_limits", "user_usage", "usage_today", "user_verification", "allowed_groups",
+                 "group_usage", "group_usage_today", "user_tiers", "group_in_flight"):
+        monkeypatch.setattr(bot_module, name, {})
+    monkeypatch.setattr(bot_module, "limit_tiers", bot_module.default_tiers())
+    monkeypatch.setattr(bot_module, "state_store", None)
+    monkeypatch.setattr(bot_module, "state_seq", 0)
+    monkeypatch.setattr(bot_module, "quota_leases", bot_module.QuotaLeases(
+        bot_module.QUOTA_LEASE_SLICE, bot_module.QUOTA_LEASE_TTL, bot_module.QUOTA_LEASE_GRACE))
+    return bot_module
+
+@pytest.fixture
+def store(bot, monkeypatch, tmp_path):
+    """Scale-out mode against a fresh SQLite store"""
+    state_store = bot.SqliteStateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(bot, "state_store", state_store)
+    yield state_store
+    state_store.close()
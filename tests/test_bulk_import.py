@@ -0,0 +1,135 @@
+import io
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import bot_module as bot, run
+
+def parse(data: bytes, filename: str) -> "bot.BulkImport":
+    bulk = bot.BulkImport()
+    bot.read_bulk_rows(io.BytesIO(data), filename, bulk)
+    return bulk
+
+def test_rows_are_validated():
+    bulk = bot.BulkImport()
+    bulk.add(1, ["1", "5"])
+    bulk.add(2, [" 2 ", "0", "yes"])
+    bulk.add(3, ["3", "4", ""])
+    bulk.add(4, ["x", "5"])
+    bulk.add(5, ["-1", "5"])
+    bulk.add(6, ["6", "-5"])
+    bulk.add(7, ["7", "5", "maybe"])
+    bulk.add(8, ["8"])
+    bulk.add(9, ["1", "9", "no"])
+    assert bulk.rows == {1: (9, False), 2: (0, True), 3: (4, None)}
+    assert [line for line, _ in bulk.errors] == [4, 5, 6, 7, 8]
+    assert bulk.duplicates == 1
+
+def test_csv_skips_header_blank_and_comment_lines():
+    bulk = parse(b"\xef\xbb\xbfuser_id,limit,verified\n1,5,yes\n\n# note\n2,3\n", "limits.CSV")
+    assert bulk.rows == {1: (5, True), 2: (3, None)}
+    assert bulk.errors == []
+
+def test_json_array_of_objects_and_lists():
+    bulk = parse(b' [{"user_id": 1, "limit": 5, "verified": "no"}, [2, 3], 4]', "limits.json")
+    assert bulk.rows == {1: (5, False), 2: (3, None)}
+    assert bulk.errors == [(3, "expected 2 or 3 fields, got 1")]
+
+def test_json_lines_report_bad_lines():
+    bulk = parse(b'{"user_id": 1, "limit": 5}\n\nnot json\n[2, 3]\n', "limits.jsonl")
+    assert bulk.rows == {1: (5, None), 2: (3, None)}
+    assert bulk.errors == [(3, "not valid JSON")]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_json_array_is_decoded_across_chunk_edges(chunk_size):
+    text = '[ [1, 1.5e3], {"a": "x,]"} ,-0.25, [], "]"]'
+    items = list(bot.iter_json_array(io.StringIO(text), chunk_size))
+    assert items == [[1, 1500.0], {"a": "x,]"}, -0.25, [], "]"]
+    assert list(bot.iter_json_array(io.StringIO(" [ ] "), chunk_size)) == []
+
+@pytest.mark.parametrize("text", ['{"a": 1}', '[1, 2', '[1 2]', '[1,]', '[1] x', '[1.]'])
+def test_invalid_json_arrays_are_rejected(text):
+    with pytest.raises(ValueError):
+        list(bot.iter_json_array(io.StringIO(text), 2))
+
+def test_bounded_buffer_refuses_to_grow_past_its_limit():
+    buffer = bot.BoundedBuffer(4)
+    buffer.write(b"abcd")
+    with pytest.raises(ValueError):
+        buffer.write(b"e")
+    assert buffer.getvalue() == b"abcd"
+
+def test_oversized_uploads_are_refused_before_buffering(monkeypatch):
+    monkeypatch.setattr(bot, "BULK_IMPORT_MAX_BYTES", 8)
+    
+    class Upload:
+        def __init__(self, data: bytes, file_size):
+            self.data = data
+            self.file_size = file_size
+            self.downloaded = False
+        
+        async def get_file(self, file_id):
+            return self
+        
+        async def download_to_memory(self, out):
+            self.downloaded = True
+            out.write(self.data)
+    
+    async def download(upload: Upload, document_size):
+        return await bot.download_upload(upload, SimpleNamespace(file_id="f", file_size=document_size))
+    
+    upload = Upload(b"x" * 9, 9)
+    with pytest.raises(ValueError):
+        run(download(upload, 9))
+    with pytest.raises(ValueError):
+        run(download(upload, None))
+    assert not upload.downloaded
+    # Size not reported anywhere: the buffer stops it
+    with pytest.raises(ValueError):
+        run(download(Upload(b"x" * 9, None), None))
+    assert run(download(Upload(b"1,2", None), None)).read() == b"1,2"
+
+def test_changes_skip_rows_that_change_nothing(bot):
+    bot.user_limits[1] = 5
+    bot.user_verification[2] = {'verified': True}
+    bulk = bot.BulkImport()
+    bulk.add(1, [1, 5, "no"])
+    bulk.add(2, [2, 7, "yes"])
+    limits, verifications, digest = bot.bulk_changes(bulk)
+    assert (limits, verifications) == ({2: 7}, {})
+    assert digest == bot.bulk_changes(bulk)[2]
+
+def test_apply_updates_state_and_saves(bot):
+    bot.user_verification[2] = {'verified': True}
+    run(bot.apply_bulk_changes({1: 5, 2: 0}, {1: True, 2: False}))
+    assert bot.user_limits == {1: 5, 2: 0}
+    assert set(bot.user_verification) == {1}
+    bot.user_limits.clear()
+    bot.load_data()
+    assert bot.user_limits == {1: 5, 2: 0}
+
+def test_store_writes_all_rows_or_none(store):
+    with pytest.raises(TypeError):
+        store.put_many([('user_limits', 1, 5), ('user_limits', 2, object())])
+    assert store.load()[1]['user_limits'] == {}
+
+def test_failed_apply_leaves_local_state_alone(bot, store, monkeypatch):
+    def locked(changes):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(store, "put_many", locked)
+    bot.user_limits[1] = 3
+    with pytest.raises(sqlite3.OperationalError):
+        run(bot.apply_bulk_changes({1: 5, 2: 7}, {2: True}))
+    assert bot.user_limits == {1: 3}
+    assert bot.user_verification == {}
+
+def test_store_apply_is_visible_to_other_workers(bot, store):
+    run(bot.apply_bulk_changes({1: 5}, {1: True}))
+    _, data = store.load()
+    assert data['user_limits'] == {1: 5}
+    assert data['user_verification'][1]['verified'] is True
+    assert bot.state_seq == 2
+
+def test_resetusage_tokens():
+    assert bot.parse_user_ids(["12", "", "12", "0", "7", "abc", "-3", "١٢", "²", "5"]) == ([12, 7, 5], 5)
@@ -0,0 +1,26 @@
+from conftest import bot_module as bot
+
+PRESS = (1, 500, "refresh_stats")
+
+def test_repeat_within_the_window_is_dropped():
+    debouncer = bot.CallbackDebouncer(window=1.0, max_keys=100)
+    assert not debouncer.repeated(PRESS, now=0)
+    assert debouncer.repeated(PRESS, now=0.5)
+    # Dropped taps do not extend the window
+    assert debouncer.repeated(PRESS, now=0.9)
+    assert not debouncer.repeated(PRESS, now=1.0)
+
+def test_other_users_messages_and_buttons_are_independent():
+    debouncer = bot.CallbackDebouncer(window=1.0, max_keys=100)
+    assert not debouncer.repeated(PRESS, now=0)
+    assert not debouncer.repeated((2, 500, "refresh_stats"), now=0)
+    assert not debouncer.repeated((1, 501, "refresh_stats"), now=0)
+    assert not debouncer.repeated((1, 500, "refresh_uptime"), now=0)
+
+def test_expired_and_excess_presses_are_forgotten():
+    debouncer = bot.CallbackDebouncer(window=1.0, max_keys=2)
+    for message_id in range(3):
+        debouncer.repeated((1, message_id, "page"), now=0)
+    assert list(debouncer.pressed) == [(1, 1, "page"), (1, 2, "page")]
+    debouncer.repeated(PRESS, now=5)
+    assert list(debouncer.pressed) == [PRESS]
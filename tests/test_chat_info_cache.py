@@ -0,0 +1,62 @@
+import asyncio
+
+from conftest import bot_module as bot, run
+
+class CountingBot:
+    """Stands in for telegram.Bot; counts member count calls"""
+    
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = 0
+    
+    async def get_chat_member_count(self, chat_id: int) -> int:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return 100 + self.calls
+
+def test_served_from_memory_until_the_ttl_passes():
+    async def scenario():
+        cache = bot.ChatInfoCache(member_count_ttl=0.05, admin_list_ttl=60)
+        api = CountingBot()
+        assert await cache.get_member_count(api, -1) == 101
+        assert await cache.get_member_count(api, -1) == 101
+        assert (api.calls, cache.hits, cache.misses) == (1, 1, 1)
+        await asyncio.sleep(0.06)
+        assert await cache.get_member_count(api, -1) == 102
+        assert api.calls == 2
+    run(scenario())
+
+def test_chats_are_cached_separately_and_invalidated():
+    async def scenario():
+        cache = bot.ChatInfoCache(member_count_ttl=60, admin_list_ttl=60)
+        api = CountingBot()
+        await cache.get_member_count(api, -1)
+        await cache.get_member_count(api, -2)
+        assert api.calls == 2
+        cache.invalidate(-1)
+        await cache.get_member_count(api, -1)
+        await cache.get_member_count(api, -2)
+        assert api.calls == 3
+    run(scenario())
+
+def test_concurrent_misses_share_one_call():
+    async def scenario():
+        cache = bot.ChatInfoCache(member_count_ttl=60, admin_list_ttl=60)
+        api = CountingBot(delay=0.02)
+        counts = await asyncio.gather(*(cache.get_member_count(api, -1) for _ in range(5)))
+        assert counts == [101] * 5
+        assert api.calls == 1
+        assert not cache.in_flight
+    run(scenario())
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        cache = bot.ChatInfoCache(member_count_ttl=60, admin_list_ttl=60)
+        api = CountingBot(delay=0.02)
+        first = asyncio.create_task(cache.get_member_count(api, -1))
+        second = asyncio.create_task(cache.get_member_count(api, -1))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 101
+        assert api.calls == 1
+    run(scenario())
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import bot_module as bot
+
+def limiter(max_keys: int = 100):
+    return bot.FloodLimiter(
+        {'default': (2, 10, "notice"), 'refresh': (1, 10, "silent")},
+        {'default': (3, 10, "silent")},
+        max_keys)
+
+def test_burst_then_one_per_emission_interval():
+    flood = limiter()
+    assert flood.hit(1, 1, True, "start", now=0) is None
+    assert flood.hit(1, 1, True, "start", now=0) is None
+    assert flood.hit(1, 1, True, "start", now=0) == ('user', 5.0, True)
+    # Only the first refusal asks for a notice
+    assert flood.hit(1, 1, True, "start", now=1) == ('user', 4.0, False)
+    assert flood.hit(1, 1, True, "start", now=5) is None
+    assert flood.hit(1, 1, True, "start", now=5) == ('user', 5.0, True)
+
+def test_commands_have_their_own_buckets_and_modes():
+    flood = limiter()
+    assert flood.hit(1, 1, True, "refresh", now=0) is None
+    assert flood.hit(1, 1, True, "refresh", now=0) == ('user', 10.0, False)
+    assert flood.hit(1, 1, True, "start", now=0) is None
+
+def test_chat_limit_is_shared_by_members():
+    flood = limiter()
+    for user_id in (1, 2, 3):
+        assert flood.hit(user_id, -100, False, "start", now=0) is None
+    assert flood.hit(4, -100, False, "start", now=0) == ('chat', pytest.approx(10 / 3), False)
+    # Refused requests are not counted against the scopes that allowed them
+    assert ('user', 4, "start") not in flood.state
+    assert flood.hit(4, -200, False, "start", now=0) is None
+
+def test_user_refusal_does_not_use_up_the_chat():
+    flood = limiter()
+    flood.hit(1, -100, False, "start", now=0)
+    flood.hit(1, -100, False, "start", now=0)
+    before = flood.state[('chat', -100, "start")][0]
+    assert flood.hit(1, -100, False, "start", now=0)[0] == 'user'
+    assert flood.state[('chat', -100, "start")][0] == before
+
+def test_private_chats_skip_the_chat_limit():
+    flood = limiter()
+    for user_id in range(10):
+        assert flood.hit(user_id, 42, True, "start", now=0) is None
+    assert not any(key[0] == 'chat' for key in flood.state)
+
+def test_idle_and_excess_keys_are_evicted():
+    flood = limiter(max_keys=2)
+    for user_id in (1, 2, 3):
+        flood.hit(user_id, user_id, True, "start", now=0)
+    assert list(flood.state) == [('user', 2, "start"), ('user', 3, "start")]
+    flood.hit(4, 4, True, "start", now=60)
+    assert list(flood.state) == [('user', 4, "start")]
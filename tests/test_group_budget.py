@@ -0,0 +1,57 @@
+from conftest import run
+
+GROUP = 500
+
+def test_budget_and_concurrency_cap(bot):
+    bot.allowed_groups[GROUP] = {'daily_budget': 2, 'max_concurrent': 1}
+    
+    async def scenario():
+        assert await bot.reserve_group_like(GROUP) is None
+        assert await bot.reserve_group_like(GROUP) == 'busy'
+        await bot.finish_group_like(GROUP, sent=True)
+        assert await bot.reserve_group_like(GROUP) is None
+        await bot.finish_group_like(GROUP, sent=True)
+        assert await bot.reserve_group_like(GROUP) == 'budget'
+    run(scenario())
+    assert bot.get_group_usage_today(GROUP) == 2
+    assert bot.group_in_flight == {}
+
+def test_unsent_likes_go_back_to_the_budget(bot):
+    bot.allowed_groups[GROUP] = {'daily_budget': 1}
+    
+    async def scenario():
+        assert await bot.reserve_group_like(GROUP) is None
+        await bot.finish_group_like(GROUP, sent=False)
+        assert bot.get_group_usage_today(GROUP) == 0
+        assert await bot.reserve_group_like(GROUP) is None
+    run(scenario())
+
+def test_groups_without_a_budget_are_only_counted(bot):
+    bot.allowed_groups[GROUP] = {'max_concurrent': 0}
+    
+    async def scenario():
+        for _ in range(5):
+            assert await bot.reserve_group_like(GROUP) is None
+    run(scenario())
+    assert bot.get_group_usage_today(GROUP) == 5
+
+def test_store_budget_and_cap_are_shared_by_workers(bot, store, monkeypatch):
+    bot.allowed_groups[GROUP] = {'daily_budget': 2, 'max_concurrent': 1}
+    day = bot.nepal_clock.today_key()
+    
+    async def scenario():
+        assert await bot.reserve_group_like(GROUP) is None
+        monkeypatch.setattr(bot, "store_owner", "other:1")
+        assert await bot.reserve_group_like(GROUP) == 'busy'
+        # Slots of a worker that stopped renewing them run out
+        store.db.execute("UPDATE group_slots SET expires = 0 WHERE group_id = ?", (GROUP,))
+        assert await bot.reserve_group_like(GROUP) is None
+        await bot.finish_group_like(GROUP, sent=False)
+        assert store._usage_count(GROUP, day, 'group_usage') == 1
+        assert await bot.reserve_group_like(GROUP) is None
+        await bot.finish_group_like(GROUP, sent=True)
+        assert await bot.reserve_group_like(GROUP) == 'budget'
+    run(scenario())
+    assert store._usage_count(GROUP, day, 'group_usage') == 2
+    assert bot.get_group_usage_today(GROUP) == 2
+    assert store.db.execute("SELECT COUNT(*) FROM group_slots").fetchone()[0] == 0
@@ -0,0 +1,141 @@
+import asyncio
+
+from conftest import run
+
+USER = 1001
+
+def leased(store) -> dict:
+    return {owner: granted for owner, granted in store.db.execute(
+        "SELECT owner, granted FROM quota_leases WHERE user_id = ?", (USER,))}
+
+def test_local_reserve_and_release(bot):
+    bot.user_limits[USER] = 2
+    
+    async def scenario():
+        assert await bot.reserve_user_usage(USER)
+        assert await bot.reserve_user_usage(USER)
+        assert not await bot.reserve_user_usage(USER)
+        await bot.release_user_usage(USER)
+        assert bot.get_user_usage_today(USER) == 1
+        assert await bot.reserve_user_usage(USER)
+    run(scenario())
+    assert bot.get_user_usage_today(USER) == 2
+
+def test_owner_usage_is_not_tracked(bot):
+    async def scenario():
+        for _ in range(5):
+            assert await bot.reserve_user_usage(bot.OWNER_ID)
+    run(scenario())
+    assert bot.usage_today == {}
+
+def test_store_reserve_without_leases(bot, store, monkeypatch):
+    monkeypatch.setattr(bot.quota_leases, "slice_size", 0)
+    bot.user_limits[USER] = 2
+    day = bot.nepal_clock.today_key()
+    
+    async def scenario():
+        assert await bot.reserve_user_usage(USER)
+        assert await bot.reserve_user_usage(USER)
+        assert not await bot.reserve_user_usage(USER)
+        await bot.release_user_usage(USER)
+    run(scenario())
+    assert store._usage_count(USER, day) == 1
+    assert bot.get_user_usage_today(USER) == 1
+
+def test_lease_serves_from_memory_and_settles_what_was_used(bot, store):
+    bot.user_limits[USER] = 10
+    day = bot.nepal_clock.today_key()
+    
+    async def scenario():
+        for _ in range(3):
+            assert await bot.reserve_user_usage(USER)
+        assert leased(store) == {bot.quota_leases.owner: 5}
+        assert store._usage_count(USER, day) == 0
+        await bot.release_user_usage(USER)
+        assert bot.get_user_usage_today(USER) == 2
+        bot.quota_leases.settle_all()
+        # Counted while the store call is queued
+        assert bot.get_user_usage_today(USER) == 2
+        await bot.quota_leases.flush()
+    run(scenario())
+    assert leased(store) == {}
+    assert store._usage_count(USER, day) == 2
+    assert bot.get_user_usage_today(USER) == 2
+    assert bot.quota_leases.settling == {}
+
+def test_leases_of_all_workers_stay_within_the_limit(bot, store):
+    day = bot.nepal_clock.today_key()
+    other = bot.QuotaLeases(5, 60, 15)
+    other.owner = "other:1"
+    
+    async def scenario():
+        assert await bot.quota_leases.reserve(USER, day, 6)
+        assert await other.reserve(USER, day, 6)
+        assert other.leases[USER][1] == 1
+        assert not await other.reserve(USER, day, 6)
+        await other.flush()
+    run(scenario())
+    assert leased(store) == {bot.quota_leases.owner: 5}
+    assert store._usage_count(USER, day) == 1
+
+def test_refund_after_the_slice_was_returned(bot, store):
+    bot.user_limits[USER] = 10
+    day = bot.nepal_clock.today_key()
+    
+    async def scenario():
+        assert await bot.reserve_user_usage(USER)
+        # Returned (expiry, rollover, limit change) while the like was still in flight
+        bot.quota_leases.settle_all()
+        await bot.quota_leases.flush()
+        assert store._usage_count(USER, day) == 1
+        await bot.release_user_usage(USER)
+    run(scenario())
+    assert store._usage_count(USER, day) == 0
+    assert bot.get_user_usage_today(USER) == 0
+
+def test_expired_lease_is_counted_once(bot, store):
+    day = bot.nepal_clock.today_key()
+    other = bot.QuotaLeases(5, 60, 15)
+    other.owner = "other:1"
+    
+    async def scenario():
+        assert await bot.quota_leases.reserve(USER, day, 6)
+        # This worker stalls past the grace period; another worker takes the slice over in full
+        store.db.execute("UPDATE quota_leases SET expires = 0 WHERE user_id = ?", (USER,))
+        assert await other.reserve(USER, day, 6)
+        assert store._usage_count(USER, day) == 5
+        # Settling late must not count the like again
+        bot.quota_leases.settle_all()
+        await bot.quota_leases.flush()
+        assert store._usage_count(USER, day) == 5
+        assert bot.usage_today[USER] == 5
+        # Its refund still goes back to the store
+        await bot.release_user_usage(USER)
+        await other.flush()
+    run(scenario())
+    assert store._usage_count(USER, day) == 4
+
+def test_concurrent_first_reserves_share_one_lease(bot, store):
+    bot.user_limits[USER] = 10
+    
+    async def scenario():
+        results = await asyncio.gather(*(bot.reserve_user_usage(USER) for _ in range(3)))
+        assert results == [True] * 3
+    run(scenario())
+    lease = bot.quota_leases.leases[USER]
+    assert lease[1] == leased(store)[bot.quota_leases.owner]
+    assert lease[2] == 3
+
+def test_reset_clears_leased_usage(bot, store):
+    bot.user_limits[USER] = 10
+    day = bot.nepal_clock.today_key()
+    
+    async def scenario():
+        await bot.reserve_user_usage(USER)
+        await bot.reserve_user_usage(USER)
+        assert await bot.reset_usage_bulk([USER, USER + 1]) == 1
+        await bot.quota_leases.flush()
+    run(scenario())
+    assert leased(store) == {}
+    assert store._usage_count(USER, day) == 0
+    assert bot.get_user_usage_today(USER) == 0
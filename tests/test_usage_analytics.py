@@ -0,0 +1,62 @@
+import pytest
+
+from conftest import bot_module as bot
+
+START = "2026-01-01"
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Sets the Nepal day the analytics see"""
+    today = [START]
+    monkeypatch.setattr(bot.nepal_clock, "today_key", lambda: today[0])
+    return today
+
+def likes_per_day(day_index: int) -> int:
+    # Some quiet days, so the windows must age across gaps
+    return 0 if day_index % 5 == 3 else day_index + 1
+
+def expected(name: str, last: int) -> int:
+    span = bot.UsageAnalytics.WINDOWS[name]
+    return sum(likes_per_day(i) for i in range(max(0, last - span + 1), last + 1))
+
+def total(aggregate) -> int:
+    return sum(aggregate.hours)
+
+def test_window_sums_follow_the_days(clock):
+    analytics = bot.UsageAnalytics()
+    for index in range(45):
+        clock[0] = bot.shift_day(START, index)
+        for _ in range(likes_per_day(index)):
+            analytics.like(index % 3 + 1, -100, "ind", "success")
+        for name in bot.UsageAnalytics.WINDOWS:
+            assert total(analytics.window(name)) == expected(name, index)
+    week = analytics.window('week')
+    assert sum(week.users.values()) == sum(week.outcomes.values()) == sum(week.groups.values()) == expected('week', 44)
+
+def test_windows_age_without_events(clock):
+    analytics = bot.UsageAnalytics()
+    analytics.like(1, 1, "ind", "success")
+    analytics.quota_exhausted(1)
+    clock[0] = bot.shift_day(START, 6)
+    assert total(analytics.window('week')) == 1
+    clock[0] = bot.shift_day(START, 7)
+    assert total(analytics.window('day')) == 0
+    week = analytics.window('week')
+    assert (total(week), week.users, week.quota_users) == (0, {}, {})
+    assert total(analytics.window('month')) == 1
+    clock[0] = bot.shift_day(START, 30)
+    assert total(analytics.window('month')) == 0
+
+def test_history_matches_live_counting(clock):
+    live = bot.UsageAnalytics()
+    events = []
+    for index in range(40):
+        clock[0] = bot.shift_day(START, index)
+        for _ in range(likes_per_day(index)):
+            live.like(7, -100, "bd", "failed")
+            events.append((clock[0], 0, 7, -100, "bd", "failed"))
+    loaded = bot.UsageAnalytics()
+    loaded.load_history(events)
+    for name in bot.UsageAnalytics.WINDOWS:
+        assert total(loaded.window(name)) == total(live.window(name)) == expected(name, 39)
+        assert loaded.window(name).outcomes == live.window(name).outcomes